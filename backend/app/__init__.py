@@ -3,7 +3,9 @@ import os
 from flask_restful import Api
 from flask_cors import CORS
 from .extensions import db, oauth2  # Teraz importujemy db z extensions
-from .quizes import QuizResource, OptionsQuizResource
+from . import sqlite_profile, read_replica, fast_json
+from .read_replica import sync_replica_command
+from .quizes import QuizResource, OptionsQuizResource, QuizQuestionResource, QuizAttemptResource, LeaderboardResource
 from .stripe_resources import StripeCheckoutSessionResource, StripeWebhookResource
 from .routes import (
     RegisterResource, 
@@ -25,10 +27,21 @@ from .routes import (
     AdminOfflinePaymentsResource,
     AdminOfflinePaymentApproveResource,
     AdminOfflinePaymentRejectResource,
-    AdminFailedPaymentsResource
+    AdminFailedPaymentsResource,
+    AdminAnalyticsResource
 )
 from .user_controller import setup_jwt_blacklist_callbacks
+from .revocation_cache import revocation_cache
+from .current_user import current_user_cache
+from .search import quiz_search, search_reindex_command
+from .compiled_quizzes import compiled_quizzes
+from .dashboard_stats import dashboard_stats
+from .cache import cache
+from .analytics import backfill_daily_metrics_command
+from .leaderboards import leaderboards, leaderboard_snapshot_command
 from utils.scheduled_tasks import setup_scheduled_tasks
+from utils.index_advisor import index_advisor_command
+from utils.user_stats import rebuild_user_stats_command
 from .quizes import GetQuizzes
 from .payments import StripeWebhook, CreatePaymentIntent
 from flask_jwt_extended import JWTManager
@@ -40,12 +53,19 @@ def create_app():
     app.config.from_object('config.Config')
     app.config["SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
     
+    # JSON encoder for jsonify() and the API representation
+    fast_json.init_app(app)
+    
     # Initialize Stripe
     import stripe
     stripe.api_key=os.getenv("STRIPE_SECRET_KEY")
     
     # Inicjalizacja bazy danych
+    sqlite_profile.init_app(app)
+    read_replica.configure(app)
     db.init_app(app)
+    with app.app_context():
+        sqlite_profile.install(db.engine, app.config)
     oauth2.init_app(app)
     
     # Inicjalizacja JWT
@@ -75,9 +95,41 @@ def create_app():
     
     with app.app_context():
         db.create_all()
+    
+    # Application cache (per-process LRU tier + optional shared tier)
+    cache.init_app(app)
+    
+    # Load revoked tokens into the in-process cache
+    revocation_cache.init_app(app)
+    
+    # Cached JWT identity -> user rows
+    current_user_cache.init_app(app)
+    
+    # Full-text quiz search index
+    quiz_search.init_app(app)
+    
+    # Compiled quizzes (redacted payload + answer key) for /options and scoring
+    compiled_quizzes.init_app(app)
+    
+    # Admin dashboard counters
+    dashboard_stats.init_app(app)
+    
+    # Leaderboards (loaded from snapshots on first use)
+    leaderboards.init_app(app)
+    
+    # Read replica for GET handlers marked with @replica_reads
+    read_replica.init_app(app)
         
     # Setup scheduled tasks for token cleanup
     setup_scheduled_tasks(app)
+    
+    # Management commands
+    app.cli.add_command(index_advisor_command)
+    app.cli.add_command(search_reindex_command)
+    app.cli.add_command(rebuild_user_stats_command)
+    app.cli.add_command(leaderboard_snapshot_command)
+    app.cli.add_command(backfill_daily_metrics_command)
+    app.cli.add_command(sync_replica_command)
 
     # Enable CORS for all routes
     frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:5173')
@@ -86,8 +138,9 @@ def create_app():
     CORS(app, resources={
         r"/*": {
             "origins": allowed_origins,
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
             "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["X-Next-Cursor", "X-Total-Count", "X-Failed-Payments-Count", "X-Failed-Subscriptions-Count"],
             "supports_credentials": True
         }
     })
@@ -102,7 +155,7 @@ def create_app():
             if origin in allowed_origins:
                 response.headers.add("Access-Control-Allow-Origin", origin)
                 response.headers.add('Access-Control-Allow-Headers', "Content-Type, Authorization")
-                response.headers.add('Access-Control-Allow-Methods', "GET, POST, PUT, DELETE, OPTIONS")
+                response.headers.add('Access-Control-Allow-Methods', "GET, POST, PUT, PATCH, DELETE, OPTIONS")
                 response.headers.add('Access-Control-Allow-Credentials', 'true')
             
             return response
@@ -110,6 +163,7 @@ def create_app():
     
     # Inicjalizacja API
     api = Api(app)
+    fast_json.init_api(api)
 
     # Endpointy
 
@@ -123,6 +177,12 @@ def create_app():
     api.add_resource(QuizResource, '/quiz', '/quiz/<int:quiz_id>')
     api.add_resource(GetQuizzes, '/quizzes')  # Dodany endpoint dla listy quizów
     api.add_resource(OptionsQuizResource, '/quiz/<int:quiz_id>/options')
+    api.add_resource(QuizQuestionResource, '/quiz/<int:quiz_id>/questions/<int:position>')
+    api.add_resource(QuizAttemptResource, '/quiz/<int:quiz_id>/attempts')
+
+    # Rankingi
+    api.add_resource(LeaderboardResource, '/leaderboards/global', '/leaderboards/category/<string:category>',
+                     '/leaderboards/quiz/<int:quiz_id>')
 
     # Google OAuth2
     api.add_resource(GoogleLoginCallback, '/auth/oauth2/callback')
@@ -148,5 +208,6 @@ def create_app():
     api.add_resource(AdminOfflinePaymentApproveResource, '/admin/payments/offline/<int:payment_id>/approve')
     api.add_resource(AdminOfflinePaymentRejectResource, '/admin/payments/offline/<int:payment_id>/reject')
     api.add_resource(AdminFailedPaymentsResource, '/admin/payments/failed')
+    api.add_resource(AdminAnalyticsResource, '/admin/analytics')
 
     return app
\ No newline at end of file
@@ -1,45 +1,40 @@
 """
 Admin controller for managing administrative functions
 """
-from flask import request, jsonify
+from flask import request, jsonify, current_app
 from flask_jwt_extended import get_jwt_identity
 from .models import User, OfflinePayment, StripeSubscription, Quiz, Payment
 from .extensions import db
+from sqlalchemy.orm import joinedload
 from .admin_middleware import get_current_admin_user
-from datetime import datetime, timedelta
+from .dashboard_stats import dashboard_stats
+from .analytics import get_series, GRANULARITIES
+from datetime import date, datetime, timedelta
+import heapq
+from utils.pagination import get_page_args, keyset_page, encode_cursor, decode_cursor
 
 class AdminController:
     
     @staticmethod
     def get_dashboard_stats():
-        """Get admin dashboard statistics"""
+        """Get admin dashboard statistics (cached, see dashboard_stats)"""
         try:
-            # User statistics
-            total_users = User.query.count()
-            admin_users = User.query.filter_by(role='admin').count()
-            premium_users = User.query.filter_by(has_premium_access=True).count()
-            
-            # Quiz statistics
-            total_quizzes = Quiz.query.count()
-            
-            # Payment statistics
-            pending_offline_payments = OfflinePayment.query.filter_by(status='pending').count()
-            approved_offline_payments = OfflinePayment.query.filter_by(status='approved').count()
-            active_subscriptions = StripeSubscription.query.filter_by(status='active').count()
-            # Recent activity (last 30 days)
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            new_users_this_month = User.query.filter(User.created_at >= thirty_days_ago).count()
+            counters, computed_at, age = dashboard_stats.get()
+            premium_users = counters['users_premium']
+            pending_offline_payments = counters['offline_pending']
+            approved_offline_payments = counters['offline_approved']
+            active_subscriptions = counters['subscriptions_active']
             
             return {
                 'users': {
-                    'total': total_users,
-                    'admins': admin_users,
+                    'total': counters['users_total'],
+                    'admins': counters['users_admin'],
                     'premium': premium_users,
-                    'new_this_month': new_users_this_month,
+                    'new_this_month': counters['users_new'],
                     'active': premium_users  # For test compatibility
                 },
                 'quizzes': {
-                    'total': total_quizzes
+                    'total': counters['quizzes_total']
                 },
                 'payments': {
                     'pending_offline': pending_offline_payments,
@@ -47,6 +42,11 @@ class AdminController:
                     'active_subscriptions': active_subscriptions,
                     'stripe_subscriptions': active_subscriptions,  # For test compatibility
                     'offline_payments': pending_offline_payments + approved_offline_payments  # For test compatibility
+                },
+                'freshness': {
+                    'computed_at': computed_at.isoformat(),
+                    'age_seconds': round(age, 1),
+                    'max_age_seconds': dashboard_stats.ttl
                 }
             }
         except Exception as e:
@@ -54,10 +54,10 @@ class AdminController:
 
     @staticmethod
     def get_users():
-        """Get all users with pagination"""
+        """Get users, newest first, with cursor pagination (?cursor=&limit=&include_total=)"""
+        # Invalid cursor/limit raises ValueError for the resource to turn into a 400
+        cursor, limit, include_total = get_page_args()
         try:
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 20, type=int)
             search = request.args.get('search', '')
             
             query = User.query
@@ -73,22 +73,11 @@ class AdminController:
                 )
             
             # Pagination
-            users = query.paginate(
-                page=page,
-                per_page=per_page,
-                error_out=False
-            )
+            users, pagination = keyset_page(query, User, cursor, limit, include_total)
             
             return {
-                'users': [user.to_dict() for user in users.items],
-                'pagination': {
-                    'page': page,
-                    'pages': users.pages,
-                    'per_page': per_page,
-                    'total': users.total,
-                    'has_next': users.has_next,
-                    'has_prev': users.has_prev
-                }
+                'users': [user.to_dict() for user in users],
+                'pagination': pagination
             }
         except Exception as e:
             raise Exception(f'Failed to get users: {str(e)}')
@@ -145,38 +134,27 @@ class AdminController:
 
     @staticmethod
     def get_offline_payments():
-        """Get all offline payments with pagination"""
+        """Get offline payments, newest first, with cursor pagination"""
+        cursor, limit, include_total = get_page_args()
         try:
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 20, type=int)
             status = request.args.get('status', '')
             
-            query = OfflinePayment.query
+            # user and admin are read by to_dict; load them in the page query instead of 2 lazy loads per row
+            query = OfflinePayment.query.options(
+                joinedload(OfflinePayment.user),
+                joinedload(OfflinePayment.admin)
+            )
             
             # Status filter
             if status and status in ['pending', 'approved', 'rejected']:
                 query = query.filter_by(status=status)
             
-            # Order by most recent first
-            query = query.order_by(OfflinePayment.created_at.desc())
-            
-            # Pagination
-            payments = query.paginate(
-                page=page,
-                per_page=per_page,
-                error_out=False
-            )
+            # Pagination (most recent first)
+            payments, pagination = keyset_page(query, OfflinePayment, cursor, limit, include_total)
             
             return {
-                'payments': [payment.to_dict() for payment in payments.items],
-                'pagination': {
-                    'page': page,
-                    'pages': payments.pages,
-                    'per_page': per_page,
-                    'total': payments.total,
-                    'has_next': payments.has_next,
-                    'has_prev': payments.has_prev
-                }
+                'payments': [payment.to_dict() for payment in payments],
+                'pagination': pagination
             }
         except Exception as e:
             raise Exception(f'Failed to get offline payments: {str(e)}')
@@ -335,42 +313,238 @@ class AdminController:
     
     @staticmethod
     def get_failed_payments():
-        """Get failed Stripe payments for admin dashboard"""
+        """
+        Get failed Stripe payments and subscriptions, merged newest first, with cursor pagination
+        
+        Query string: cursor, limit, status (comma separated), from/to (ISO date or datetime,
+        default: the last 30 days), min_amount/max_amount (payment intents only; subscriptions
+        carry no amount, so an amount filter leaves them out).
+        
+        Raises:
+            ValueError: Invalid cursor, limit or filter
+        """
+        cursor, limit, _ = get_page_args()
+        filters = _failed_payment_filters()
+        if cursor:
+            cursor = decode_cursor(cursor, with_source=True)
+            if cursor[2] not in FAILED_PAYMENT_SOURCES or cursor[0] is None:
+                raise ValueError('Invalid cursor')
         try:
-            # Get failed payments from the last 30 days
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            
-            # Query for failed Payment records
-            failed_payments = Payment.query.filter(
-                Payment.status == 'failed',
-                Payment.created_at >= thirty_days_ago
-            ).order_by(Payment.created_at.desc()).all()
-            
-            # Query for failed StripeSubscription records (past_due, canceled due to failed payments)
-            failed_subscriptions = StripeSubscription.query.filter(
-                StripeSubscription.status.in_(['past_due', 'canceled', 'unpaid']),
-                StripeSubscription.created_at >= thirty_days_ago
-            ).order_by(StripeSubscription.created_at.desc()).all()
-            
-            # Add additional info needed by frontend
+            # Each source is read as one index range over (status, created_at), at most limit + 1
+            # rows past the cursor; the two ordered runs are merged here into a single page
+            runs = []
+            for rank, source in enumerate(FAILED_PAYMENT_SOURCES):
+                query = _failed_source_query(source, filters)
+                if query is None:
+                    runs.append([])
+                    continue
+                model = FAILED_PAYMENT_SOURCES[source][0]
+                if cursor:
+                    query = query.filter(_after_cursor(model, rank, cursor, FAILED_PAYMENT_SOURCES))
+                rows = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+                runs.append([(row.created_at, -rank, row.id, source, row) for row in rows])
+            
+            merged = list(heapq.merge(*runs, key=lambda entry: entry[:3], reverse=True))[:limit + 1]
+            has_next = len(merged) > limit
+            page = merged[:limit]
+            
+            items = []
             payment_list = []
-            for payment in failed_payments:
-                payment_dict = payment.to_dict()
-                payment_list.append(payment_dict)
-            
             subscription_list = []
-            for sub in failed_subscriptions:
-                sub_dict = sub.to_dict()
-                # Add user info for frontend
-                if sub.user:
-                    sub_dict['user_email'] = sub.user.email
-                    sub_dict['user_name'] = sub.user.username
-                subscription_list.append(sub_dict)
-            
+            for _, _, _, source, row in page:
+                row_dict = row.to_dict()
+                if source == 'subscription':
+                    row_dict['type'] = 'subscription'
+                    # Add user info for frontend
+                    if row.user:
+                        row_dict['user_email'] = row.user.email
+                        row_dict['user_name'] = row.user.username
+                    subscription_list.append(row_dict)
+                else:
+                    payment_list.append(row_dict)
+                items.append(row_dict)
+            
+            summary = _failed_payment_summary(filters)
+            last = page[-1] if page else None
             return {
+                'items': items,
                 'failed_payments': payment_list,
-                'failed_subscriptions': subscription_list
+                'failed_subscriptions': subscription_list,
+                'summary': summary,
+                'pagination': {
+                    'limit': limit,
+                    'next_cursor': encode_cursor(last[0], last[2], last[3]) if has_next else None,
+                    'has_next': has_next,
+                    'total': summary['failed_payments']['total'] + summary['failed_subscriptions']['total']
+                }
             }
             
         except Exception as e:
             raise Exception(f'Failed to get failed payments: {str(e)}')
+
+    @staticmethod
+    def get_analytics(start=None, end=None, granularity='day'):
+        """
+        Get charts data from the daily rollups
+        
+        Args:
+            start (str, optional): First day, YYYY-MM-DD (default: 29 days before end)
+            end (str, optional): Last day, YYYY-MM-DD (default: today, UTC)
+            granularity (str): 'day', 'week' or 'month'
+            
+        Raises:
+            ValueError: Invalid dates, range or granularity
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+        try:
+            end_day = date.fromisoformat(end) if end else datetime.utcnow().date()
+            start_day = date.fromisoformat(start) if start else end_day - timedelta(days=29)
+        except ValueError:
+            raise ValueError('from and to must be dates in YYYY-MM-DD format')
+        if start_day > end_day:
+            raise ValueError('from must not be after to')
+        max_days = current_app.config.get('ANALYTICS_MAX_DAYS', 1100)
+        if (end_day - start_day).days + 1 > max_days:
+            raise ValueError(f'Date range is limited to {max_days} days')
+        
+        result = get_series(start_day, end_day, granularity)
+        result.update({
+            'from': start_day.isoformat(),
+            'to': end_day.isoformat(),
+            'granularity': granularity
+        })
+        return result
+
+
+# source -> (model, statuses that count as failed); position sets the order at equal created_at
+FAILED_PAYMENT_SOURCES = {
+    'payment': (Payment, ('failed',)),
+    'subscription': (StripeSubscription, ('past_due', 'canceled', 'unpaid')),
+}
+
+
+def _parse_bound(value, name, end_of_day=False):
+    """Parse a from/to bound; a bare date as the upper bound covers the whole day"""
+    try:
+        if len(value) == 10:
+            day = datetime.combine(date.fromisoformat(value), datetime.min.time())
+            return day + timedelta(days=1) if end_of_day else day
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO date or datetime')
+
+
+def _parse_amount(value, name):
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a number')
+
+
+def _failed_payment_filters():
+    """
+    Read and validate the failed payments filters from the query string
+    
+    Returns:
+        dict: statuses, start, end (exclusive, or None), min_amount, max_amount
+        
+    Raises:
+        ValueError: Unknown status, malformed bound or amount, or an empty range
+    """
+    known = {status for _, statuses in FAILED_PAYMENT_SOURCES.values() for status in statuses}
+    status = request.args.get('status', '')
+    statuses = {value.strip() for value in status.split(',') if value.strip()} or known
+    if not statuses <= known:
+        raise ValueError(f"status must be one of: {', '.join(sorted(known))}")
+    
+    start = request.args.get('from')
+    end = request.args.get('to')
+    start = _parse_bound(start, 'from') if start else datetime.utcnow() - timedelta(days=30)
+    end = _parse_bound(end, 'to', end_of_day=True) if end else None
+    if end is not None and start >= end:
+        raise ValueError('from must be before to')
+    
+    min_amount = request.args.get('min_amount')
+    max_amount = request.args.get('max_amount')
+    return {
+        'statuses': statuses,
+        'start': start,
+        'end': end,
+        'min_amount': _parse_amount(min_amount, 'min_amount') if min_amount else None,
+        'max_amount': _parse_amount(max_amount, 'max_amount') if max_amount else None,
+    }
+
+
+def _failed_source_conditions(source, filters):
+    """WHERE conditions for one source, or None when the filters exclude it entirely"""
+    model, failed_statuses = FAILED_PAYMENT_SOURCES[source]
+    statuses = [status for status in failed_statuses if status in filters['statuses']]
+    has_amount = hasattr(model, 'amount')
+    if not statuses or (not has_amount and (filters['min_amount'] is not None or filters['max_amount'] is not None)):
+        return None
+    
+    conditions = [model.status.in_(statuses), model.created_at >= filters['start']]
+    if filters['end'] is not None:
+        conditions.append(model.created_at < filters['end'])
+    if filters['min_amount'] is not None:
+        conditions.append(model.amount >= filters['min_amount'])
+    if filters['max_amount'] is not None:
+        conditions.append(model.amount <= filters['max_amount'])
+    return conditions
+
+
+def _failed_source_query(source, filters):
+    conditions = _failed_source_conditions(source, filters)
+    if conditions is None:
+        return None
+    model = FAILED_PAYMENT_SOURCES[source][0]
+    query = model.query.filter(*conditions)
+    if model is StripeSubscription:
+        query = query.options(joinedload(StripeSubscription.user))
+    return query
+
+
+def _after_cursor(model, rank, cursor, sources):
+    """Rows of the source at position rank that sort after the cursor row of the merged list"""
+    created_at, row_id, source = cursor
+    cursor_rank = list(sources).index(source)
+    if rank > cursor_rank:
+        return model.created_at <= created_at
+    if rank < cursor_rank:
+        return model.created_at < created_at
+    return db.or_(
+        model.created_at < created_at,
+        db.and_(model.created_at == created_at, model.id < row_id)
+    )
+
+
+def _failed_payment_summary(filters):
+    """
+    Count every filtered row per source and status in one statement
+    
+    Each branch only reads the (status, created_at[, amount]) index, never the table.
+    """
+    branches = []
+    for source in FAILED_PAYMENT_SOURCES:
+        conditions = _failed_source_conditions(source, filters)
+        if conditions is None:
+            continue
+        model = FAILED_PAYMENT_SOURCES[source][0]
+        branches.append(
+            db.select(db.literal(source).label('source'), model.status, db.func.count().label('count'))
+            .where(*conditions)
+            .group_by(model.status)
+        )
+    
+    summary = {
+        'failed_payments': {'total': 0, 'by_status': {}},
+        'failed_subscriptions': {'total': 0, 'by_status': {}},
+    }
+    if branches:
+        rows = db.session.execute(db.union_all(*branches) if len(branches) > 1 else branches[0]).all()
+        for source, status, count in rows:
+            entry = summary['failed_payments' if source == 'payment' else 'failed_subscriptions']
+            entry['by_status'][status] = count
+            entry['total'] += count
+    return summary
@@ -1,10 +1,33 @@
 """
 Admin middleware for role-based access control
+
+Access tokens carry signed 'role' and 'premium' claims (User.token_claims), so the
+checks below need no database access. Changing a user's role or premium status bumps
+their claims epoch, which revokes access tokens holding the old claims; their refresh
+tokens stay valid, so /refresh issues an access token with the new claims.
 """
 from functools import wraps
 from flask import jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from .models import User
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from .current_user import resolve_current_user
+
+def current_role():
+    """Role from the token's claims; tokens issued before claims existed fall back to the user row"""
+    claims = get_jwt()
+    if 'role' in claims:
+        return claims['role']
+    user = resolve_current_user()
+    if not user:
+        return None
+    return user.token_claims()['role']
+
+def has_premium_claim():
+    """Premium status from the token's claims (with the same fallback as current_role)"""
+    claims = get_jwt()
+    if 'premium' in claims:
+        return bool(claims['premium'])
+    user = resolve_current_user()
+    return bool(user and user.has_premium_access)
 
 def admin_required(f):
     """Decorator that requires admin role"""
@@ -12,33 +35,20 @@ def admin_required(f):
     @jwt_required(locations=["cookies"])
     def decorated_function(*args, **kwargs):
         try:
-            current_user_id = get_jwt_identity()
-            if not current_user_id:
+            if not get_jwt_identity():
                 return jsonify({'error': 'Authentication required'}), 401
-            
-            # Handle both regular user ID (integer) and Google ID (string)
-            if isinstance(current_user_id, str) and current_user_id.isdigit() and len(current_user_id) < 10:
-                user = User.query.get(int(current_user_id))
-            elif isinstance(current_user_id, int):
-                user = User.query.get(current_user_id)
-            else:
-                # It's a google_id (string)
-                user = User.query.filter_by(google_id=current_user_id).first()
-            
-            # If still not found and was a string that could be converted, try by google_id
-            if not user and isinstance(current_user_id, str):
-                user = User.query.filter_by(google_id=current_user_id).first()
-            
-            if not user:
+
+            role = current_role()
+            if role is None:
                 return jsonify({'error': 'User not found'}), 404
-            
-            if not user.is_admin_user():
+
+            if role != 'admin':
                 return jsonify({'error': 'Admin access required'}), 403
-            
+
             return f(*args, **kwargs)
         except Exception as e:
             return jsonify({'error': 'Authentication failed'}), 401
-    
+
     return decorated_function
 
 def moderator_or_admin_required(f):
@@ -47,55 +57,26 @@ def moderator_or_admin_required(f):
     @jwt_required(locations=["cookies"])
     def decorated_function(*args, **kwargs):
         try:
-            current_user_id = get_jwt_identity()
-            if not current_user_id:
+            if not get_jwt_identity():
                 return jsonify({'error': 'Authentication required'}), 401
-            
-            # Handle both regular user ID (integer) and Google ID (string)
-            if isinstance(current_user_id, str) and current_user_id.isdigit() and len(current_user_id) < 10:
-                user = User.query.get(int(current_user_id))
-            elif isinstance(current_user_id, int):
-                user = User.query.get(current_user_id)
-            else:
-                # It's a google_id (string)
-                user = User.query.filter_by(google_id=current_user_id).first()
-            
-            # If still not found and was a string that could be converted, try by google_id
-            if not user and isinstance(current_user_id, str):
-                user = User.query.filter_by(google_id=current_user_id).first()
-            
-            if not user:
+
+            role = current_role()
+            if role is None:
                 return jsonify({'error': 'User not found'}), 404
-            
-            if not (user.has_role('admin') or user.has_role('moderator')):
+
+            if role not in ('admin', 'moderator'):
                 return jsonify({'error': 'Moderator or admin access required'}), 403
-            
+
             return f(*args, **kwargs)
         except Exception as e:
             return jsonify({'error': 'Authentication failed'}), 401
-    
+
     return decorated_function
 
 def get_current_admin_user():
     """Get current admin user from JWT token"""
     try:
-        current_user_id = get_jwt_identity()
-        if not current_user_id:
-            return None
-        
-        # Handle both regular user ID (integer) and Google ID (string)
-        if isinstance(current_user_id, str) and current_user_id.isdigit() and len(current_user_id) < 10:
-            user = User.query.get(int(current_user_id))
-        elif isinstance(current_user_id, int):
-            user = User.query.get(current_user_id)
-        else:
-            # It's a google_id (string)
-            user = User.query.filter_by(google_id=current_user_id).first()
-        
-        # If still not found and was a string that could be converted, try by google_id
-        if not user and isinstance(current_user_id, str):
-            user = User.query.filter_by(google_id=current_user_id).first()
-        
+        user = resolve_current_user()
         if user and user.is_admin_user():
             return user
         return None
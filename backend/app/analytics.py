@@ -0,0 +1,174 @@
+"""
+Daily rollups for admin analytics
+
+Every tracked event bumps one daily_metrics counter from a flush event, inside the
+transaction that writes the row, so the rollups need no separate job and charts are
+read in O(days) instead of scanning the source tables. `flask backfill-daily-metrics`
+rebuilds the counters from the source tables.
+
+Both paths date an event by the same timestamp (BACKFILL_SOURCES): a payment that
+turns failed counts on its created_at, a premium conversion on premium_since or else
+the signup day, so a backfill never moves history.
+"""
+from datetime import date, timedelta
+import click
+from flask.cli import with_appcontext
+from .extensions import db
+from .models import User, Quiz, QuizAttempt, Payment, OfflinePayment, DailyMetric
+
+METRICS = (
+    'signups',
+    'quizzes_created',
+    'attempts',
+    'premium_conversions',
+    'failed_payments',
+    'offline_payments_approved',
+)
+
+GRANULARITIES = ('day', 'week', 'month')
+
+
+def _count(connection, metric, timestamp):
+    """Bump metric on the day of timestamp; events without one are not counted, as in the backfill"""
+    if timestamp is not None:
+        DailyMetric.increment(connection, metric, timestamp.date())
+
+
+def _became(target, name, value):
+    """True if this flush changed attribute `name` to `value`"""
+    history = db.inspect(target).attrs[name].history
+    return bool(history.added) and history.added[0] == value and (
+        not history.deleted or history.deleted[0] != value
+    )
+
+
+def _user_inserted(mapper, connection, target):
+    _count(connection, 'signups', target.created_at)
+    if target.has_premium_access:
+        _count(connection, 'premium_conversions', target.premium_since or target.created_at)
+
+
+def _user_updated(mapper, connection, target):
+    if _became(target, 'has_premium_access', True):
+        _count(connection, 'premium_conversions', target.premium_since or target.created_at)
+
+
+def _quiz_inserted(mapper, connection, target):
+    _count(connection, 'quizzes_created', target.created_at)
+
+
+def _attempt_inserted(mapper, connection, target):
+    _count(connection, 'attempts', target.created_at)
+
+
+def _payment_inserted(mapper, connection, target):
+    if target.status == 'failed':
+        _count(connection, 'failed_payments', target.created_at)
+
+
+def _payment_updated(mapper, connection, target):
+    if _became(target, 'status', 'failed'):
+        _count(connection, 'failed_payments', target.created_at)
+
+
+def _offline_payment_updated(mapper, connection, target):
+    if _became(target, 'status', 'approved'):
+        _count(connection, 'offline_payments_approved', target.approved_at)
+
+
+db.event.listen(User, 'after_insert', _user_inserted)
+db.event.listen(User, 'after_update', _user_updated)
+db.event.listen(Quiz, 'after_insert', _quiz_inserted)
+db.event.listen(QuizAttempt, 'after_insert', _attempt_inserted)
+db.event.listen(Payment, 'after_insert', _payment_inserted)
+db.event.listen(Payment, 'after_update', _payment_updated)
+db.event.listen(OfflinePayment, 'after_update', _offline_payment_updated)
+
+
+def bucket_start(day, granularity):
+    """First day of the bucket that contains `day`"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _buckets(start, end, granularity):
+    """Bucket start days covering [start, end]"""
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        if granularity == 'day':
+            current += timedelta(days=1)
+        elif granularity == 'week':
+            current += timedelta(days=7)
+        else:
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return buckets
+
+
+def get_series(start, end, granularity='day', metrics=METRICS):
+    """
+    Read rollups for [start, end] grouped into day/week/month buckets
+
+    Returns:
+        dict: {'buckets': [iso day, ...], 'series': {metric: [value per bucket]}, 'totals': {metric: sum}}
+    """
+    buckets = _buckets(start, end, granularity)
+    index = {bucket: position for position, bucket in enumerate(buckets)}
+    series = {metric: [0] * len(buckets) for metric in metrics}
+
+    rows = db.session.query(DailyMetric.day, DailyMetric.metric, DailyMetric.value).filter(
+        DailyMetric.day >= start,
+        DailyMetric.day <= end,
+        DailyMetric.metric.in_(metrics)
+    ).all()
+    for row in rows:
+        series[row.metric][index[bucket_start(row.day, granularity)]] += row.value
+
+    return {
+        'buckets': [bucket.isoformat() for bucket in buckets],
+        'series': series,
+        'totals': {metric: sum(values) for metric, values in series.items()}
+    }
+
+
+# metric -> (model, timestamp column, extra filter) counted by the backfill; the flush
+# handlers above date their events by the same timestamps
+BACKFILL_SOURCES = {
+    'signups': (User, User.created_at, None),
+    'quizzes_created': (Quiz, Quiz.created_at, None),
+    'attempts': (QuizAttempt, QuizAttempt.created_at, None),
+    'premium_conversions': (User, db.func.coalesce(User.premium_since, User.created_at), User.has_premium_access.is_(True)),
+    'failed_payments': (Payment, Payment.created_at, Payment.status == 'failed'),
+    'offline_payments_approved': (OfflinePayment, OfflinePayment.approved_at, OfflinePayment.status == 'approved'),
+}
+
+
+def backfill_daily_metrics():
+    """Rebuild every rollup from the source tables with one GROUP BY per metric; returns rows written"""
+    DailyMetric.query.delete(synchronize_session=False)
+    written = 0
+    for metric, (model, timestamp, condition) in BACKFILL_SOURCES.items():
+        day = db.func.date(timestamp)
+        query = db.session.query(day, db.func.count()).select_from(model).filter(timestamp.isnot(None))
+        if condition is not None:
+            query = query.filter(condition)
+        rows = query.group_by(day).all()
+        if rows:
+            db.session.execute(DailyMetric.__table__.insert(), [
+                {'day': date.fromisoformat(str(row[0])), 'metric': metric, 'value': row[1]} for row in rows
+            ])
+        written += len(rows)
+    db.session.commit()
+    return written
+
+
+@click.command('backfill-daily-metrics')
+@with_appcontext
+def backfill_daily_metrics_command():
+    """Recompute the daily analytics rollups from the source tables"""
+    written = backfill_daily_metrics()
+    click.echo(f"Wrote {written} daily metric rows")
@@ -0,0 +1,70 @@
+"""
+Bloom filter used as a fast negative check for blacklisted JWT IDs
+"""
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings
+
+    A miss is definitive; a hit only means the value is probably present and
+    must be confirmed against the database.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        if capacity < 1:
+            capacity = 1
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, value):
+        """Add a value to the filter"""
+        for pos in self._positions(value):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        bits = self._bits
+        for pos in self._positions(value):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def memory_bytes(self):
+        """Size of the bit array in bytes"""
+        return len(self._bits)
+
+    @property
+    def false_positive_rate(self):
+        """Estimated false-positive rate for the current number of entries"""
+        if self.count == 0:
+            return 0.0
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def stats(self):
+        """Return sizing and accuracy figures for diagnostics"""
+        return {
+            'entries': self.count,
+            'capacity': self.capacity,
+            'bits': self.num_bits,
+            'hashes': self.num_hashes,
+            'memory_bytes': self.memory_bytes,
+            'target_false_positive_rate': self.error_rate,
+            'estimated_false_positive_rate': self.false_positive_rate
+        }
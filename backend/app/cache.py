@@ -0,0 +1,381 @@
+"""
+Two-tier application cache
+
+- local tier: per-process LRU with a TTL per entry and a size bound (CACHE_LOCAL_MAX_ENTRIES)
+- shared tier (optional, CACHE_SHARED_URL): a Redis server shared by every worker
+  ('redis://...', needs the redis package) or MemoryBackend, an in-process stand-in
+  speaking the same commands ('memory://', used by the tests)
+
+Values are read local tier first, then shared tier (refilling the local tier). With a
+shared tier, local entries live at most CACHE_LOCAL_TTL_SECONDS, so invalidations made
+by other workers are seen within that bound.
+
+Entries can carry tags (e.g. 'quiz:<id>'); invalidate_tags drops every entry tagged with
+any of them. Each tag has a version counter (in the shared tier when there is one) and an
+entry only counts as a hit while the versions it was stored with are current.
+
+get_or_set coalesces misses: one thread per process computes a missing key while the
+others wait for its result, and with a shared tier a short lock key makes one worker
+compute it while the other workers poll for the value.
+"""
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class LocalCache:
+    """Per-process LRU tier with per-entry TTL, size-based eviction and tag generations"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires, value, tags)
+        self._tagged = {}  # tag -> keys
+        self._generations = {}  # tag -> bumped on every invalidation
+
+    def generations(self, tags):
+        with self._lock:
+            return {tag: self._generations.get(tag, 0) for tag in tags}
+
+    def get(self, key):
+        """Return the cached value or MISSING"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            if entry[0] <= time.monotonic():
+                self._discard(key)
+                return MISSING
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl, tags=(), generations=None):
+        """
+        Store a value for ttl seconds; skipped if one of its tags was invalidated since
+        `generations` (from generations()) was taken, so a stale recomputation never lands
+        """
+        with self._lock:
+            if generations and any(self._generations.get(tag, 0) != seen for tag, seen in generations.items()):
+                return
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._tagged.pop(tag, ()):
+                    self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tagged.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+
+class MemoryBackend:
+    """
+    In-process stand-in for a Redis server: the subset of redis-py's client API the
+    shared tier uses (get, mget, set with ex/nx, delete, incr, pipeline), bytes values
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = {}  # name -> (expires or None, bytes)
+
+    def _live(self, name):
+        item = self._data.get(name)
+        if item is not None and item[0] is not None and item[0] <= time.monotonic():
+            del self._data[name]
+            return None
+        return item
+
+    def get(self, name):
+        with self._lock:
+            item = self._live(name)
+            return item[1] if item else None
+
+    def mget(self, names):
+        with self._lock:
+            return [item[1] if item else None for item in map(self._live, names)]
+
+    def set(self, name, value, ex=None, nx=False):
+        with self._lock:
+            if nx and self._live(name) is not None:
+                return None
+            if isinstance(value, int):
+                value = str(value)
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            self._data[name] = (time.monotonic() + ex if ex else None, value)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            item = self._live(name)
+            value = int(item[1]) + amount if item else amount
+            self._data[name] = (item[0] if item else None, str(value).encode('ascii'))
+            return value
+
+    def pipeline(self, transaction=True):
+        return _MemoryPipeline(self)
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+
+
+class _MemoryPipeline:
+    """Queues set() calls for MemoryBackend like a redis-py pipeline"""
+
+    def __init__(self, backend):
+        self._backend = backend
+        self._calls = []
+
+    def set(self, *args, **kwargs):
+        self._calls.append((args, kwargs))
+        return self
+
+    def execute(self):
+        return [self._backend.set(*args, **kwargs) for args, kwargs in self._calls]
+
+
+def shared_backend(url):
+    """Build the shared tier client for CACHE_SHARED_URL (None for no shared tier)"""
+    if not url:
+        return None
+    if url == 'memory://':
+        return MemoryBackend()
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError('CACHE_SHARED_URL points at Redis but the redis package is not installed')
+    return redis.Redis.from_url(url)
+
+
+class _Call:
+    """One in-flight get_or_set computation that other threads wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = MISSING
+
+
+class Cache:
+    """Local LRU tier in front of an optional shared tier, with tags and coalesced misses"""
+
+    def __init__(self):
+        self.local = LocalCache()
+        self.shared = None
+        self.default_ttl = 300
+        self.local_ttl = 5
+        self.prefix = 'quizapp:'
+        self.coalesce_timeout = 10
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.hits = self.shared_hits = self.misses = self.computations = 0
+
+    def init_app(self, app):
+        self.local = LocalCache(app.config.get('CACHE_LOCAL_MAX_ENTRIES', 10000))
+        self.shared = shared_backend(app.config.get('CACHE_SHARED_URL'))
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL_SECONDS', self.default_ttl)
+        self.local_ttl = app.config.get('CACHE_LOCAL_TTL_SECONDS', self.local_ttl)
+        self.prefix = app.config.get('CACHE_KEY_PREFIX', self.prefix)
+        self.coalesce_timeout = app.config.get('CACHE_COALESCE_TIMEOUT_SECONDS', self.coalesce_timeout)
+        app.extensions['cache'] = self
+
+    # Shared tier helpers; a failing shared tier degrades to local-only caching
+
+    def _shared_call(self, method, *args, **kwargs):
+        try:
+            return getattr(self.shared, method)(*args, **kwargs)
+        except Exception as e:
+            logging.warning(f"Shared cache {method} failed: {str(e)}")
+            return None
+
+    def _tag_versions(self, tags):
+        """Current shared version of each tag"""
+        tags = sorted(set(tags))
+        if not tags or self.shared is None:
+            return {}
+        values = self._shared_call('mget', [f'{self.prefix}tag:{tag}' for tag in tags]) or [None] * len(tags)
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    def _local_ttl(self, ttl):
+        return min(ttl, self.local_ttl) if self.shared is not None else ttl
+
+    # Public API
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys):
+        """Return {key: value} for the keys that are cached"""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key)
+            if value is MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        self.hits += len(found)
+
+        if missing and self.shared is not None:
+            raw = self._shared_call('mget', [self.prefix + key for key in missing]) or [None] * len(missing)
+            entries = {key: pickle.loads(blob) for key, blob in zip(missing, raw) if blob is not None}
+            current = self._tag_versions(tag for _, _, versions in entries.values() for tag in versions)
+            for key, (value, ttl, versions) in entries.items():
+                if all(current.get(tag, 0) == seen for tag, seen in versions.items()):
+                    found[key] = value
+                    self.shared_hits += 1
+                    self.local.set(key, value, self._local_ttl(ttl), tuple(versions))
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key, value, ttl=None, tags=()):
+        self.set_many({key: value}, ttl, tags)
+
+    def set_many(self, mapping, ttl=None, tags=(), _versions=None):
+        """Store every key of mapping with the same TTL and tags"""
+        ttl = ttl or self.default_ttl
+        tags = tuple(tags)
+        local_generations, shared_versions = _versions or (None, None)
+        for key, value in mapping.items():
+            self.local.set(key, value, self._local_ttl(ttl), tags, local_generations)
+
+        if self.shared is not None and mapping:
+            current = self._tag_versions(tags)
+            if shared_versions is not None and current != shared_versions:
+                return  # invalidated while the value was being computed
+            pipe = self.shared.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(self.prefix + key, pickle.dumps((value, ttl, current), pickle.HIGHEST_PROTOCOL), ex=ttl)
+            try:
+                pipe.execute()
+            except Exception as e:
+                logging.warning(f"Shared cache set failed: {str(e)}")
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self._shared_call('delete', self.prefix + key)
+
+    def invalidate_tags(self, *tags):
+        """Drop every entry stored with any of these tags, in this process and in the shared tier"""
+        self.local.invalidate_tags(tags)
+        if self.shared is not None:
+            for tag in tags:
+                self._shared_call('incr', f'{self.prefix}tag:{tag}')
+
+    def get_or_set(self, key, compute, ttl=None, tags=()):
+        """
+        Return the cached value, computing and storing it on a miss
+
+        Concurrent misses for one key run compute once: other threads of this process
+        wait for it, and other workers wait on a shared lock key and read the result.
+        """
+        value = self.local.get(key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+
+        with self._inflight_lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+        if not leader:
+            call.done.wait(self.coalesce_timeout)
+            if call.value is not MISSING:
+                self.hits += 1
+                return call.value
+            return self._compute(key, compute, ttl, tags)  # the leader failed or timed out
+
+        try:
+            call.value = self._get_or_compute(key, compute, ttl, tags)
+            return call.value
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    def _get_or_compute(self, key, compute, ttl, tags):
+        found = self.get_many([key])
+        if key in found:
+            return found[key]
+        if self.shared is None:
+            return self._compute(key, compute, ttl, tags)
+
+        lock = f'{self.prefix}lock:{key}'
+        if self._shared_call('set', lock, b'1', ex=self.coalesce_timeout, nx=True):
+            try:
+                return self._compute(key, compute, ttl, tags)
+            finally:
+                self._shared_call('delete', lock)
+
+        # Another worker is computing it: wait for its value rather than recomputing
+        deadline = time.monotonic() + self.coalesce_timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.02)
+            found = self.get_many([key])
+            if key in found:
+                return found[key]
+            if self._shared_call('get', lock) is None:
+                break
+        return self._compute(key, compute, ttl, tags)
+
+    def _compute(self, key, compute, ttl, tags):
+        versions = (self.local.generations(tags), self._tag_versions(tags) if self.shared is not None else None)
+        value = compute()
+        self.computations += 1
+        self.set_many({key: value}, ttl, tags, _versions=versions)
+        return value
+
+    def clear(self):
+        """Empty the local tier (the shared tier is left to its TTLs)"""
+        self.local.clear()
+        self.hits = self.shared_hits = self.misses = self.computations = 0
+
+    def stats(self):
+        return {
+            'local_entries': len(self.local),
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'computations': self.computations,
+            'shared': self.shared is not None,
+        }
+
+
+cache = Cache()
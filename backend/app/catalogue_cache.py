@@ -0,0 +1,121 @@
+"""
+Pre-encoded responses for the public quiz catalogue (GET /quizzes)
+
+Each normalized listing (category, difficulty, search, summary and page arguments) is
+cached in app.cache as the finished JSON body plus its gzip (and, when the brotli
+package is installed, brotli) encoding, together with its ETag.
+A hit therefore costs no ORM work, no JSON encoding and no compression.
+
+Entries are tagged 'quizzes' and dropped after any commit that wrote a Quiz, Question
+or AnswerOption (QuizController.create_quiz / update_quiz / update_question /
+delete_quiz as well as any other ORM write). With a shared cache tier every worker
+sees the invalidation within CACHE_LOCAL_TTL_SECONDS; entries live up to
+QUIZ_CATALOGUE_CACHE_TTL_SECONDS. Without one (CACHE_SHARED_URL unset) only the
+committing worker hears of it, so entries live at most CACHE_LOCAL_TTL_SECONDS
+(5s by default), the same bound other workers' writes go unseen with a shared tier.
+"""
+import gzip
+import json
+from collections import namedtuple
+from flask import current_app, g
+from . import fast_json
+from .cache import cache
+from .extensions import db
+from .read_replica import replica_engine
+from .models import Quiz, Question, AnswerOption
+
+try:
+    import brotli
+except ImportError:  # optional: brotli variants are skipped without it
+    brotli = None
+
+CATALOGUE_TAG = 'quizzes'
+
+# Bodies shorter than this are served uncompressed
+MIN_COMPRESS_BYTES = 512
+
+# body / gzip / br: bytes (gzip and br are None when not worth compressing)
+EncodedResponse = namedtuple('EncodedResponse', 'body gzip br etag')
+
+
+class CatalogueError(Exception):
+    """The listing could not be built; nothing is cached"""
+
+
+def catalogue_key(category, difficulty, search, summary, page=None):
+    """Cache key of one normalized listing; page is (cursor, limit, include_total) or None"""
+    parts = [category or '', difficulty or '', (search or '').strip(), int(bool(summary))]
+    if page is not None:
+        parts.extend(['page', page[0] or '', page[1], int(bool(page[2]))])
+    return 'catalogue:' + json.dumps(parts, separators=(',', ':'))
+
+
+def encode_response(payload, etag):
+    """Serialize once and precompute the compressed variants"""
+    body = fast_json.dumps(payload)
+    gzipped = compressed = None
+    if len(body) >= MIN_COMPRESS_BYTES:
+        gzipped = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=5)
+    return EncodedResponse(body, gzipped, compressed, etag)
+
+
+def get_encoded(key, build):
+    """
+    Return the EncodedResponse for key, running build() once on a miss
+
+    Listings built from the read replica are kept no longer than the replica can lag.
+    A request pinned to the primary (read-your-writes) must not see an entry built from
+    the replica, so it builds its own listing and leaves the cache alone.
+    """
+    if replica_engine() is not None and not g.get('_read_replica'):
+        return build()
+    ttl = current_app.config.get('QUIZ_CATALOGUE_CACHE_TTL_SECONDS', 60)
+    if cache.shared is None:
+        ttl = min(ttl, cache.local_ttl)
+    if g.get('_read_replica') and replica_engine() is not None:
+        ttl = min(ttl, current_app.config.get('REPLICA_SYNC_SECONDS') or ttl)
+    return cache.get_or_set(key, build, ttl=ttl, tags=[CATALOGUE_TAG])
+
+
+def variant_etags(etag):
+    """ETags of the identity, gzip and brotli variants of one listing version"""
+    return [etag, f'{etag}-gzip', f'{etag}-br']
+
+
+def pick_encoding(entry, accept_encodings):
+    """(body, Content-Encoding or None) best matching the request's Accept-Encoding"""
+    offered = [name for name, body in (('br', entry.br), ('gzip', entry.gzip)) if body is not None]
+    best = accept_encodings.best_match(offered + ['identity'], default='identity') if offered else 'identity'
+    if best == 'br':
+        return entry.br, 'br'
+    if best == 'gzip':
+        return entry.gzip, 'gzip'
+    return entry.body, None
+
+
+_CATALOGUE_MODELS = (Quiz, Question, AnswerOption)
+
+
+def _note_catalogue_writes(session, flush_context, instances):
+    if session.info.get('catalogue_dirty'):
+        return
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, _CATALOGUE_MODELS):
+            session.info['catalogue_dirty'] = True
+            return
+
+
+def _invalidate_after_commit(session):
+    if session.info.pop('catalogue_dirty', False):
+        cache.invalidate_tags(CATALOGUE_TAG)
+
+
+def _forget_writes(session, previous_transaction):
+    session.info.pop('catalogue_dirty', None)
+
+
+db.event.listen(db.session, 'before_flush', _note_catalogue_writes)
+db.event.listen(db.session, 'after_commit', _invalidate_after_commit)
+db.event.listen(db.session, 'after_soft_rollback', _forget_writes)
@@ -0,0 +1,160 @@
+"""
+In-process cache of compiled quizzes
+
+A quiz is compiled once per revision (Quiz.updated_at) into:
+- options_payload: the redacted quiz (no correct answers) already serialized to JSON bytes,
+  served as-is by /quiz/<id>/options
+- correct: a compact array of correct option indices used for grading
+"""
+import threading
+from array import array
+from collections import OrderedDict, namedtuple
+from .extensions import db
+from . import fast_json
+from .models import Quiz
+
+# Marks a question without a usable correct answer (and a skipped answer when grading)
+NO_ANSWER = 0xFFFF
+
+# correct / option_counts: array('H') with one entry per question
+CompiledQuiz = namedtuple('CompiledQuiz', 'quiz_id version correct option_counts options_payload')
+
+POINTS_PER_CORRECT_ANSWER = 100
+
+
+def _legacy_question(item):
+    """Normalize one legacy blob entry to (redacted dict, correct index or None, option count)"""
+    if not isinstance(item, dict):
+        item = {}
+    options = item.get('options') or []
+    index = item.get('correct_answer', item.get('correctAnswer'))
+    try:
+        index = int(index)
+    except (TypeError, ValueError):
+        index = None
+    if index is not None and not 0 <= index < len(options):
+        index = None
+    redacted = {key: value for key, value in item.items() if key not in ('correct_answer', 'correctAnswer')}
+    return redacted, index, len(options)
+
+
+def compile_quiz(quiz):
+    """Build the CompiledQuiz of a loaded quiz (question rows or legacy blob)"""
+    payload = quiz.to_summary_dict()
+    if quiz.questions:
+        payload['questions'] = [question.to_dict(include_answer=False) for question in quiz.questions]
+        correct = [question.correct_index for question in quiz.questions]
+        option_counts = [len(question.options) for question in quiz.questions]
+    else:
+        # Not yet migrated from the legacy blob
+        compiled = [_legacy_question(item) for item in quiz.legacy_questions()]
+        payload['questions'] = [redacted for redacted, _, _ in compiled]
+        correct = [index for _, index, _ in compiled]
+        option_counts = [count for _, _, count in compiled]
+
+    return CompiledQuiz(
+        quiz.id,
+        quiz.updated_at or quiz.created_at,
+        array('H', (NO_ANSWER if index is None else index for index in correct)),
+        array('H', option_counts),
+        fast_json.dumps(payload)
+    )
+
+
+def grade(compiled, answers):
+    """
+    Score an answer vector against a compiled quiz
+    
+    Args:
+        compiled (CompiledQuiz): Compiled quiz
+        answers (list): Chosen option index per question, None for skipped
+        
+    Returns:
+        tuple: (results string of '1'/'0'/'-', correct_count, gradable_count)
+    """
+    chosen = array('H', (NO_ANSWER if answer is None else answer for answer in answers))
+    gradable = len(compiled.correct) - compiled.correct.count(NO_ANSWER)
+    if chosen == compiled.correct:
+        # Perfect run: one C-level array comparison; ungradable questions still read '-'
+        if gradable == len(chosen):
+            return '1' * len(chosen), gradable, gradable
+        return ''.join('-' if correct == NO_ANSWER else '1' for correct in compiled.correct), gradable, gradable
+    results = ''.join(
+        '-' if correct == NO_ANSWER else ('1' if answer == correct else '0')
+        for answer, correct in zip(chosen, compiled.correct)
+    )
+    return results, results.count('1'), gradable
+
+
+class CompiledQuizCache:
+    """
+    LRU of compiled quizzes, keyed by quiz id and checked against the quiz version
+    
+    A lookup costs one primary-key read of the quiz version (or none when the caller
+    already has it); the questions are only loaded when the quiz changed since it was
+    compiled, so a burst of requests for the same quiz compiles it once.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('COMPILED_QUIZ_CACHE_SIZE', self.max_entries)
+
+    def get(self, quiz_id, version=None):
+        """
+        Return the current CompiledQuiz of a quiz, or None if the quiz does not exist
+        
+        Args:
+            quiz_id (int): Quiz ID
+            version (datetime, optional): Quiz version the caller already read
+                (updated_at, else created_at); read from the database when omitted
+        """
+        if version is None:
+            row = db.session.query(Quiz.updated_at, Quiz.created_at).filter(Quiz.id == quiz_id).first()
+            if row is None:
+                self.invalidate(quiz_id)
+                return None
+            version = row.updated_at or row.created_at
+
+        with self._lock:
+            compiled = self._entries.get(quiz_id)
+            if compiled is not None and compiled.version == version:
+                self._entries.move_to_end(quiz_id)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        quiz = db.session.get(Quiz, quiz_id)
+        if quiz is None:
+            return None
+        compiled = compile_quiz(quiz)
+        with self._lock:
+            self._entries[quiz_id] = compiled
+            self._entries.move_to_end(quiz_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, quiz_id):
+        with self._lock:
+            self._entries.pop(quiz_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'payload_bytes': sum(len(entry.options_payload) for entry in self._entries.values())
+        }
+
+
+compiled_quizzes = CompiledQuizCache()
@@ -0,0 +1,152 @@
+"""
+Resolution of the JWT identity to the current User
+
+A token's 'sub' is either str(user.id) or, for OAuth accounts, the google_id.
+resolve_current_user() maps it to a User once per request (memoized on flask.g),
+backed by a per-process LRU of identity -> user column values with a short TTL,
+so repeated requests by the same user attach the cached row to the session
+without a SELECT.
+
+Entries are invalidated after any commit that updated or deleted the user row
+(profile edits, promote/demote, premium changes); changes committed by other
+processes become visible within the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from .extensions import db
+from .models import User
+
+# Local ids are small integers; larger numeric identities are Google account ids
+MAX_LOCAL_USER_ID = 1000000000
+
+
+class CurrentUserCache:
+    """identity -> (expires_at, user id, column values), least recently used evicted first"""
+
+    def __init__(self, max_entries=4096, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._identities = {}  # user id -> identities cached for it
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('CURRENT_USER_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('CURRENT_USER_CACHE_TTL_SECONDS', self.ttl)
+
+    def get(self, identity):
+        """Return cached column values for an identity, or None"""
+        with self._lock:
+            entry = self._entries.get(identity)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(identity)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, identity, user):
+        if self.ttl <= 0:
+            return
+        values = {column.key: getattr(user, column.key) for column in User.__mapper__.column_attrs}
+        with self._lock:
+            self._entries[identity] = (time.monotonic() + self.ttl, user.id, values)
+            self._entries.move_to_end(identity)
+            self._identities.setdefault(user.id, set()).add(identity)
+            while len(self._entries) > self.max_entries:
+                evicted, (_, user_id, _) = self._entries.popitem(last=False)
+                self._identities.get(user_id, set()).discard(evicted)
+
+    def invalidate(self, user_id):
+        """Drop every identity cached for a user"""
+        with self._lock:
+            for identity in self._identities.pop(user_id, ()):
+                self._entries.pop(identity, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._identities.clear()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+current_user_cache = CurrentUserCache()
+
+
+def _attach(values):
+    """Turn cached column values into a persistent User in the current session without a SELECT"""
+    user = User.__mapper__.class_manager.new_instance()
+    for key, value in values.items():
+        set_committed_value(user, key, value)
+    make_transient_to_detached(user)
+    # Returns the instance already in the identity map if the row was loaded earlier
+    return db.session.merge(user, load=False)
+
+
+def find_user_by_identity(identity):
+    """Look a JWT identity up in the database: by id for small numbers, otherwise by google_id"""
+    identity = str(identity)
+    user = None
+    if identity.isdigit() and int(identity) < MAX_LOCAL_USER_ID:
+        user = db.session.get(User, int(identity))
+    if user is None:
+        user = User.query.filter_by(google_id=identity).first()
+    return user
+
+
+def resolve_current_user():
+    """
+    Return the User of the verified JWT, or None if there is no token or no such user
+
+    Call after jwt_required / verify_jwt_in_request.
+    """
+    if has_request_context() and '_current_user' in g:
+        return g._current_user
+
+    identity = get_jwt_identity()
+    user = None
+    if identity is not None:
+        identity = str(identity)
+        values = current_user_cache.get(identity)
+        if values is not None:
+            user = _attach(values)
+        else:
+            user = find_user_by_identity(identity)
+            # A row read from the lagging replica could undo an invalidation, so only cache primary reads
+            if user is not None and not (has_request_context() and g.get('_read_replica')):
+                current_user_cache.put(identity, user)
+
+    if has_request_context():
+        g._current_user = user
+    return user
+
+
+def _collect_changed_users(session, flush_context, instances):
+    changed = session.info.setdefault('changed_user_ids', set())
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            changed.add(instance.id)
+
+
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        current_user_cache.invalidate(user_id)
+
+
+def _forget_changed_users(session, previous_transaction):
+    session.info.pop('changed_user_ids', None)
+
+
+# Invalidate once the change is committed, so a concurrent request cannot re-cache the old row
+db.event.listen(db.session, 'before_flush', _collect_changed_users)
+db.event.listen(db.session, 'after_commit', _invalidate_changed_users)
+db.event.listen(db.session, 'after_soft_rollback', _forget_changed_users)
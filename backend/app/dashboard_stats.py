@@ -0,0 +1,174 @@
+"""
+Cached admin dashboard counters
+
+The counters are computed with two aggregate queries (conditional SUM(CASE ...) over
+users, scalar subqueries for the rest) and kept for DASHBOARD_STATS_TTL_SECONDS.
+Meanwhile writes made through the ORM in this process adjust them in place: mapper
+events record per-counter deltas on the session and they are applied once the
+transaction commits (and dropped on rollback). Registration, promote/demote, offline
+payment approval and the Stripe webhooks therefore never leave the cached dashboard
+stale, and a steady-state dashboard load costs no queries. Writes made by other
+workers show up when the TTL expires.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy.orm import object_session
+from .extensions import db
+from .models import User, Quiz, OfflinePayment, StripeSubscription
+
+NEW_USER_WINDOW = timedelta(days=30)
+
+
+def _is_new(created_at):
+    return created_at is not None and created_at >= datetime.utcnow() - NEW_USER_WINDOW
+
+
+# model -> {counter: predicate over an attribute getter}
+COUNTERS = {
+    User: {
+        'users_total': lambda get: True,
+        'users_admin': lambda get: get('role') == 'admin',
+        'users_premium': lambda get: bool(get('has_premium_access')),
+        'users_new': lambda get: _is_new(get('created_at')),
+    },
+    Quiz: {
+        'quizzes_total': lambda get: True,
+    },
+    OfflinePayment: {
+        'offline_pending': lambda get: get('status') == 'pending',
+        'offline_approved': lambda get: get('status') == 'approved',
+    },
+    StripeSubscription: {
+        'subscriptions_active': lambda get: get('status') == 'active',
+    },
+}
+
+
+class DashboardStats:
+    """Per-process dashboard counters with a TTL, adjusted by committed ORM writes"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._counters = None
+        self._computed_at = None
+        self._computed_monotonic = 0.0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('DASHBOARD_STATS_TTL_SECONDS', self.ttl)
+
+    @staticmethod
+    def compute():
+        """Read every counter from the database in two queries"""
+        window_start = datetime.utcnow() - NEW_USER_WINDOW
+        users = db.session.query(
+            db.func.count(User.id),
+            db.func.sum(db.case((User.role == 'admin', 1), else_=0)),
+            db.func.sum(db.case((User.has_premium_access.is_(True), 1), else_=0)),
+            db.func.sum(db.case((User.created_at >= window_start, 1), else_=0))
+        ).one()
+        others = db.session.query(
+            db.select(db.func.count(Quiz.id)).scalar_subquery(),
+            db.select(db.func.count(OfflinePayment.id)).where(OfflinePayment.status == 'pending').scalar_subquery(),
+            db.select(db.func.count(OfflinePayment.id)).where(OfflinePayment.status == 'approved').scalar_subquery(),
+            db.select(db.func.count(StripeSubscription.id)).where(StripeSubscription.status == 'active').scalar_subquery()
+        ).one()
+        return {
+            'users_total': users[0] or 0,
+            'users_admin': users[1] or 0,
+            'users_premium': users[2] or 0,
+            'users_new': users[3] or 0,
+            'quizzes_total': others[0] or 0,
+            'offline_pending': others[1] or 0,
+            'offline_approved': others[2] or 0,
+            'subscriptions_active': others[3] or 0,
+        }
+
+    def get(self):
+        """Return (counters, computed_at, age in seconds), recomputing once the TTL has passed"""
+        with self._lock:
+            if self._counters is not None and time.monotonic() - self._computed_monotonic < self.ttl:
+                return dict(self._counters), self._computed_at, time.monotonic() - self._computed_monotonic
+
+        counters = self.compute()
+        with self._lock:
+            self._counters = counters
+            self._computed_at = datetime.utcnow()
+            self._computed_monotonic = time.monotonic()
+            return dict(counters), self._computed_at, 0.0
+
+    def apply(self, deltas):
+        """Fold committed deltas into the cached counters (no-op until first computed)"""
+        with self._lock:
+            if self._counters is None:
+                return
+            for name, delta in deltas.items():
+                self._counters[name] = max(0, self._counters[name] + delta)
+
+    def clear(self):
+        with self._lock:
+            self._counters = None
+            self._computed_at = None
+
+
+dashboard_stats = DashboardStats()
+
+
+def _getter(target, old):
+    """Attribute getter for the row as it was before this flush (old) or as written"""
+    state = db.inspect(target)
+
+    def get(name):
+        if old:
+            history = state.attrs[name].history
+            if history.deleted:
+                return history.deleted[0]
+        return getattr(target, name)
+    return get
+
+
+def _record(target, deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    session = object_session(target)
+    if session is not None and deltas:
+        session.info.setdefault('dashboard_deltas', Counter()).update(deltas)
+
+
+def _membership(model, get):
+    return {name: predicate(get) for name, predicate in COUNTERS[model].items()}
+
+
+def _after_insert(mapper, connection, target):
+    member = _membership(mapper.class_, _getter(target, old=False))
+    _record(target, {name: 1 for name, inside in member.items() if inside})
+
+
+def _after_update(mapper, connection, target):
+    before = _membership(mapper.class_, _getter(target, old=True))
+    after = _membership(mapper.class_, _getter(target, old=False))
+    _record(target, {name: int(after[name]) - int(before[name]) for name in after})
+
+
+def _after_delete(mapper, connection, target):
+    member = _membership(mapper.class_, _getter(target, old=True))
+    _record(target, {name: -1 for name, inside in member.items() if inside})
+
+
+def _apply_deltas(session):
+    deltas = session.info.pop('dashboard_deltas', None)
+    if deltas:
+        dashboard_stats.apply(deltas)
+
+
+def _forget_deltas(session, previous_transaction):
+    session.info.pop('dashboard_deltas', None)
+
+
+for _model in COUNTERS:
+    db.event.listen(_model, 'after_insert', _after_insert)
+    db.event.listen(_model, 'after_update', _after_update)
+    db.event.listen(_model, 'after_delete', _after_delete)
+db.event.listen(db.session, 'after_commit', _apply_deltas)
+db.event.listen(db.session, 'after_soft_rollback', _forget_deltas)
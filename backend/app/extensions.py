@@ -1,4 +1,6 @@
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from authlib.integrations.flask_client import OAuth
 import os
 
@@ -12,4 +14,28 @@ google = oauth2.register(
         'scope': 'openid email profile'
     }
 )
-db = SQLAlchemy()
+
+
+class RoutingSession(Session):
+    """
+    Session that sends plain SELECTs to the 'replica' bind inside handlers marked with
+    app.read_replica.replica_reads; flushes, DML and everything else use the primary
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            engine = self._db.engines.get('replica')
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        return (
+            has_request_context()
+            and g.get('_read_replica', False)
+            and not self._flushing
+            and getattr(clause, 'is_select', False)
+        )
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
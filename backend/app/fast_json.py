@@ -0,0 +1,104 @@
+"""
+JSON encoding for API responses
+
+Every Flask-RESTful resource (through the Api's 'application/json' representation)
+and every jsonify() call (through app.json) is encoded here. With orjson installed
+the encoder is orjson, which also serializes datetime and date natively; without it
+the stdlib encoder is used with a default hook. Both write datetimes exactly like
+.isoformat(), so models can put datetimes in their dicts as they are.
+
+JSON_ENCODER selects 'auto' (orjson when installed), 'orjson' or 'stdlib'.
+"""
+import dataclasses
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from flask import current_app, make_response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used without it
+    orjson = None
+
+ENCODERS = ('auto', 'orjson', 'stdlib')
+
+
+def _default(value):
+    """Types the encoders do not handle natively"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _dumps_stdlib(value, pretty=False):
+    if pretty:
+        return json.dumps(value, default=_default, indent=2).encode('utf-8')
+    return json.dumps(value, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def _dumps_orjson(value, pretty=False):
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+    try:
+        return orjson.dumps(value, default=_default, option=option)
+    except TypeError:
+        # Beyond orjson (e.g. integers over 64 bits); the stdlib encoder takes anything json can
+        return _dumps_stdlib(value, pretty)
+
+
+_dumps = _dumps_orjson if orjson is not None else _dumps_stdlib
+
+
+def dumps(value, pretty=False):
+    """Encode value to UTF-8 JSON bytes with the configured encoder"""
+    return _dumps(value, pretty)
+
+
+def encoder_name():
+    return 'orjson' if _dumps is _dumps_orjson else 'stdlib'
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTful representation for application/json"""
+    response = make_response(dumps(data, pretty=current_app.debug) + b'\n', code)
+    response.headers.extend(headers or {})
+    return response
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """app.json provider so jsonify() shares the encoder"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, pretty=self._app.debug) + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Pick the encoder and install it for jsonify()"""
+    global _dumps
+    choice = app.config.get('JSON_ENCODER', 'auto')
+    if choice not in ENCODERS:
+        raise ValueError(f"JSON_ENCODER must be one of: {', '.join(ENCODERS)}")
+    if choice == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_ENCODER is orjson but the orjson package is not installed')
+    _dumps = _dumps_stdlib if choice == 'stdlib' or orjson is None else _dumps_orjson
+    app.json = FastJSONProvider(app)
+
+
+def init_api(api):
+    """Encode every resource response of the Api with dumps()"""
+    api.representations['application/json'] = output_json
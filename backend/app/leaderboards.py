@@ -0,0 +1,214 @@
+"""
+In-process leaderboards
+
+Boards (see ranking.Leaderboard):
+- 'global': total score over all attempts
+- 'category:<name>': total score over attempts at quizzes in that category
+- 'quiz:<id>': best score at one quiz, the earliest attempt winning ties
+
+Boards are fed incrementally from quiz_attempts in id order: after an attempt commits
+the saving worker pulls every attempt above its watermark (its own and any written by
+other workers), and readers poll at most once every `refresh_interval` seconds.
+Snapshots in leaderboard_snapshots let a new process skip replaying the full history.
+Deleting attempts bumps LeaderboardGeneration; every worker notices on its next pull
+and rebuilds its boards, since replaying above the watermark cannot take scores away.
+"""
+import threading
+import time
+from datetime import datetime
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from .extensions import db
+from .models import Quiz, QuizAttempt, LeaderboardSnapshot, LeaderboardGeneration
+from .ranking import Leaderboard
+
+GLOBAL_BOARD = 'global'
+
+
+def category_board(category):
+    return f'category:{category}'
+
+
+def quiz_board(quiz_id):
+    return f'quiz:{quiz_id}'
+
+
+def _to_timestamp(value):
+    """Naive UTC datetime (as stored in the database) to whole POSIX seconds"""
+    if value is None:
+        return 0
+    return int((value - datetime(1970, 1, 1)).total_seconds())
+
+
+class LeaderboardService:
+    """Registry of boards mirroring quiz_attempts up to a watermark attempt id"""
+
+    def __init__(self, refresh_interval=5):
+        self.refresh_interval = refresh_interval
+        # Held while pulling attempts so two threads never fold the same attempt twice
+        self._lock = threading.RLock()
+        self._boards = {}
+        self._watermark = 0
+        self._generation = 0
+        self._last_refresh = 0.0
+        self._loaded = False
+
+    def init_app(self, app):
+        """Boards are loaded lazily on first use so startup is not delayed by the replay"""
+        self.refresh_interval = app.config.get('LEADERBOARD_REFRESH_SECONDS', self.refresh_interval)
+
+    def load(self):
+        """(Re)build every board from the snapshots plus the attempts saved after them"""
+        generation = LeaderboardGeneration.current()
+        snapshots = LeaderboardSnapshot.query.all()
+        boards = {}
+        watermark = 0
+        # Snapshots are written together; mixed watermarks mean a partial write, so replay everything
+        watermarks = {snapshot.last_attempt_id for snapshot in snapshots}
+        if len(watermarks) == 1:
+            watermark = watermarks.pop()
+            boards = {snapshot.board: Leaderboard(snapshot.unpack()) for snapshot in snapshots}
+
+        with self._lock:
+            self._boards = boards
+            self._watermark = watermark
+            self._generation = generation
+            self._loaded = True
+            return self._pull()
+
+    def refresh(self):
+        """Fold in attempts saved since the last pull; returns how many were applied"""
+        with self._lock:
+            if LeaderboardGeneration.current() != self._generation:
+                # Attempts were deleted (possibly by another worker): rebuild from scratch
+                return self.load()
+            return self._pull()
+
+    def _pull(self):
+        with self._lock:
+            rows = db.session.query(
+                QuizAttempt.id, QuizAttempt.user_id, QuizAttempt.quiz_id, QuizAttempt.score,
+                QuizAttempt.created_at, Quiz.category
+            ).join(Quiz, Quiz.id == QuizAttempt.quiz_id).filter(
+                QuizAttempt.id > self._watermark
+            ).order_by(QuizAttempt.id).yield_per(10000)
+
+            applied = 0
+            for row in rows:
+                self._apply(row)
+                applied += 1
+            self._last_refresh = time.monotonic()
+            return applied
+
+    def _apply(self, row):
+        achieved_at = _to_timestamp(row.created_at)
+        self._board(GLOBAL_BOARD).add_score(row.user_id, row.score, achieved_at)
+        if row.category:
+            self._board(category_board(row.category)).add_score(row.user_id, row.score, achieved_at)
+        self._board(quiz_board(row.quiz_id)).offer_best(row.user_id, row.score, achieved_at)
+        self._watermark = row.id
+
+    def _board(self, name):
+        board = self._boards.get(name)
+        if board is None:
+            board = self._boards[name] = Leaderboard()
+        return board
+
+    def _maybe_refresh(self):
+        if not self._loaded:
+            self.load()
+        elif time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    def attempt_saved(self):
+        """
+        Called after an attempt commits: pull it (and anything else new) into the boards
+
+        Never raises; a failed pull is retried by the next refresh.
+        """
+        if not self._loaded:
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            current_app.logger.warning(f"Could not update leaderboards: {str(e)}")
+
+    def top(self, name, limit=10, offset=0):
+        """Return ([(rank, user_id, score)], board size)"""
+        with self._lock:
+            self._maybe_refresh()
+            board = self._boards.get(name)
+            if board is None:
+                return [], 0
+            return board.top(limit, offset), len(board)
+
+    def rank_of(self, name, user_id):
+        """Return (rank, score) of a user on a board, or None"""
+        with self._lock:
+            self._maybe_refresh()
+            board = self._boards.get(name)
+            return board.rank_of(user_id) if board is not None else None
+
+    def snapshot(self):
+        """Persist every board with the current watermark; returns the number of boards written"""
+        with self._lock:
+            # Always pull, so boards made stale by a deletion are never persisted
+            if self._loaded:
+                self.refresh()
+            else:
+                self.load()
+            watermark = self._watermark
+            packed = [(name, len(board), LeaderboardSnapshot.pack(board.entries()))
+                      for name, board in self._boards.items() if len(board)]
+
+        try:
+            LeaderboardSnapshot.query.delete(synchronize_session=False)
+            taken_at = datetime.utcnow()
+            db.session.add_all([
+                LeaderboardSnapshot(board=name, last_attempt_id=watermark, size=size, entries=entries,
+                                    taken_at=taken_at)
+                for name, size, entries in packed
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(packed)
+
+    @staticmethod
+    def discard_snapshots():
+        """
+        Drop persisted boards and bump the generation in the caller's transaction
+        (attempts were deleted), so every worker rebuilds its boards
+        """
+        LeaderboardSnapshot.query.delete(synchronize_session=False)
+        LeaderboardGeneration.bump()
+
+    def clear(self):
+        """Forget everything; the next read rebuilds from the database"""
+        with self._lock:
+            self._boards = {}
+            self._watermark = 0
+            self._loaded = False
+
+    def stats(self):
+        """Return board counts for diagnostics"""
+        return {
+            'boards': len(self._boards),
+            'entries': sum(len(board) for board in self._boards.values()),
+            'watermark': self._watermark,
+            'generation': self._generation,
+            'loaded': self._loaded
+        }
+
+
+leaderboards = LeaderboardService()
+
+
+@click.command('leaderboard-snapshot')
+@with_appcontext
+def leaderboard_snapshot_command():
+    """Persist the leaderboards so new workers start from a snapshot"""
+    count = leaderboards.snapshot()
+    click.echo(f"Saved {count} leaderboards up to attempt {leaderboards.stats()['watermark']}")
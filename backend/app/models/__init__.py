@@ -2,6 +2,11 @@
 
 from .user import User
 from .quiz import Quiz  
+from .question import Question, AnswerOption
+from .quiz_attempt import QuizAttempt
+from .user_stats import UserStats
+from .leaderboard_snapshot import LeaderboardSnapshot, LeaderboardGeneration
+from .daily_metric import DailyMetric
 from .payment import Payment, StripeSubscription
 from .offline_payment import OfflinePayment
 from .blacklisted_token import BlacklistedToken
@@ -10,6 +15,13 @@ from .helpers import _process_subscription_by_email
 __all__ = [
     'User',
     'Quiz', 
+    'Question',
+    'AnswerOption',
+    'QuizAttempt',
+    'UserStats',
+    'LeaderboardSnapshot',
+    'LeaderboardGeneration',
+    'DailyMetric',
     'Payment',
     'StripeSubscription',
     'OfflinePayment',
@@ -1,7 +1,11 @@
 """BlacklistedToken model definition."""
 
 from ..extensions import db
+from ..bloom_filter import BloomFilter
+from flask import current_app
+from sqlalchemy import event
 from datetime import datetime
+import time
 
 
 class BlacklistedToken(db.Model):
@@ -9,6 +13,11 @@ class BlacklistedToken(db.Model):
     Model for storing blacklisted JWT tokens to prevent their reuse after logout
     """
     __tablename__ = 'blacklisted_tokens'
+    __table_args__ = (
+        db.Index('ix_blacklisted_tokens_expires_at', 'expires_at'),  # purge / filter rebuild
+        db.Index('ix_blacklisted_tokens_revoked_at', 'revoked_at'),  # revocation cache poll
+        db.Index('ix_blacklisted_tokens_user_id_token_type', 'user_id', 'token_type'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(36), nullable=False, unique=True)  # JWT ID (unique identifier)
@@ -17,6 +26,9 @@ class BlacklistedToken(db.Model):
     revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     expires_at = db.Column(db.DateTime, nullable=False)  # When the token would naturally expire
     
+    # Bloom filter over live jti values; None until rebuild_filter() has run
+    jti_filter = None
+    
     def __init__(self, jti, token_type, user_id, expires_at):
         self.jti = jti
         self.token_type = token_type
@@ -28,21 +40,70 @@ class BlacklistedToken(db.Model):
     
     @staticmethod
     def is_blacklisted(jti):
-        """Check if a token is blacklisted"""
+        """Check if a token is blacklisted, consulting the database only on a filter hit"""
+        jti_filter = BlacklistedToken.jti_filter
+        if jti_filter is not None:
+            if len(jti_filter) > jti_filter.capacity:
+                jti_filter = BlacklistedToken.rebuild_filter()
+            if jti not in jti_filter:
+                return False
         return BlacklistedToken.query.filter_by(jti=jti).first() is not None
     
     @staticmethod
-    def cleanup_expired_tokens():
-        """Remove expired blacklisted tokens from database"""
-        expired_tokens = BlacklistedToken.query.filter(
-            BlacklistedToken.expires_at < datetime.utcnow()
-        ).all()
+    def rebuild_filter():
+        """Rebuild the jti Bloom filter from the live rows in the table"""
+        live = BlacklistedToken.expires_at >= datetime.utcnow()
+        live_count = db.session.query(db.func.count(BlacklistedToken.id)).filter(live).scalar() or 0
+        
+        min_capacity = current_app.config.get('BLACKLIST_FILTER_MIN_CAPACITY', 100000)
+        error_rate = current_app.config.get('BLACKLIST_FILTER_ERROR_RATE', 0.01)
+        jti_filter = BloomFilter(capacity=max(min_capacity, live_count * 2), error_rate=error_rate)
+        
+        for (jti,) in db.session.query(BlacklistedToken.jti).filter(live).yield_per(10000):
+            jti_filter.add(jti)
+        
+        BlacklistedToken.jti_filter = jti_filter
+        return jti_filter
+    
+    @staticmethod
+    def purge_expired_tokens(batch_size=None, pause=None):
+        """
+        Delete expired blacklisted tokens in bounded, set-based batches
+        
+        Each batch is a single DELETE ... WHERE id IN (SELECT id ... LIMIT n) committed on its own,
+        so the write lock is released (and other writers get a turn) between batches.
         
-        for token in expired_tokens:
-            db.session.delete(token)
+        Returns:
+            tuple: (number of rows deleted, elapsed seconds)
+        """
+        if batch_size is None:
+            batch_size = current_app.config.get('BLACKLIST_PURGE_BATCH_SIZE', 5000)
+        if pause is None:
+            pause = current_app.config.get('BLACKLIST_PURGE_PAUSE_SECONDS', 0.05)
         
-        db.session.commit()
-        return len(expired_tokens)
+        start = time.perf_counter()
+        table = BlacklistedToken.__table__
+        expired_ids = db.select(table.c.id).where(
+            table.c.expires_at < datetime.utcnow()
+        ).limit(batch_size).scalar_subquery()
+        
+        deleted = 0
+        while True:
+            result = db.session.execute(table.delete().where(table.c.id.in_(expired_ids)))
+            db.session.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                break
+            time.sleep(pause)
+        
+        BlacklistedToken.rebuild_filter()
+        return deleted, time.perf_counter() - start
+    
+    @staticmethod
+    def cleanup_expired_tokens():
+        """Remove expired blacklisted tokens from database"""
+        deleted, _ = BlacklistedToken.purge_expired_tokens()
+        return deleted
 
     def to_dict(self):
         return {
@@ -50,6 +111,13 @@ class BlacklistedToken(db.Model):
             'jti': self.jti,
             'token_type': self.token_type,
             'user_id': self.user_id,
-            'revoked_at': self.revoked_at.isoformat() if self.revoked_at else None,
-            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+            'revoked_at': self.revoked_at,  # datetimes are encoded by app.fast_json
+            'expires_at': self.expires_at
         }
+
+
+@event.listens_for(BlacklistedToken, 'after_insert')
+def _add_to_jti_filter(mapper, connection, target):
+    """Keep the jti filter in step with every insert (a rolled-back insert only costs a false positive)"""
+    if BlacklistedToken.jti_filter is not None:
+        BlacklistedToken.jti_filter.add(target.jti)
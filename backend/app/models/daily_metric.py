@@ -0,0 +1,34 @@
+"""DailyMetric model definition."""
+
+from ..extensions import db
+from .upsert import insert_for
+
+
+class DailyMetric(db.Model):
+    """One counter per (day, metric): the rollup behind /admin/analytics"""
+    __tablename__ = 'daily_metrics'
+
+    day = db.Column(db.Date, primary_key=True)  # UTC day
+    metric = db.Column(db.String(50), primary_key=True)  # see app.analytics.METRICS
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def increment(cls, connection, metric, day, amount=1):
+        """
+        Add to one counter on the given connection (used from flush events, so the rollup
+        commits or rolls back together with the row that caused it)
+        """
+        table = cls.__table__
+        # One INSERT ... ON CONFLICT, so concurrent first events of the day cannot both insert
+        statement = insert_for(connection.dialect, table).values(day=day, metric=metric, value=amount)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.metric],
+            set_={'value': table.c.value + statement.excluded.value}
+        ))
+
+    def to_dict(self):
+        return {
+            'day': self.day,  # dates are encoded by app.fast_json
+            'metric': self.metric,
+            'value': self.value
+        }
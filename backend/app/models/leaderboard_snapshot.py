@@ -0,0 +1,59 @@
+"""LeaderboardSnapshot and LeaderboardGeneration model definitions."""
+
+from ..extensions import db
+from datetime import datetime
+from array import array
+from itertools import chain
+import zlib
+
+
+class LeaderboardSnapshot(db.Model):
+    """
+    Persisted copy of one in-process leaderboard, so a restarted worker loads the
+    board and replays only the attempts saved after last_attempt_id
+    """
+    __tablename__ = 'leaderboard_snapshots'
+
+    board = db.Column(db.String(150), primary_key=True)  # 'global', 'category:<name>', 'quiz:<id>'
+    last_attempt_id = db.Column(db.Integer, nullable=False)  # QuizAttempt.id folded into this snapshot
+    size = db.Column(db.Integer, nullable=False, default=0)
+    # zlib-compressed int64 triples (user_id, score, achieved_at) in rank order
+    entries = db.Column(db.LargeBinary, nullable=False)
+    taken_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def pack(entries):
+        """Serialize (user_id, score, achieved_at) triples"""
+        flat = array('q', chain.from_iterable(entries))
+        return zlib.compress(flat.tobytes(), 1)
+
+    def unpack(self):
+        """Return the stored (user_id, score, achieved_at) triples"""
+        flat = array('q')
+        flat.frombytes(zlib.decompress(self.entries))
+        return zip(flat[0::3], flat[1::3], flat[2::3])
+
+
+class LeaderboardGeneration(db.Model):
+    """
+    Single-row counter bumped whenever attempts are deleted; a worker that sees a new
+    generation rebuilds its boards instead of replaying attempts above its watermark
+    """
+    __tablename__ = 'leaderboard_generation'
+
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+
+    @staticmethod
+    def current():
+        return db.session.query(LeaderboardGeneration.generation).filter_by(id=1).scalar() or 0
+
+    @staticmethod
+    def bump():
+        """Increment the generation in the caller's transaction"""
+        updated = LeaderboardGeneration.query.filter_by(id=1).update(
+            {LeaderboardGeneration.generation: LeaderboardGeneration.generation + 1},
+            synchronize_session=False
+        )
+        if not updated:
+            db.session.add(LeaderboardGeneration(id=1, generation=1))
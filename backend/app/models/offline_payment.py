@@ -7,6 +7,11 @@ from datetime import datetime
 class OfflinePayment(db.Model):
     """Model for tracking offline payments approved by admin"""
     __tablename__ = 'offline_payments'
+    __table_args__ = (
+        db.Index('ix_offline_payments_status_created_at', 'status', 'created_at'),  # admin list by status
+        db.Index('ix_offline_payments_created_at', 'created_at'),  # admin list, unfiltered
+        db.Index('ix_offline_payments_user_id_status', 'user_id', 'status'),  # pending request check
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -57,6 +62,6 @@ class OfflinePayment(db.Model):
             'payment_method': self.payment_method,
             'reference_number': self.reference_number,
             'notes': self.notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'approved_at': self.approved_at.isoformat() if self.approved_at else None
+            'created_at': self.created_at,  # datetimes are encoded by app.fast_json
+            'approved_at': self.approved_at
         }
@@ -5,6 +5,11 @@ from datetime import datetime
 
 
 class Payment(db.Model):
+    __table_args__ = (
+        # failed payments report; amount is included so its filtered counts never read the table
+        db.Index('ix_payment_status_created_at_amount', 'status', 'created_at', 'amount'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     stripe_payment_intent_id = db.Column(db.String(100), nullable=False, unique=True)
     amount = db.Column(db.Float, nullable=False)
@@ -20,13 +25,17 @@ class Payment(db.Model):
             'stripe_payment_intent_id': self.stripe_payment_intent_id,
             'amount': self.amount,
             'status': self.status,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'created_at': self.created_at,  # datetimes are encoded by app.fast_json
             'type': 'payment_intent'
         }
 
 
 class StripeSubscription(db.Model):
     __tablename__ = 'stripe_subscriptions'
+    __table_args__ = (
+        db.Index('ix_stripe_subscriptions_status_created_at', 'status', 'created_at'),
+        db.Index('ix_stripe_subscriptions_user_id', 'user_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -49,9 +58,9 @@ class StripeSubscription(db.Model):
             'stripe_subscription_id': self.stripe_subscription_id,
             'stripe_customer_id': self.stripe_customer_id,
             'status': self.status,
-            'current_period_start': self.current_period_start.isoformat() if self.current_period_start else None,
-            'current_period_end': self.current_period_end.isoformat() if self.current_period_end else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'canceled_at': self.canceled_at.isoformat() if self.canceled_at else None,
+            'current_period_start': self.current_period_start,  # datetimes are encoded by app.fast_json
+            'current_period_end': self.current_period_end,
+            'created_at': self.created_at,
+            'canceled_at': self.canceled_at,
             'failed_payment_count': self.failed_payment_count or 0
         }
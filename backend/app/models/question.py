@@ -0,0 +1,58 @@
+"""Question and AnswerOption model definitions."""
+
+from ..extensions import db
+
+
+class Question(db.Model):
+    __tablename__ = 'questions'
+    __table_args__ = (
+        db.Index('ix_questions_quiz_id_position', 'quiz_id', 'position'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # 0-based order within the quiz
+    text = db.Column(db.Text, nullable=False)
+    correct_index = db.Column(db.Integer, nullable=True)  # Position of the correct AnswerOption
+
+    options = db.relationship(
+        'AnswerOption',
+        order_by='AnswerOption.position',
+        cascade='all, delete-orphan',
+        lazy='selectin',
+        backref='question'
+    )
+
+    def set_options(self, texts):
+        """Replace option texts, touching only the rows that changed"""
+        for position, text in enumerate(texts):
+            if position < len(self.options):
+                if self.options[position].text != text:
+                    self.options[position].text = text
+            else:
+                self.options.append(AnswerOption(position=position, text=text))
+        del self.options[len(texts):]
+
+    def to_dict(self, include_answer=True):
+        """Convert question to the dictionary shape used by the quiz API"""
+        result = {
+            'id': self.id,
+            'question': self.text,
+            'options': [option.text for option in self.options]
+        }
+        if include_answer:
+            result['correct_answer'] = self.correct_index
+            result['correctAnswer'] = self.correct_index  # camelCase for frontend compatibility
+        return result
+
+
+class AnswerOption(db.Model):
+    __tablename__ = 'answer_options'
+    __table_args__ = (
+        db.Index('ix_answer_options_question_id_position', 'question_id', 'position'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # 0-based order within the question
+    text = db.Column(db.Text, nullable=False)
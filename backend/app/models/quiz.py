@@ -1,11 +1,19 @@
 """Quiz model definition."""
 
 from ..extensions import db
+from .question import Question
 from datetime import datetime
+import json
 
 
 class Quiz(db.Model):
     __tablename__ = 'quizzes'
+    __table_args__ = (
+        db.Index('ix_quizzes_category_difficulty', 'category', 'difficulty'),
+        db.Index('ix_quizzes_difficulty', 'difficulty'),
+        db.Index('ix_quizzes_author_id', 'author_id'),
+        db.Index('ix_quizzes_created_at', 'created_at'),  # keyset pagination on (created_at, id)
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -16,31 +24,122 @@ class Quiz(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     
-    # Relationship with questions (using JSON for simplicity in this version)
+    # Legacy questions blob; quizzes written since the Question/AnswerOption tables keep this NULL
     questions_json = db.Column(db.Text, nullable=True)
     
+    # Denormalized so catalogue listings never have to load questions
+    question_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    questions = db.relationship(
+        'Question',
+        order_by='Question.position',
+        cascade='all, delete-orphan',
+        backref='quiz'
+    )
+    
+    def legacy_questions(self):
+        """Parse the legacy questions blob, or [] if absent or invalid"""
+        if not self.questions_json:
+            return []
+        try:
+            questions = json.loads(self.questions_json)
+        except (TypeError, ValueError):
+            return []
+        return questions if isinstance(questions, list) else []
+    
+    def set_questions(self, questions):
+        """
+        Replace the quiz questions, updating only the rows that changed
+        
+        Args:
+            questions (list): (text, option_texts, correct_index) tuples in display order
+        """
+        for position, (text, options, correct_index) in enumerate(questions):
+            if position < len(self.questions):
+                question = self.questions[position]
+                if question.text != text:
+                    question.text = text
+                if question.correct_index != correct_index:
+                    question.correct_index = correct_index
+            else:
+                question = Question(position=position, text=text, correct_index=correct_index)
+                self.questions.append(question)
+            question.set_options(options)
+        del self.questions[len(questions):]
+        
+        self.question_count = len(questions)
+        self.questions_json = None
+        self.updated_at = datetime.utcnow()
+    
+    def normalize_questions(self):
+        """Move a legacy questions blob into Question/AnswerOption rows; returns True if converted"""
+        if not self.questions_json or self.questions:
+            return False
+        
+        converted = []
+        for item in self.legacy_questions():
+            if not isinstance(item, dict):
+                continue
+            options = [str(option) for option in (item.get('options') or [])]
+            correct_index = item.get('correct_answer', item.get('correctAnswer'))
+            try:
+                correct_index = int(correct_index)
+            except (TypeError, ValueError):
+                correct_index = None
+            if correct_index is not None and not 0 <= correct_index < len(options):
+                correct_index = None
+            converted.append((str(item.get('question') or ''), options, correct_index))
+        
+        self.set_questions(converted)
+        return True
+    
+    def to_summary_dict(self):
+        """Convert quiz to a catalogue entry: metadata and question count, no questions"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'category': self.category,
+            'difficulty': self.difficulty,
+            'created_at': self.created_at,  # datetimes are encoded by app.fast_json
+            'updated_at': self.updated_at,
+            'author_id': self.author_id,
+            'question_count': self.question_count or 0
+        }
+    
     def to_dict(self):
         """Convert quiz to dictionary"""
-        import json
-        
         result = {
             'id': self.id,
             'title': self.title,
             'description': self.description,
             'category': self.category,
             'difficulty': self.difficulty,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'author_id': self.author_id
+            'created_at': self.created_at,  # datetimes are encoded by app.fast_json
+            'updated_at': self.updated_at,
+            'author_id': self.author_id,
+            'question_count': self.question_count or 0
         }
         
-        # Parse questions from JSON
-        if self.questions_json:
-            try:
-                result['questions'] = json.loads(self.questions_json)
-            except:
-                result['questions'] = []
+        if self.questions:
+            result['questions'] = [question.to_dict() for question in self.questions]
         else:
-            result['questions'] = []
+            # Not yet migrated from the legacy blob
+            result['questions'] = self.legacy_questions()
             
         return result
+
+
+# Summary columns selected by catalogue listings (see QuizController.get_all_quizzes)
+SUMMARY_COLUMNS = (
+    Quiz.id, Quiz.title, Quiz.description, Quiz.category, Quiz.difficulty,
+    Quiz.created_at, Quiz.updated_at, Quiz.author_id, Quiz.question_count
+)
+
+
+@db.event.listens_for(Quiz, 'before_insert')
+@db.event.listens_for(Quiz, 'before_update')
+def _count_legacy_questions(mapper, connection, target):
+    """Keep question_count in step when a quiz is written through the legacy blob"""
+    if target.questions_json is not None and db.inspect(target).attrs.questions_json.history.has_changes():
+        target.question_count = len(target.legacy_questions())
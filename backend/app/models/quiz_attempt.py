@@ -0,0 +1,50 @@
+"""QuizAttempt model definition."""
+
+from ..extensions import db
+from datetime import datetime
+import json
+
+
+class QuizAttempt(db.Model):
+    """A submitted, server-scored run through a quiz"""
+    __tablename__ = 'quiz_attempts'
+    __table_args__ = (
+        db.Index('ix_quiz_attempts_user_id_created_at', 'user_id', 'created_at'),  # user's history
+        db.Index('ix_quiz_attempts_quiz_id_created_at', 'quiz_id', 'created_at'),  # per-quiz results
+        db.Index('ix_quiz_attempts_user_id_quiz_id', 'user_id', 'quiz_id'),  # first attempt at a quiz?
+        # Never reuse ids of deleted attempts: leaderboards consume attempts by increasing id
+        {'sqlite_autoincrement': True},
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    quiz_version = db.Column(db.DateTime, nullable=True)  # Quiz.updated_at of the answer key used
+    
+    # Per-question results in one row rather than one row per answer, keeping a
+    # submission to a single INSERT: chosen option indices as a JSON list (null = skipped)
+    # and one character per question: '1' correct, '0' wrong, '-' not gradable
+    answers = db.Column(db.Text, nullable=False)
+    results = db.Column(db.Text, nullable=False)
+    
+    correct_count = db.Column(db.Integer, nullable=False, default=0)
+    question_count = db.Column(db.Integer, nullable=False, default=0)  # gradable questions
+    score = db.Column(db.Integer, nullable=False, default=0)
+    duration_seconds = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert attempt to dictionary"""
+        return {
+            'id': self.id,
+            'quiz_id': self.quiz_id,
+            'user_id': self.user_id,
+            'answers': json.loads(self.answers),
+            'results': [None if flag == '-' else flag == '1' for flag in self.results],
+            'correct_count': self.correct_count,
+            'question_count': self.question_count,
+            'score': self.score,
+            'percentage': round(100 * self.correct_count / self.question_count) if self.question_count else 0,
+            'duration_seconds': self.duration_seconds,
+            'created_at': self.created_at  # datetimes are encoded by app.fast_json
+        }
@@ -0,0 +1,13 @@
+"""Dialect-specific INSERT ... ON CONFLICT DO UPDATE for the counter tables."""
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+
+def insert_for(dialect, table):
+    """INSERT into table that supports on_conflict_do_update on the given dialect"""
+    try:
+        return _INSERTS[dialect.name](table)
+    except KeyError:
+        raise NotImplementedError(f"Upserts are not supported on {dialect.name}") from None
@@ -1,12 +1,20 @@
 """User model definition."""
 
 from ..extensions import db
+from .user_stats import UserStats
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_role', 'role'),
+        db.Index('ix_users_has_premium_access', 'has_premium_access'),
+        db.Index('ix_users_created_at', 'created_at'),
+        db.Index('ix_users_tokens_valid_after', 'tokens_valid_after'),  # revocation cache poll
+        db.Index('ix_users_claims_valid_after', 'claims_valid_after'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), nullable=False)
@@ -20,6 +28,8 @@ class User(db.Model):
     social_provider = db.Column(db.String(20), nullable=True)
     has_premium_access = db.Column(db.Boolean, default=False) # Add premium access field
     premium_since = db.Column(db.DateTime, nullable=True) # Track when premium was activated
+    tokens_valid_after = db.Column(db.DateTime, nullable=True) # Tokens issued before this are revoked
+    claims_valid_after = db.Column(db.DateTime, nullable=True) # Access tokens issued before this carry stale claims
 
     def set_password(self, password):
         """Set password hash"""
@@ -48,9 +58,29 @@ class User(db.Model):
         """Demote admin to regular user"""
         self.role = 'user'
         self.is_admin = False
+    
+    def revoke_all_tokens(self):
+        """Invalidate every token issued to this user so far"""
+        self.tokens_valid_after = datetime.utcnow()
+    
+    def expire_claims(self):
+        """Invalidate access tokens issued so far; refresh tokens stay valid and /refresh re-reads the claims"""
+        self.claims_valid_after = datetime.utcnow()
+    
+    def token_claims(self):
+        """Authorization claims signed into access tokens, trusted by admin_middleware"""
+        return {
+            'role': 'admin' if self.is_admin_user() else (self.role or 'user'),
+            'premium': bool(self.has_premium_access)
+        }
+        
+    def to_dict(self, stats=None):
+        """
+        Convert user to dictionary
         
-    def to_dict(self):
-        """Convert user to dictionary"""
+        Args:
+            stats (UserStats, optional): Row from user_stats; zeros are reported when omitted
+        """
         return {
             'id': self.id,
             'username': self.username,
@@ -60,12 +90,22 @@ class User(db.Model):
             'level': 'Początkujący',  # Default level            
             'is_admin': self.is_admin_user(),
             'role': self.role,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'created_at': self.created_at,  # datetimes are encoded by app.fast_json
             'has_premium_access': self.has_premium_access, # Include in dict
-            'premium_since': self.premium_since.isoformat() if self.premium_since else None,
-            'stats': {
-                'quizzes': 0,
-                'bestTime': '0min',
-                'correctAnswers': 0
-            }
+            'premium_since': self.premium_since,
+            'stats': stats.to_dict() if stats is not None else UserStats.empty_dict()
         }
+
+
+# Attributes baked into token claims
+CLAIM_ATTRIBUTES = ('role', 'is_admin', 'has_premium_access')
+
+
+def _claims_changed(target, value, oldvalue, initiator):
+    """Bump the claims epoch when a claim-bearing attribute changes, so access tokens with stale claims are revoked"""
+    if target.id is not None and oldvalue != value:
+        target.expire_claims()
+
+
+for _name in CLAIM_ATTRIBUTES:
+    db.event.listen(getattr(User, _name), 'set', _claims_changed, active_history=True)
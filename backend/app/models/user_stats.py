@@ -0,0 +1,145 @@
+"""UserStats model definition."""
+
+from ..extensions import db
+from .upsert import insert_for
+from datetime import datetime
+
+
+def format_duration(seconds):
+    """Render a duration the way the frontend shows it ('0min', '45s', '3min 20s')"""
+    if seconds is None:
+        return '0min'
+    if seconds < 60:
+        return f'{seconds}s'
+    minutes, seconds = divmod(seconds, 60)
+    return f'{minutes}min {seconds}s' if seconds else f'{minutes}min'
+
+
+class UserStats(db.Model):
+    """Per-user totals over QuizAttempt rows, maintained incrementally as attempts are recorded"""
+    __tablename__ = 'user_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    quizzes_completed = db.Column(db.Integer, nullable=False, default=0)  # distinct quizzes attempted
+    correct_answers = db.Column(db.Integer, nullable=False, default=0)
+    questions_answered = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    best_score = db.Column(db.Integer, nullable=True)
+    best_time_seconds = db.Column(db.Integer, nullable=True)  # fastest attempt that reported a duration
+    last_attempt_at = db.Column(db.DateTime, nullable=True)
+    
+    @classmethod
+    def record_attempt(cls, attempt):
+        """
+        Fold one new, already flushed attempt into its user's row (in the caller's transaction)
+        
+        A single INSERT ... ON CONFLICT DO UPDATE, so concurrent submissions by the same user
+        neither lose increments nor race to insert the first row. Whether this is the user's
+        first attempt at the quiz is decided inside the same statement.
+        
+        Args:
+            attempt (QuizAttempt): The attempt being saved
+        """
+        from .quiz_attempt import QuizAttempt
+        attempts = QuizAttempt.__table__
+        table = cls.__table__
+        
+        earlier_attempt = db.exists().where(
+            attempts.c.user_id == attempt.user_id,
+            attempts.c.quiz_id == attempt.quiz_id,
+            attempts.c.id != attempt.id
+        )
+        statement = insert_for(db.session.get_bind().dialect, table).values(
+            user_id=attempt.user_id,
+            attempts=1,
+            quizzes_completed=db.case((earlier_attempt, 0), else_=1),
+            correct_answers=attempt.correct_count,
+            questions_answered=attempt.question_count,
+            total_score=attempt.score,
+            best_score=attempt.score,
+            best_time_seconds=attempt.duration_seconds,
+            last_attempt_at=attempt.created_at or datetime.utcnow()
+        )
+        new = statement.excluded
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={
+                'attempts': table.c.attempts + new.attempts,
+                'quizzes_completed': table.c.quizzes_completed + new.quizzes_completed,
+                'correct_answers': table.c.correct_answers + new.correct_answers,
+                'questions_answered': table.c.questions_answered + new.questions_answered,
+                'total_score': table.c.total_score + new.total_score,
+                'best_score': db.case(
+                    (db.or_(table.c.best_score.is_(None), table.c.best_score < new.best_score), new.best_score),
+                    else_=table.c.best_score
+                ),
+                # A NULL duration never compares lower, so attempts without one keep the best time
+                'best_time_seconds': db.case(
+                    (db.or_(table.c.best_time_seconds.is_(None), table.c.best_time_seconds > new.best_time_seconds),
+                     new.best_time_seconds),
+                    else_=table.c.best_time_seconds
+                ),
+                'last_attempt_at': new.last_attempt_at
+            }
+        ))
+    
+    @classmethod
+    def rebuild(cls, user_ids=None):
+        """
+        Recompute rows from quiz_attempts with one set-based INSERT ... SELECT (in the caller's transaction)
+        
+        Args:
+            user_ids (list, optional): Only rebuild these users; all users when omitted
+        """
+        from .quiz_attempt import QuizAttempt
+        attempts = QuizAttempt.__table__
+        table = cls.__table__
+        
+        aggregate = db.select(
+            attempts.c.user_id,
+            db.func.count(),
+            db.func.count(db.distinct(attempts.c.quiz_id)),
+            db.func.sum(attempts.c.correct_count),
+            db.func.sum(attempts.c.question_count),
+            db.func.sum(attempts.c.score),
+            db.func.max(attempts.c.score),
+            db.func.min(attempts.c.duration_seconds),
+            db.func.max(attempts.c.created_at)
+        ).group_by(attempts.c.user_id)
+        
+        delete = table.delete()
+        if user_ids is not None:
+            if not user_ids:
+                return
+            aggregate = aggregate.where(attempts.c.user_id.in_(user_ids))
+            delete = delete.where(table.c.user_id.in_(user_ids))
+        
+        db.session.execute(delete)
+        db.session.execute(table.insert().from_select([
+            'user_id', 'attempts', 'quizzes_completed', 'correct_answers', 'questions_answered',
+            'total_score', 'best_score', 'best_time_seconds', 'last_attempt_at'
+        ], aggregate))
+    
+    def to_dict(self):
+        """Stats in the shape User.to_dict exposes to the frontend"""
+        return {
+            'quizzes': self.quizzes_completed,
+            'bestTime': format_duration(self.best_time_seconds),
+            'correctAnswers': self.correct_answers,
+            'attempts': self.attempts,
+            'totalScore': self.total_score,
+            'bestScore': self.best_score or 0
+        }
+    
+    @staticmethod
+    def empty_dict():
+        """Stats of a user without any attempt"""
+        return {
+            'quizzes': 0,
+            'bestTime': '0min',
+            'correctAnswers': 0,
+            'attempts': 0,
+            'totalScore': 0,
+            'bestScore': 0
+        }
@@ -1,40 +1,194 @@
 import re
+from datetime import datetime
 from flask import current_app, jsonify
-from .models import User, Quiz
+from sqlalchemy.orm import load_only, selectinload
+from .models import User, Quiz, Question, QuizAttempt, UserStats
+from .models.quiz import SUMMARY_COLUMNS
 from .extensions import db
+from .search import quiz_search
+from .compiled_quizzes import compiled_quizzes, grade, NO_ANSWER, POINTS_PER_CORRECT_ANSWER
+from .leaderboards import leaderboards
 import json
 from utils.helpers import sanitize_input, validate_email
+from utils.pagination import keyset_page
 class QuizController:    
     @staticmethod
-    def get_all_quizzes(category=None, difficulty=None, search=None):
+    def _parse_question(data, current=None):
+        """
+        Validate a question payload
+        
+        Args:
+            data (dict): {'question', 'options', 'correct_answer' | 'correctAnswer'}
+            current (Question, optional): Existing question whose values fill in missing fields
+            
+        Returns:
+            tuple: ((text, options, correct_index), None) or (None, error)
+        """
+        if not isinstance(data, dict):
+            return None, "Each question must be an object"
+        
+        text = data.get('question', current.text if current else None)
+        options = data.get('options', [option.text for option in current.options] if current else None)
+        if 'correct_answer' in data:
+            correct_index = data['correct_answer']
+        elif 'correctAnswer' in data:
+            correct_index = data['correctAnswer']
+        else:
+            correct_index = current.correct_index if current else None
+        
+        if not isinstance(text, str) or not text.strip():
+            return None, "Question text is required"
+        
+        if not isinstance(options, list) or len(options) < 2:
+            return None, "Each question needs at least two options"
+        
+        if correct_index is not None:
+            try:
+                correct_index = int(correct_index)
+            except (TypeError, ValueError):
+                return None, "Correct answer must be an option index"
+            if not 0 <= correct_index < len(options):
+                return None, "Correct answer index out of range"
+        
+        return (text, [str(option) for option in options], correct_index), None
+    
+    @staticmethod
+    def _parse_questions(questions):
+        """Validate a list of question payloads; returns (parsed_list, None) or (None, error)"""
+        if not isinstance(questions, list):
+            return None, "Questions must be a list"
+        
+        parsed = []
+        for number, data in enumerate(questions, start=1):
+            question, error = QuizController._parse_question(data)
+            if error:
+                return None, f"Question {number}: {error}"
+            parsed.append(question)
+        return parsed, None
+    
+    @staticmethod
+    def _catalogue_query(category=None, difficulty=None, summary=False):
+        """Build the quiz catalogue query filtered by category/difficulty"""
+        # Start with base query
+        query = Quiz.query
+        if summary:
+            query = query.options(load_only(*SUMMARY_COLUMNS))
+        else:
+            # Full entries carry their questions: two IN queries instead of a lazy load per row
+            query = query.options(selectinload(Quiz.questions).selectinload(Question.options))
+        
+        # Apply filters if provided
+        if category:
+            query = query.filter(Quiz.category == category)
+        
+        if difficulty:
+            query = query.filter(Quiz.difficulty == difficulty)
+        
+        return query
+    
+    @staticmethod
+    def get_all_quizzes(category=None, difficulty=None, search=None, summary=False):
         """
         Get all quizzes with optional filtering
+        
+        With summary=True only the metadata columns are selected and each entry carries
+        question_count instead of the questions themselves. With search the results are
+        ordered by relevance and carry search_rank and a highlighted search_snippet.
         """
         try:
-            # Start with base query
-            query = Quiz.query
-            
-            # Apply filters if provided
-            if category:
-                query = query.filter(Quiz.category == category)
-            
-            if difficulty:
-                query = query.filter(Quiz.difficulty == difficulty)
+            query = QuizController._catalogue_query(category, difficulty, summary)
             
+            hits = None
             if search:
-                query = query.filter(Quiz.title.ilike(f'%{search}%'))
+                ranked = quiz_search.ranked(search, category=category, difficulty=difficulty)
+                hits = {quiz_id: (rank, snippet) for quiz_id, rank, snippet in ranked}
+                query = query.filter(Quiz.id.in_(list(hits)))
             
             # Execute query
             quizzes = query.all()
             
             # Convert to dict
-            quizzes_list = [quiz.to_dict() for quiz in quizzes]
+            if summary:
+                quizzes_list = [quiz.to_summary_dict() for quiz in quizzes]
+            else:
+                quizzes_list = [quiz.to_dict() for quiz in quizzes]
+            
+            if hits is not None:
+                order = {quiz_id: number for number, quiz_id in enumerate(hits)}
+                quizzes_list.sort(key=lambda quiz: order[quiz['id']])
+                for quiz in quizzes_list:
+                    quiz['search_rank'], quiz['search_snippet'] = hits[quiz['id']]
             
             return quizzes_list, None
         except Exception as e:
             current_app.logger.error(f"Error fetching quizzes: {str(e)}")
             return [], f"Error fetching quizzes: {str(e)}"
     
+    @staticmethod
+    def get_quiz_page(category=None, difficulty=None, search=None, summary=False,
+                      cursor=None, limit=20, include_total=False):
+        """
+        Get one page of the quiz catalogue, newest first, using keyset pagination
+        
+        Returns:
+            tuple: ({'quizzes': [...], 'pagination': {...}}, None) or (None, error)
+        """
+        try:
+            query = QuizController._catalogue_query(category, difficulty, summary)
+            if search:
+                # Pages stay in (created_at, id) order so cursors remain valid
+                query = quiz_search.filter(query, search)
+            quizzes, pagination = keyset_page(query, Quiz, cursor, limit, include_total)
+            
+            if summary:
+                quizzes_list = [quiz.to_summary_dict() for quiz in quizzes]
+            else:
+                quizzes_list = [quiz.to_dict() for quiz in quizzes]
+            
+            return {'quizzes': quizzes_list, 'pagination': pagination}, None
+        except Exception as e:
+            current_app.logger.error(f"Error fetching quiz page: {str(e)}")
+            return None, f"Error fetching quizzes: {str(e)}"
+    
+    @staticmethod
+    def get_catalogue_version(category=None, difficulty=None, search=None):
+        """
+        Cheap version of a catalogue listing: (row count, max id, max updated_at)
+        
+        Any create, update or delete of a matching quiz changes at least one of the three.
+        
+        Returns:
+            tuple: ((count, max_id, last_modified), None) or (None, error)
+        """
+        try:
+            query = QuizController._catalogue_query(category, difficulty)
+            if search:
+                query = quiz_search.filter(query, search)
+            count, max_id, last_modified = query.with_entities(
+                db.func.count(Quiz.id), db.func.max(Quiz.id), db.func.max(Quiz.updated_at)
+            ).one()
+            return (count, max_id, last_modified), None
+        except Exception as e:
+            current_app.logger.error(f"Error fetching catalogue version: {str(e)}")
+            return None, f"Error fetching quizzes: {str(e)}"
+    
+    @staticmethod
+    def get_quiz_version(quiz_id):
+        """
+        Return a quiz's updated_at without loading the quiz
+        
+        Returns:
+            tuple: (updated_at, None) or (None, error)
+        """
+        try:
+            row = db.session.query(Quiz.updated_at, Quiz.created_at).filter(Quiz.id == quiz_id).first()
+            if row is None:
+                return None, "Quiz not found"
+            return row.updated_at or row.created_at, None
+        except Exception as e:
+            current_app.logger.error(f"Error fetching quiz version: {str(e)}")
+            return None, f"Error fetching quiz: {str(e)}"
+    
     @staticmethod
     def get_quiz_by_id(quiz_id):
         """
@@ -69,17 +223,23 @@ class QuizController:
             if not title:
                 return None, "Title is required"
             
+            parsed_questions, error = QuizController._parse_questions(questions)
+            if error:
+                return None, error
+            
             # Create quiz
             quiz = Quiz(
                 title=title,
                 description=description,
                 category=category,
                 difficulty=difficulty,
-                author_id=author_id,
-                questions_json=json.dumps(questions)
+                author_id=author_id
             )
+            quiz.set_questions(parsed_questions)
             
             db.session.add(quiz)
+            db.session.flush()
+            quiz_search.index(quiz)
             db.session.commit()
             
             return quiz.to_dict(), None
@@ -113,9 +273,15 @@ class QuizController:
                 quiz.difficulty = quiz_data['difficulty']
             
             if 'questions' in quiz_data:
-                quiz.questions_json = json.dumps(quiz_data['questions'])
+                parsed_questions, error = QuizController._parse_questions(quiz_data['questions'])
+                if error:
+                    return None, error
+                quiz.set_questions(parsed_questions)
             
+            db.session.flush()
+            quiz_search.index(quiz)
             db.session.commit()
+            compiled_quizzes.invalidate(quiz_id)
             
             return quiz.to_dict(), None
         except Exception as e:
@@ -123,6 +289,70 @@ class QuizController:
             db.session.rollback()
             return None, f"Error updating quiz: {str(e)}"
     
+    @staticmethod
+    def get_question(quiz_id, position):
+        """
+        Get a single question of a quiz by its 0-based position
+        """
+        try:
+            quiz = Quiz.query.get(quiz_id)
+            
+            if not quiz:
+                return None, "Quiz not found"
+            
+            question = Question.query.filter_by(quiz_id=quiz_id, position=position).first()
+            if question:
+                return question.to_dict(), None
+            
+            # Not yet migrated (migrate_db.py converts the blob); read-only from the legacy blob
+            legacy = quiz.legacy_questions() if quiz.questions_json else []
+            if 0 <= position < len(legacy):
+                return legacy[position], None
+            return None, "Question not found"
+        except Exception as e:
+            current_app.logger.error(f"Error fetching question: {str(e)}")
+            return None, f"Error fetching question: {str(e)}"
+    
+    @staticmethod
+    def update_question(quiz_id, position, question_data):
+        """
+        Partially update a single question (text, options and/or correct answer)
+        """
+        try:
+            quiz = Quiz.query.get(quiz_id)
+            
+            if not quiz:
+                return None, "Quiz not found"
+            
+            quiz.normalize_questions()
+            
+            question = Question.query.filter_by(quiz_id=quiz_id, position=position).first()
+            if not question:
+                return None, "Question not found"
+            
+            parsed, error = QuizController._parse_question(question_data, current=question)
+            if error:
+                return None, error
+            
+            text, options, correct_index = parsed
+            if question.text != text:
+                question.text = text
+            if question.correct_index != correct_index:
+                question.correct_index = correct_index
+            question.set_options(options)
+            quiz.updated_at = datetime.utcnow()
+            
+            db.session.flush()
+            quiz_search.index(quiz)
+            db.session.commit()
+            compiled_quizzes.invalidate(quiz_id)
+            
+            return question.to_dict(), None
+        except Exception as e:
+            current_app.logger.error(f"Error updating question: {str(e)}")
+            db.session.rollback()
+            return None, f"Error updating question: {str(e)}"
+    
     @staticmethod
     def delete_quiz(quiz_id):
         """
@@ -134,8 +364,18 @@ class QuizController:
             if not quiz:
                 return False, "Quiz not found"
             
+            quiz_search.remove(quiz.id)
+            affected_users = [user_id for (user_id,) in
+                              db.session.query(QuizAttempt.user_id).filter_by(quiz_id=quiz.id).distinct()]
+            QuizAttempt.query.filter_by(quiz_id=quiz.id).delete(synchronize_session=False)
+            UserStats.rebuild(user_ids=affected_users)
+            if affected_users:
+                leaderboards.discard_snapshots()
             db.session.delete(quiz)
             db.session.commit()
+            compiled_quizzes.invalidate(quiz_id)
+            if affected_users:
+                leaderboards.clear()
             
             return True, None
         except Exception as e:
@@ -143,27 +383,137 @@ class QuizController:
             db.session.rollback()
             return False, f"Error deleting quiz: {str(e)}"
     
+    @staticmethod
+    def submit_attempt(quiz_id, user_id, attempt_data):
+        """
+        Score a submitted answer vector and store the attempt
+        
+        Args:
+            quiz_id (int): Quiz being answered
+            user_id (int): Submitting user
+            attempt_data (dict): {'answers': [option index or None per question], 'duration_seconds': optional}
+            
+        Returns:
+            tuple: (attempt_dict with correct_answers, None) or (None, error)
+        """
+        try:
+            compiled = compiled_quizzes.get(quiz_id)
+            if compiled is None:
+                return None, "Quiz not found"
+            
+            answers = attempt_data.get('answers')
+            if not isinstance(answers, list):
+                return None, "Answers must be a list"
+            if len(answers) != len(compiled.correct):
+                return None, f"Expected {len(compiled.correct)} answers, got {len(answers)}"
+            for number, (answer, option_count) in enumerate(zip(answers, compiled.option_counts), start=1):
+                # bool is an int subclass; reject it explicitly
+                if answer is not None and (isinstance(answer, bool) or not isinstance(answer, int)
+                                           or not 0 <= answer < option_count):
+                    return None, f"Answer {number} is not a valid option index"
+            
+            duration = attempt_data.get('duration_seconds')
+            if duration is not None and (isinstance(duration, bool) or not isinstance(duration, (int, float)) or duration < 0):
+                return None, "Duration must be a non-negative number of seconds"
+            
+            results, correct_count, gradable = grade(compiled, answers)
+            attempt = QuizAttempt(
+                quiz_id=quiz_id,
+                user_id=user_id,
+                quiz_version=compiled.version,
+                answers=json.dumps(answers, separators=(',', ':')),
+                results=results,
+                correct_count=correct_count,
+                question_count=gradable,
+                score=correct_count * POINTS_PER_CORRECT_ANSWER,
+                duration_seconds=int(duration) if duration is not None else None
+            )
+            db.session.add(attempt)
+            db.session.flush()
+            UserStats.record_attempt(attempt)
+            # Serialize before commit so the expired attempt is not re-read from the database
+            attempt_dict = attempt.to_dict()
+            db.session.commit()
+            leaderboards.attempt_saved()
+            
+            attempt_dict['correct_answers'] = [None if index == NO_ANSWER else index for index in compiled.correct]
+            return attempt_dict, None
+        except Exception as e:
+            current_app.logger.error(f"Error submitting attempt: {str(e)}")
+            db.session.rollback()
+            return None, f"Error submitting attempt: {str(e)}"
+    
     @staticmethod
     def get_quiz_options(quiz_id):
         """
         Get quiz questions without correct answers (for solving)
         """
+        payload, error = QuizController.get_quiz_options_payload(quiz_id)
+        if error:
+            return None, error
+        return json.loads(payload), None
+    
+    @staticmethod
+    def get_quiz_options_payload(quiz_id, version=None):
+        """
+        Get the redacted quiz as pre-serialized JSON bytes from the compiled quiz cache
+        
+        Args:
+            quiz_id (int): Quiz ID
+            version (datetime, optional): Quiz version already read by the caller
+            
+        Returns:
+            tuple: (bytes, None) or (None, error)
+        """
         try:
-            quiz = Quiz.query.get(quiz_id)
+            compiled = compiled_quizzes.get(quiz_id, version)
             
-            if not quiz:
+            if compiled is None:
                 return None, "Quiz not found"
             
-            # Get quiz data without correct answers
-            quiz_dict = quiz.to_dict()
+            return compiled.options_payload, None
+        except Exception as e:
+            current_app.logger.error(f"Error fetching quiz options: {str(e)}")
+            return None, f"Error fetching quiz options: {str(e)}"
+    
+    @staticmethod
+    def get_leaderboard(board, user_id=None, limit=10, offset=0):
+        """
+        Get one page of a leaderboard plus the caller's own position
+        
+        Args:
+            board (str): Board name ('global', 'category:<name>', 'quiz:<id>')
+            user_id (int, optional): Current user, for the 'me' entry
+            limit (int): Entries per page
+            offset (int): Entries to skip
+            
+        Returns:
+            tuple: (leaderboard_dict, None) or (None, error)
+        """
+        try:
+            entries, total = leaderboards.top(board, limit, offset)
+            me = leaderboards.rank_of(board, user_id) if user_id is not None else None
             
-            # Remove correct answers from questions
-            if 'questions' in quiz_dict:
-                for question in quiz_dict['questions']:
-                    if 'correct_answer' in question:
-                        del question['correct_answer']
+            # One IN query for the names on the page
+            user_ids = [entry_user_id for _, entry_user_id, _ in entries]
+            users = {row.id: row for row in db.session.query(User.id, User.username, User.avatar_url)
+                     .filter(User.id.in_(user_ids))} if user_ids else {}
             
-            return quiz_dict, None
+            return {
+                'board': board,
+                'total': total,
+                'limit': limit,
+                'offset': offset,
+                'entries': [{
+                    'rank': rank,
+                    'user_id': entry_user_id,
+                    'username': users[entry_user_id].username if entry_user_id in users else None,
+                    'avatar_url': users[entry_user_id].avatar_url if entry_user_id in users else None,
+                    'score': score
+                } for rank, entry_user_id, score in entries],
+                'me': {'rank': me[0], 'score': me[1]} if me else None
+            }, None
         except Exception as e:
-            current_app.logger.error(f"Error fetching quiz options: {str(e)}")
-            return None, f"Error fetching quiz options: {str(e)}"
\ No newline at end of file
+            current_app.logger.error(f"Error fetching leaderboard: {str(e)}")
+            db.session.rollback()
+            return None, f"Error fetching leaderboard: {str(e)}"
@@ -1,34 +1,117 @@
 import logging
-from flask import request, jsonify
+from flask import request, jsonify, Response, current_app
 from flask_restful import Resource
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from .models import Quiz, User
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from .models import Quiz
 from .quiz_controller import QuizController
+from .current_user import resolve_current_user
+from .read_replica import replica_reads
+from .catalogue_cache import CatalogueError, catalogue_key, encode_response, get_encoded, pick_encoding, variant_etags
+from .leaderboards import GLOBAL_BOARD, category_board, quiz_board
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.helpers import sanitize_input
+from utils.pagination import get_page_args
+from utils.http_cache import make_etag, request_variant, is_not_modified, cache_headers
+
+def _wants_summary():
+    """?summary=1 (or true/yes) asks for catalogue entries without questions"""
+    return request.args.get('summary', '').lower() in ('1', 'true', 'yes')
+
+def _wants_page():
+    """The catalogue is paginated once the client passes ?limit= or ?cursor="""
+    return 'limit' in request.args or 'cursor' in request.args
+
+def _catalogue_etag(category, difficulty, search):
+    """
+    ETag of a catalogue listing, or None if unavailable
+    
+    Listings carry no Last-Modified: deleting a quiz leaves MAX(updated_at) unchanged, so
+    only the count / max id / max updated_at ETag can tell that a listing changed.
+    """
+    version, error = QuizController.get_catalogue_version(category, difficulty, search)
+    if error:
+        return None
+    count, max_id, last_modified = version
+    return make_etag('quizzes', count, max_id, last_modified, request_variant())
+
+def _quiz_validators(kind, quiz_id):
+    """(etag, last_modified) for a single-quiz representation, or (None, None) if the quiz is missing"""
+    last_modified, error = QuizController.get_quiz_version(quiz_id)
+    if error:
+        return None, None
+    return make_etag(kind, quiz_id, last_modified), last_modified
 
 class GetQuizzes(Resource):
+    @replica_reads
     def get(self):
-        """Get all quizzes with optional filtering"""
+        """Get all quizzes with optional filtering, served from pre-encoded cached responses"""
         category = sanitize_input(request.args.get('category'))
         difficulty = sanitize_input(request.args.get('difficulty'))
         search = sanitize_input(request.args.get('search'))
+        summary = _wants_summary()
         
-        quizzes, error = QuizController.get_all_quizzes(
-            category=category,
-            difficulty=difficulty,
-            search=search
-        )
+        page = None
+        if _wants_page():
+            try:
+                page = get_page_args()
+            except ValueError as e:
+                return {'error': str(e)}, 400
         
-        if error:
-            return jsonify({'error': error}), 400
+        # A conditional request is answered from the version query alone, before any
+        # cached or freshly built body is touched
+        if request.if_none_match:
+            etag = _catalogue_etag(category, difficulty, search)
+            for variant in variant_etags(etag) if etag else ():
+                if is_not_modified(variant):
+                    response = Response(status=304, headers=cache_headers(variant))
+                    response.vary.add('Accept-Encoding')
+                    return response
         
-        return jsonify({'quizzes': quizzes})
+        def build():
+            etag = _catalogue_etag(category, difficulty, search)
+            if page is not None:
+                cursor, limit, include_total = page
+                payload, error = QuizController.get_quiz_page(
+                    category=category,
+                    difficulty=difficulty,
+                    search=search,
+                    summary=summary,
+                    cursor=cursor,
+                    limit=limit,
+                    include_total=include_total
+                )
+            else:
+                quizzes, error = QuizController.get_all_quizzes(
+                    category=category,
+                    difficulty=difficulty,
+                    search=search,
+                    summary=summary
+                )
+                payload = {'quizzes': quizzes}
+            if error:
+                raise CatalogueError(error)
+            return encode_response(payload, etag)
+        
+        try:
+            entry = get_encoded(catalogue_key(category, difficulty, search, summary, page), build)
+        except CatalogueError as e:
+            return {'error': str(e)}, 400
+        
+        body, encoding = pick_encoding(entry, request.accept_encodings)
+        # Each encoding is its own representation, so it gets its own strong ETag
+        etag = f'{entry.etag}-{encoding}' if entry.etag and encoding else entry.etag
+        headers = cache_headers(etag) if etag else {}
+        response = Response(body, mimetype='application/json', headers=headers)
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
     
 class QuizResource(Resource):
     @jwt_required(locations=["cookies"])
+    @replica_reads
     def get(self, quiz_id=None):
         """Handle quiz GET requests"""
         try:
@@ -36,27 +119,60 @@ class QuizResource(Resource):
             if quiz_id:
                 logging.info(f"Getting quiz with ID: {quiz_id}")
                 
+                # Validators come from updated_at alone, so a 304 never loads the questions
+                etag, last_modified = _quiz_validators('quiz', quiz_id)
+                if etag is None:
+                    logging.error(f"Quiz {quiz_id} not found")
+                    return {'error': 'Quiz not found'}, 404
+                headers = cache_headers(etag, last_modified)
+                if is_not_modified(etag, last_modified):
+                    return '', 304, headers
+                
                 quiz_data, error = QuizController.get_quiz_by_id(quiz_id)
                 
                 if error or not quiz_data:
                     logging.error(f"Quiz {quiz_id} not found: {error}")
                     return {'error': 'Quiz not found'}, 404
                 
-                return quiz_data, 200
+                return quiz_data, 200, headers
             
             # Otherwise, get all quizzes
             category = request.args.get('category')
             difficulty = request.args.get('difficulty')
             search = request.args.get('search')
             
-            # Check if client has a valid cached version
-            etag = request.headers.get('If-None-Match')
+            # Check if client has a valid cached version before loading anything
+            etag = _catalogue_etag(category, difficulty, search)
+            headers = cache_headers(etag) if etag else {}
+            if etag and request.if_none_match and is_not_modified(etag):
+                return '', 304, headers
+            
+            if _wants_page():
+                try:
+                    cursor, limit, include_total = get_page_args()
+                except ValueError as e:
+                    return {'error': str(e)}, 400
+                
+                page, error = QuizController.get_quiz_page(
+                    category=category,
+                    difficulty=difficulty,
+                    search=search,
+                    summary=_wants_summary(),
+                    cursor=cursor,
+                    limit=limit,
+                    include_total=include_total
+                )
+                if error:
+                    logging.error(f"Error getting quiz page: {error}")
+                    return {'error': error}, 400
+                return page, 200, headers
             
             # Get all quizzes with optional filtering
             quizzes, error = QuizController.get_all_quizzes(
                 category=category,
                 difficulty=difficulty,
-                search=search
+                search=search,
+                summary=_wants_summary()
             )
             
             if error:
@@ -69,15 +185,8 @@ class QuizResource(Resource):
                 # For now, just log that filters were applied
                 logging.info(f"Filtering quizzes with category={category}, difficulty={difficulty}, search={search}")
             
-            # Generate ETag for the current data
-            current_etag = str(hash(str(quizzes)))
-            
-            # If client's cached version matches current data, return 304 Not Modified
-            if etag and etag == current_etag:
-                return '', 304
-            
             # Return response with quizzes list directly for tests compatibility
-            return {'quizzes': quizzes}, 200
+            return {'quizzes': quizzes}, 200, headers
             
         except Exception as e:
             logging.error(f"Error in get_quizzes: {str(e)}")
@@ -92,24 +201,7 @@ class QuizResource(Resource):
                 return {'error': 'No data provided'}, 400
             
             # Add current user ID as author
-            current_user_id = get_jwt_identity()
-            
-            # Add current user ID as author
-            current_user_id = get_jwt_identity()
-            
-            # Find user - handle both regular users and OAuth users
-            user = None
-            try:
-                # Try as regular user ID first
-                numeric_id = int(current_user_id)
-                if numeric_id < 1000000000:  # Regular user ID
-                    user = User.query.get(numeric_id)
-                else:  # Large number, likely Google ID
-                    user = User.query.filter_by(google_id=current_user_id).first()
-            except (ValueError, TypeError):
-                # If conversion fails, try as Google ID string
-                user = User.query.filter_by(google_id=current_user_id).first()
-            
+            user = resolve_current_user()
             if not user:
                 return {'error': 'User not found'}, 404
             
@@ -144,12 +236,7 @@ class QuizResource(Resource):
                 logging.error(f"Quiz {quiz_id} not found: {error}")
                 return {'error': 'Quiz not found'}, 404
             
-            # Try to find user by regular ID first
-            user = User.query.get(current_user_id)
-            # If user not found by ID, try by google_id (for OAuth users)
-            if not user:
-                user = User.query.filter_by(google_id=current_user_id).first()
-            
+            user = resolve_current_user()
             if not user:
                 logging.error(f"User {current_user_id} not found")
                 return {'error': 'User not found'}, 404
@@ -183,12 +270,7 @@ class QuizResource(Resource):
                 logging.error(f"Quiz {quiz_id} not found: {error}")
                 return {'error': 'Quiz not found'}, 404
             
-            # Try to find user by regular ID first
-            user = User.query.get(current_user_id)
-            # If user not found by ID, try by google_id (for OAuth users)
-            if not user:
-                user = User.query.filter_by(google_id=current_user_id).first()
-            
+            user = resolve_current_user()
             if not user:
                 logging.error(f"User {current_user_id} not found")
                 return {'error': 'User not found'}, 404
@@ -211,16 +293,106 @@ class QuizResource(Resource):
             logging.error(f"Error deleting quiz {quiz_id}: {str(e)}")
             return {'error': 'Internal server error'}, 500
 
+class QuizQuestionResource(Resource):
+    @jwt_required(locations=["cookies"])
+    @replica_reads
+    def get(self, quiz_id, position):
+        """Get a single question by its position in the quiz"""
+        try:
+            question, error = QuizController.get_question(quiz_id, position)
+            if error:
+                status = 404 if 'not found' in error else 400
+                return {'error': error}, status
+            
+            return question, 200
+            
+        except Exception as e:
+            logging.error(f"Error getting question {position} of quiz {quiz_id}: {str(e)}")
+            return {'error': 'Internal server error'}, 500
+    
+    @jwt_required(locations=["cookies"])
+    def patch(self, quiz_id, position):
+        """Partially update a single question"""
+        try:
+            data = request.get_json()
+            
+            if not data:
+                return {'error': 'No data provided'}, 400
+            
+            quiz = Quiz.query.get(quiz_id)
+            if not quiz:
+                return {'error': 'Quiz not found'}, 404
+            
+            # Check if user is quiz author or admin
+            current_user_id = get_jwt_identity()
+            user = resolve_current_user()
+            if not user:
+                logging.error(f"User {current_user_id} not found")
+                return {'error': 'User not found'}, 404
+            
+            if not user.is_admin_user() and quiz.author_id != user.id:
+                logging.warning(f"User {current_user_id} (ID: {user.id}) attempted to update question {position} of quiz {quiz_id} without permission")
+                return {'error': 'You do not have permission to update this quiz'}, 403
+            
+            question, error = QuizController.update_question(quiz_id, position, data)
+            if error:
+                status = 404 if 'not found' in error else 400
+                return {'error': error}, status
+            
+            return question, 200
+            
+        except Exception as e:
+            logging.error(f"Error updating question {position} of quiz {quiz_id}: {str(e)}")
+            return {'error': 'Internal server error'}, 500
+
+class QuizAttemptResource(Resource):
+    @jwt_required(locations=["cookies"])
+    def post(self, quiz_id):
+        """Submit answers for server-side scoring"""
+        try:
+            data = request.get_json(silent=True)
+            
+            if not data:
+                return {'error': 'No data provided'}, 400
+            
+            current_user_id = get_jwt_identity()
+            user = resolve_current_user()
+            if not user:
+                logging.error(f"User {current_user_id} not found")
+                return {'error': 'User not found'}, 404
+            
+            attempt, error = QuizController.submit_attempt(quiz_id, user.id, data)
+            if error:
+                status = 404 if error == 'Quiz not found' else 400
+                return {'error': error}, status
+            
+            return attempt, 201
+            
+        except Exception as e:
+            logging.error(f"Error submitting attempt for quiz {quiz_id}: {str(e)}")
+            return {'error': 'Internal server error'}, 500
+
 class OptionsQuizResource(Resource):
     def get(self, quiz_id):
         """Get quiz questions without correct answers (for solving)"""
         try:
-            quiz_options, error = QuizController.get_quiz_options(quiz_id)
-            if error or not quiz_options:
+            etag, last_modified = _quiz_validators('options', quiz_id)
+            if etag is None:
+                logging.error(f"Quiz {quiz_id} not found")
+                return {'error': 'Quiz not found'}, 404
+            headers = cache_headers(etag, last_modified)
+            if is_not_modified(etag, last_modified):
+                return '', 304, headers
+            
+            # Pre-serialized bytes from the compiled quiz cache, sent without re-encoding
+            payload, error = QuizController.get_quiz_options_payload(quiz_id, version=last_modified)
+            if error or not payload:
                 logging.error(f"Quiz {quiz_id} not found: {error}")
                 return {'error': 'Quiz not found'}, 404
             
-            return quiz_options, 200
+            response = Response(payload, status=200, mimetype='application/json')
+            response.headers.update(headers)
+            return response
             
         except Exception as e:
             logging.error(f"Error getting quiz options {quiz_id}: {str(e)}")
@@ -232,4 +404,44 @@ class OptionsQuizResource(Resource):
             'Allow': 'GET, POST, PUT, DELETE, OPTIONS',
             'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
             'Access-Control-Allow-Headers': 'Content-Type, Authorization'
-        }
\ No newline at end of file
+        }
+def _optional_user_id():
+    """Id of the logged-in user, or None; a missing or stale cookie just means anonymous"""
+    try:
+        verify_jwt_in_request(optional=True, locations=["cookies"])
+    except Exception:
+        return None
+    user = resolve_current_user()
+    return user.id if user else None
+
+class LeaderboardResource(Resource):
+    def get(self, category=None, quiz_id=None):
+        """Global, per-category or per-quiz leaderboard page with the caller's own rank"""
+        try:
+            try:
+                limit = int(request.args.get('limit', current_app.config.get('LEADERBOARD_DEFAULT_LIMIT', 10)))
+                offset = int(request.args.get('offset', 0))
+            except ValueError:
+                return {'error': 'limit and offset must be integers'}, 400
+            if limit < 1 or offset < 0:
+                return {'error': 'limit must be positive and offset non-negative'}, 400
+            limit = min(limit, current_app.config.get('LEADERBOARD_MAX_LIMIT', 100))
+            
+            if quiz_id is not None:
+                _, error = QuizController.get_quiz_version(quiz_id)
+                if error:
+                    return {'error': error}, 404 if error == 'Quiz not found' else 500
+                board = quiz_board(quiz_id)
+            elif category is not None:
+                board = category_board(category)
+            else:
+                board = GLOBAL_BOARD
+            
+            result, error = QuizController.get_leaderboard(board, _optional_user_id(), limit, offset)
+            if error:
+                return {'error': error}, 500
+            return result, 200
+            
+        except Exception as e:
+            logging.error(f"Error fetching leaderboard: {str(e)}")
+            return {'error': 'Internal server error'}, 500
@@ -0,0 +1,236 @@
+"""
+Order-statistic structures backing the leaderboards
+"""
+from bisect import bisect_left, bisect_right, insort
+
+
+class OrderStatisticList:
+    """
+    Sorted multiset of ints with O(log n) rank and select
+
+    Values live in sorted buckets of roughly `load` items; `_maxes` holds each
+    bucket's last value for bisecting and a Fenwick tree over bucket sizes turns a
+    (bucket, offset) pair into a global position. Inserting is a bisect plus a
+    C-level list insert into one bucket; the tree is rebuilt only when a bucket
+    splits or empties.
+    """
+
+    def __init__(self, values=(), load=1000):
+        self._load = load
+        values = sorted(values)
+        self._lists = [values[i:i + load] for i in range(0, len(values), load)]
+        self._maxes = [bucket[-1] for bucket in self._lists]
+        self._len = len(values)
+        self._build_index()
+
+    def _build_index(self):
+        size = len(self._lists)
+        tree = [0] * (size + 1)
+        for i, bucket in enumerate(self._lists, start=1):
+            tree[i] += len(bucket)
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _update(self, bucket, delta):
+        tree = self._tree
+        i = bucket + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket):
+        """Number of values in buckets [0, bucket)"""
+        tree = self._tree
+        total = 0
+        i = bucket
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index):
+        """Map a global position to (bucket, offset) by descending the Fenwick tree"""
+        tree = self._tree
+        bucket = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = bucket + step
+            if nxt < len(tree) and tree[nxt] <= index:
+                bucket = nxt
+                index -= tree[nxt]
+            step >>= 1
+        return bucket, index
+
+    def add(self, value):
+        if not self._lists:
+            self._lists.append([value])
+            self._maxes.append(value)
+            self._len = 1
+            self._build_index()
+            return
+
+        pos = bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            pos -= 1
+            self._lists[pos].append(value)
+            self._maxes[pos] = value
+        else:
+            insort(self._lists[pos], value)
+        self._len += 1
+
+        bucket = self._lists[pos]
+        if len(bucket) > 2 * self._load:
+            self._lists.insert(pos + 1, bucket[self._load:])
+            del bucket[self._load:]
+            self._maxes.insert(pos, bucket[-1])
+            self._build_index()
+        else:
+            self._update(pos, 1)
+
+    def remove(self, value):
+        """Remove one occurrence of value; raises ValueError if absent"""
+        pos = bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            raise ValueError(f'{value} not in list')
+        bucket = self._lists[pos]
+        offset = bisect_left(bucket, value)
+        if offset == len(bucket) or bucket[offset] != value:
+            raise ValueError(f'{value} not in list')
+
+        del bucket[offset]
+        self._len -= 1
+        if bucket:
+            self._maxes[pos] = bucket[-1]
+            self._update(pos, -1)
+        else:
+            del self._lists[pos]
+            del self._maxes[pos]
+            self._build_index()
+
+    def rank(self, value):
+        """Number of values strictly smaller than value"""
+        pos = bisect_left(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._prefix(pos) + bisect_left(self._lists[pos], value)
+
+    def count_le(self, value):
+        """Number of values smaller than or equal to value"""
+        pos = bisect_right(self._maxes, value)
+        if pos == len(self._maxes):
+            return self._len
+        return self._prefix(pos) + bisect_right(self._lists[pos], value)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError('index out of range')
+        bucket, offset = self._locate(index)
+        return self._lists[bucket][offset]
+
+    def islice(self, start=0, stop=None):
+        """Iterate values in positions [start, stop)"""
+        stop = self._len if stop is None else min(stop, self._len)
+        if start >= stop:
+            return
+        bucket, offset = self._locate(start)
+        remaining = stop - start
+        while remaining > 0:
+            chunk = self._lists[bucket][offset:offset + remaining]
+            yield from chunk
+            remaining -= len(chunk)
+            bucket += 1
+            offset = 0
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._lists:
+            yield from bucket
+
+
+# A board entry packs (score descending, achieved_at ascending, user_id ascending) into one
+# int so that ascending int order is leaderboard order and an entry costs one small int
+SCORE_LIMIT = 1 << 40
+TIME_BITS = 40
+USER_BITS = 32
+
+
+def pack_entry(user_id, score, achieved_at):
+    """achieved_at: POSIX seconds; earlier achievers rank first among equal scores"""
+    score = max(0, min(int(score), SCORE_LIMIT - 1))
+    return (((SCORE_LIMIT - 1 - score) << TIME_BITS | int(achieved_at)) << USER_BITS) | int(user_id)
+
+
+def unpack_entry(key):
+    """Return (user_id, score, achieved_at)"""
+    user_id = key & ((1 << USER_BITS) - 1)
+    key >>= USER_BITS
+    achieved_at = key & ((1 << TIME_BITS) - 1)
+    score = SCORE_LIMIT - 1 - (key >> TIME_BITS)
+    return user_id, score, achieved_at
+
+
+class Leaderboard:
+    """One board: user -> (score, achieved_at), ranked by score then who got there first"""
+
+    def __init__(self, entries=()):
+        self._keys = {}
+        for user_id, score, achieved_at in entries:
+            self._keys[user_id] = pack_entry(user_id, score, achieved_at)
+        self._ranked = OrderStatisticList(self._keys.values())
+
+    def set(self, user_id, score, achieved_at):
+        """Set a user's score, replacing any previous entry (O(log n))"""
+        old = self._keys.get(user_id)
+        if old is not None:
+            self._ranked.remove(old)
+        key = pack_entry(user_id, score, achieved_at)
+        self._keys[user_id] = key
+        self._ranked.add(key)
+
+    def get(self, user_id):
+        """Return (score, achieved_at) or None"""
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        _, score, achieved_at = unpack_entry(key)
+        return score, achieved_at
+
+    def add_score(self, user_id, points, achieved_at):
+        """Cumulative boards: add points to the user's total"""
+        current = self.get(user_id)
+        self.set(user_id, (current[0] if current else 0) + points, achieved_at)
+
+    def offer_best(self, user_id, score, achieved_at):
+        """Best-score boards: keep the higher score (first achiever wins ties)"""
+        current = self.get(user_id)
+        if current is None or score > current[0]:
+            self.set(user_id, score, achieved_at)
+
+    def rank_of(self, user_id):
+        """Return (1-based rank, score) or None (O(log n))"""
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        return self._ranked.rank(key) + 1, unpack_entry(key)[1]
+
+    def top(self, limit=10, offset=0):
+        """Return [(rank, user_id, score)] for positions offset+1 .. offset+limit"""
+        return [
+            (offset + number + 1, user_id, score)
+            for number, (user_id, score, _) in enumerate(
+                unpack_entry(key) for key in self._ranked.islice(offset, offset + limit)
+            )
+        ]
+
+    def entries(self):
+        """Iterate (user_id, score, achieved_at) in rank order"""
+        return (unpack_entry(key) for key in self._ranked)
+
+    def __len__(self):
+        return len(self._ranked)
@@ -0,0 +1,128 @@
+"""
+Read replica routing
+
+With DATABASE_REPLICA_URL set, the replica is registered as the 'replica' bind and
+handlers decorated with @replica_reads send their SELECTs to it through
+RoutingSession (app.extensions); flushes, DML and every other handler use the primary.
+
+Read-your-writes: a request that commits a write hands its client a short-lived
+cookie (READ_REPLICA_STICKY_SECONDS), and while it is valid that client's reads stay
+on the primary, so a user never sees a replica that has not caught up with their own
+changes. A write made inside a replica handler switches the rest of that request to
+the primary as well.
+
+A local SQLite replica is kept current with the SQLite backup API
+(sync_sqlite_replica), from the scheduler every REPLICA_SYNC_SECONDS or with
+`flask sync-replica`.
+"""
+import time
+from functools import wraps
+import click
+from flask import g, has_request_context, request, current_app
+from flask.cli import with_appcontext
+from .extensions import db
+from . import sqlite_profile
+
+REPLICA_BIND = 'replica'
+STICKY_COOKIE = 'read_primary_until'
+
+
+def _sticky():
+    """True while the client's read-your-writes cookie is valid"""
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def replica_reads(f):
+    """Send this handler's SELECTs to the replica (place below the auth decorators)"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g._read_replica = not _sticky()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g._read_replica = False
+
+    return decorated_function
+
+
+def replica_engine():
+    """The replica engine, or None when no replica is configured"""
+    return db.engines.get(REPLICA_BIND)
+
+
+def sync_sqlite_replica():
+    """
+    Copy the primary SQLite database onto the replica with the backup API
+
+    Returns:
+        bool: False when there is no SQLite replica to sync
+    """
+    replica = replica_engine()
+    if replica is None or replica.dialect.name != 'sqlite' or db.engine.dialect.name != 'sqlite':
+        return False
+    source = db.engine.raw_connection()
+    target = replica.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        target.close()
+        source.close()
+    return True
+
+
+def _mark_write(session, flush_context):
+    if has_request_context():
+        session.info['replica_wrote'] = True
+        g._read_replica = False
+
+
+def _after_commit(session):
+    if session.info.pop('replica_wrote', False) and has_request_context():
+        g._read_primary_until = time.time() + current_app.config.get('READ_REPLICA_STICKY_SECONDS', 5)
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop('replica_wrote', None)
+
+
+def _set_sticky_cookie(response):
+    until = g.get('_read_primary_until')
+    if until is not None and replica_engine() is not None:
+        response.set_cookie(STICKY_COOKIE, f'{until:.3f}', max_age=max(1, int(until - time.time()) + 1),
+                            httponly=True, samesite='Lax')
+    return response
+
+
+db.event.listen(db.session, 'after_flush', _mark_write)
+db.event.listen(db.session, 'after_commit', _after_commit)
+db.event.listen(db.session, 'after_soft_rollback', _after_rollback)
+
+
+def configure(app):
+    """Register the replica bind; call before db.init_app"""
+    url = app.config.get('DATABASE_REPLICA_URL')
+    if url:
+        app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, **{REPLICA_BIND: url})
+
+
+def init_app(app):
+    """Apply the engine profile to the replica and hand out read-your-writes cookies"""
+    url = app.config.get('DATABASE_REPLICA_URL')
+    if url:
+        with app.app_context():
+            sqlite_profile.install(replica_engine(), dict(app.config, SQLALCHEMY_DATABASE_URI=url))
+            sync_sqlite_replica()
+    app.after_request(_set_sticky_cookie)
+
+
+@click.command('sync-replica')
+@with_appcontext
+def sync_replica_command():
+    """Copy the primary SQLite database onto the local read replica"""
+    if sync_sqlite_replica():
+        click.echo("Replica synced")
+    else:
+        click.echo("No SQLite replica configured")
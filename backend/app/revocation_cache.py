@@ -0,0 +1,224 @@
+"""
+In-process cache of revoked JWTs
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from .extensions import db
+from .models import BlacklistedToken, User
+
+
+def _to_timestamp(value):
+    """Convert a naive UTC datetime (as stored in the database) to a POSIX timestamp"""
+    if value is None:
+        return 0.0
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+class RevocationCache:
+    """
+    Per-process mirror of the blacklisted_tokens table
+
+    Revoked jtis live in BlacklistedToken.jti_filter, so a token that was never
+    revoked is cleared without SQL; only a filter hit is confirmed in the database.
+    Per-user epochs are kept as identity -> (token epoch, claims epoch) timestamps and
+    compared against the token's iat: User.tokens_valid_after revokes every token,
+    User.claims_valid_after only access tokens (their role/premium claims are stale).
+    Rows written by other processes are picked up by a cheap incremental poll on
+    revoked_at / tokens_valid_after / claims_valid_after at most once every
+    `refresh_interval` seconds.
+    """
+
+    def __init__(self, refresh_interval=5):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._epochs = {}
+        self._watermark = None
+        self._epoch_watermark = None
+        self._last_refresh = 0.0
+        self._loaded = False
+
+    def init_app(self, app):
+        """Configure the cache from app config and load the current blacklist"""
+        self.refresh_interval = app.config.get('REVOCATION_CACHE_REFRESH_SECONDS', self.refresh_interval)
+        with app.app_context():
+            try:
+                self.load()
+            except Exception as e:
+                # e.g. schema not migrated yet; the first revocation check retries the load
+                db.session.rollback()
+                app.logger.warning(f"Could not preload revocation cache: {str(e)}")
+
+    def load(self):
+        """(Re)load all live blacklist entries from the database"""
+        started = datetime.utcnow()
+        jti_filter = BlacklistedToken.rebuild_filter()
+        watermark = db.session.query(db.func.max(BlacklistedToken.revoked_at)).scalar() or started
+        oldest = self._oldest_relevant_epoch()
+        rows = self._epoch_query().filter(
+            db.or_(User.tokens_valid_after > oldest, User.claims_valid_after > oldest)
+        ).all()
+
+        with self._lock:
+            self._epochs = {}
+            self._watermark = watermark
+            self._epoch_watermark = None
+            for row in rows:
+                self._add_epoch_row(row)
+            self._last_refresh = time.monotonic()
+            self._loaded = True
+        return len(jti_filter) + len(rows)
+
+    def refresh(self):
+        """Pull entries written since the last poll (e.g. by another worker)"""
+        query = db.session.query(BlacklistedToken.jti, BlacklistedToken.revoked_at)
+        # >= so rows sharing the watermark timestamp are not missed; re-adding is idempotent
+        if self._watermark is not None:
+            query = query.filter(BlacklistedToken.revoked_at >= self._watermark)
+        rows = query.all()
+
+        epoch_query = self._epoch_query()
+        if self._epoch_watermark is not None:
+            epoch_query = epoch_query.filter(db.or_(User.tokens_valid_after >= self._epoch_watermark,
+                                                    User.claims_valid_after >= self._epoch_watermark))
+        else:
+            oldest = self._oldest_relevant_epoch()
+            epoch_query = epoch_query.filter(db.or_(User.tokens_valid_after > oldest,
+                                                    User.claims_valid_after > oldest))
+        epoch_rows = epoch_query.all()
+
+        with self._lock:
+            for row in rows:
+                self._add_row(row)
+            for row in epoch_rows:
+                self._add_epoch_row(row)
+            self._last_refresh = time.monotonic()
+
+    def _maybe_refresh(self):
+        if not self._loaded:
+            self.load()
+        elif time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    @staticmethod
+    def _epoch_query():
+        return db.session.query(User.id, User.google_id, User.tokens_valid_after, User.claims_valid_after).filter(
+            db.or_(User.tokens_valid_after.isnot(None), User.claims_valid_after.isnot(None))
+        )
+
+    @staticmethod
+    def _oldest_relevant_epoch():
+        """Epochs older than the longest token lifetime cannot reject any unexpired token"""
+        lifetime = max(
+            current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', timedelta(minutes=15)),
+            current_app.config.get('JWT_REFRESH_TOKEN_EXPIRES', timedelta(days=30))
+        )
+        return datetime.utcnow() - lifetime
+
+    def _add_row(self, row):
+        if self._watermark is None or (row.revoked_at and row.revoked_at > self._watermark):
+            self._watermark = row.revoked_at
+        if BlacklistedToken.jti_filter is not None and row.jti not in BlacklistedToken.jti_filter:
+            BlacklistedToken.jti_filter.add(row.jti)
+
+    def _add_epoch_row(self, row):
+        latest = max(value for value in (row.tokens_valid_after, row.claims_valid_after) if value is not None)
+        if self._epoch_watermark is None or latest > self._epoch_watermark:
+            self._epoch_watermark = latest
+        epochs = (_to_timestamp(row.tokens_valid_after), _to_timestamp(row.claims_valid_after))
+        self._epochs[str(row.id)] = epochs
+        if row.google_id:
+            self._epochs[str(row.google_id)] = epochs
+
+    def set_epoch(self, user):
+        """Record a user's new token and claims epochs (both identities a JWT 'sub' may carry)"""
+        with self._lock:
+            self._add_epoch_row(user)
+
+    def is_revoked(self, jti, user_id=None, issued_at=None, token_type='access'):
+        """
+        Check a token against the cache
+
+        Args:
+            jti (str): JWT ID
+            user_id (int or str, optional): Token subject
+            issued_at (int or float, optional): Token 'iat' claim
+            token_type (str, optional): Token 'type' claim; the claims epoch only applies to access tokens
+
+        Returns:
+            bool: True if token is revoked
+        """
+        self._maybe_refresh()
+
+        if BlacklistedToken.is_blacklisted(jti):
+            return True
+
+        if user_id is not None:
+            epochs = self._epochs.get(str(user_id))
+            if epochs is not None:
+                tokens_epoch, claims_epoch = epochs
+                epoch = tokens_epoch if token_type == 'refresh' else max(tokens_epoch, claims_epoch)
+                # iat has one-second resolution, so a token from the revocation's own second stays valid.
+                # Tokens without iat cannot prove they were issued afterwards.
+                if epoch and (issued_at is None or issued_at < int(epoch)):
+                    return True
+
+        return False
+
+    def prune(self):
+        """Drop epochs too old to affect any unexpired token"""
+        oldest = _to_timestamp(self._oldest_relevant_epoch())
+        with self._lock:
+            self._epochs = {identity: epochs for identity, epochs in self._epochs.items() if max(epochs) > oldest}
+
+    def clear(self):
+        """Forget everything; the next check reloads from the database"""
+        with self._lock:
+            self._epochs = {}
+            self._watermark = None
+            self._epoch_watermark = None
+            self._loaded = False
+
+    def stats(self):
+        """Return entry counts for diagnostics"""
+        jti_filter = BlacklistedToken.jti_filter
+        return {
+            'filter': jti_filter.stats() if jti_filter is not None else None,
+            'epochs': len(self._epochs),
+            'loaded': self._loaded
+        }
+
+
+revocation_cache = RevocationCache()
+
+
+# Token and claims epochs bumped through the ORM (claim changes, logout everywhere) reach
+# this process's cache as soon as they commit; other workers see them at their next poll
+EpochRow = namedtuple('EpochRow', 'id google_id tokens_valid_after claims_valid_after')
+
+
+def _collect_epochs(session, flush_context, instances):
+    for instance in session.dirty:
+        if not isinstance(instance, User):
+            continue
+        attrs = db.inspect(instance).attrs
+        if attrs.tokens_valid_after.history.has_changes() or attrs.claims_valid_after.history.has_changes():
+            session.info.setdefault('new_token_epochs', []).append(
+                EpochRow(instance.id, instance.google_id, instance.tokens_valid_after, instance.claims_valid_after)
+            )
+
+
+def _publish_epochs(session):
+    for row in session.info.pop('new_token_epochs', ()):
+        revocation_cache.set_epoch(row)
+
+
+def _forget_epochs(session, previous_transaction):
+    session.info.pop('new_token_epochs', None)
+
+
+db.event.listen(db.session, 'before_flush', _collect_epochs)
+db.event.listen(db.session, 'after_commit', _publish_epochs)
+db.event.listen(db.session, 'after_soft_rollback', _forget_epochs)
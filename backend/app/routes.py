@@ -6,12 +6,15 @@ import logging
 import os
 from datetime import datetime
 from .user_controller import UserController, TokenBlacklistManager
-from .models import User, OfflinePayment
+from .models import User, OfflinePayment, UserStats
 from .extensions import db
 from utils.helpers import sanitize_input, validate_email
+from utils.pagination import page_headers
 from .quiz_controller import QuizController
 from .admin_controller import AdminController
 from .admin_middleware import admin_required
+from .current_user import resolve_current_user
+from .read_replica import replica_reads
 logging.basicConfig(level=logging.DEBUG)
 
 class RegisterResource(Resource):
@@ -28,7 +31,7 @@ class RegisterResource(Resource):
                 return {'error': error}, 409 if "already exists" in error else 400
                 
             # Create JWT tokens with string identity
-            access_token = create_access_token(identity=str(user.id))
+            access_token = create_access_token(identity=str(user.id), additional_claims=user.token_claims())
             refresh_token = create_refresh_token(identity=str(user.id))
 
             # Create response with make_response and include tokens in JSON
@@ -89,7 +92,7 @@ class LoginResource(Resource):
                 
             logging.info(f"Login successful for user: {email}")
             # Create JWT tokens with string identity
-            access_token = create_access_token(identity=str(user.id))
+            access_token = create_access_token(identity=str(user.id), additional_claims=user.token_claims())
             refresh_token = create_refresh_token(identity=str(user.id))
 
             # Create response with tokens included in JSON
@@ -129,7 +132,11 @@ class RefreshResource(Resource):
     @jwt_required(refresh=True, locations=["cookies"])
     def post(self):
         identity = get_jwt_identity()
-        new_access_token = create_access_token(identity=identity, fresh=False)
+        # Claims are re-read so a refreshed token reflects the current role and premium status
+        user = resolve_current_user()
+        if not user:
+            return {'error': 'User not found'}, 401
+        new_access_token = create_access_token(identity=identity, fresh=False, additional_claims=user.token_claims())
         response = make_response(jsonify({"access_token": new_access_token}), 200)
         response.set_cookie("access_token_cookie", new_access_token)
         return response
@@ -157,7 +164,7 @@ class GoogleLoginCallback(Resource):
             db.session.commit()
             
         # Always use google_id as identity for OAuth users (as string)
-        access_token = create_access_token(identity=str(user.google_id))
+        access_token = create_access_token(identity=str(user.google_id), additional_claims=user.token_claims())
         refresh_token = create_refresh_token(identity=str(user.google_id))
         
         response = make_response(redirect(f'{os.getenv("FRONTEND_URL")}/oauth-callback'))
@@ -187,25 +194,14 @@ class UserResource(Resource):
                     return jsonify({'error': 'User not found'}), 404
             else:
                 # Get current user from JWT
-                current_user_id = get_jwt_identity()
-                if not current_user_id:
+                if not get_jwt_identity():
                     return jsonify({'error': 'Authentication required'}), 401
                 
-                # Try to find user safely (handling both regular IDs and Google IDs)
-                user = None
-                try:
-                    numeric_id = int(current_user_id)
-                    if numeric_id < 1000000000:  # Regular user ID
-                        user = User.query.get(numeric_id)
-                    else:  # Large number, likely Google ID
-                        user = User.query.filter_by(google_id=current_user_id).first()
-                except (ValueError, TypeError, OverflowError):
-                    user = User.query.filter_by(google_id=current_user_id).first()
-                
+                user = resolve_current_user()
                 if not user:
                     return jsonify({'error': 'User not found'}), 404
                     
-                return user.to_dict(), 200
+                return user.to_dict(stats=db.session.get(UserStats, user.id)), 200
             
             return jsonify(user.to_dict()), 200
         except Exception as e:
@@ -250,6 +246,7 @@ class UserResource(Resource):
             return {'error': 'Failed to update user'}, 500
 
 class UserMeResource(Resource):
+    # Stays on the primary: the user it resolves refills current_user_cache
     @jwt_required(locations=["cookies"])
     def get(self):
         """Get profile of logged in user"""
@@ -263,40 +260,16 @@ class UserMeResource(Resource):
         current_user_id = get_jwt_identity()
         logging.info(f"JWT identity: {current_user_id}")
         
-        user = None
-        
-        # Try to determine if this is a regular user ID (small number) or Google ID (large number)
-        try:
-            # Try to convert to int and check if it's a reasonable user ID (< 1 billion)
-            numeric_id = int(current_user_id)
-            if numeric_id < 1000000000:  # Less than 1 billion, likely a regular user ID
-                user = User.query.filter_by(id=numeric_id).first()
-            else:
-                # Large number, likely a Google ID - search by google_id as string
-                user = User.query.filter_by(google_id=current_user_id).first()
-        except (ValueError, TypeError, OverflowError):
-            # If conversion fails, try as string (for OAuth users with google_id)
-            user = User.query.filter_by(google_id=current_user_id).first()
-        
-        # If still not found, try the other field
-        if not user:
-            try:
-                numeric_id = int(current_user_id)
-                if numeric_id >= 1000000000:  # Large number, try as google_id string
-                    user = User.query.filter_by(google_id=current_user_id).first()
-                else:  # Small number, try as regular ID
-                    user = User.query.filter_by(id=numeric_id).first()
-            except (ValueError, TypeError, OverflowError):
-                # Last resort: try as google_id string
-                user = User.query.filter_by(google_id=current_user_id).first()
+        user = resolve_current_user()
         
         logging.info(f"Looking for user with identity: {current_user_id}, found: {user}")
         
         if not user:
             logging.warning(f"User with ID {current_user_id} not found")
             return {'error': 'User not found'}, 404
-            
-        return user.to_dict(), 200
+        
+        # Materialized stats: one primary-key lookup instead of aggregating attempts
+        return user.to_dict(stats=db.session.get(UserStats, user.id)), 200
     
 class LogoutResource(Resource):
     @jwt_required(locations=["cookies"])
@@ -316,7 +289,7 @@ class LogoutResource(Resource):
             
             if logout_all_devices:
                 # Blacklist all tokens for this user
-                success = TokenBlacklistManager.blacklist_all_user_tokens(int(user_id))
+                success = TokenBlacklistManager.blacklist_all_user_tokens(user_id)
                 if success:
                     logging.info(f"All tokens blacklisted for user {user_id}")
                 else:
@@ -324,7 +297,7 @@ class LogoutResource(Resource):
             else:
                 # Blacklist only the current token
                 if jti and exp:
-                    expires_at = datetime.fromtimestamp(exp)
+                    expires_at = datetime.utcfromtimestamp(exp)
                     success = TokenBlacklistManager.blacklist_token(
                         jti=jti,
                         token_type='access',
@@ -369,15 +342,7 @@ class UserOfflinePaymentRequestResource(Resource):
     def post(self):
         """Allow users to request offline payment for premium access"""
         try:
-            user_id = get_jwt_identity()
-            
-            # Handle both regular user ID (integer) and Google ID (string)
-            if user_id.isdigit() and len(user_id) < 10:  # Regular user IDs are typically < 10 digits
-                user = User.query.get(int(user_id))
-            else:
-                # It's a google_id (string) or large number
-                user = User.query.filter_by(google_id=user_id).first()
-            
+            user = resolve_current_user()
             if not user:
                 return {'error': 'User not found'}, 404
             
@@ -431,6 +396,7 @@ class UserOfflinePaymentRequestResource(Resource):
 # ============= ADMIN ENDPOINTS =============
 
 class AdminDashboardResource(Resource):
+    # Stays on the primary: the computed stats are cached and then kept current by local deltas
     @jwt_required(locations=["cookies"])
     @admin_required
     def get(self):
@@ -445,15 +411,18 @@ class AdminDashboardResource(Resource):
 class AdminUsersResource(Resource):
     @jwt_required(locations=["cookies"])
     @admin_required
+    @replica_reads
     def get(self):
         """Get all users with pagination"""
         try:
             users_data = AdminController.get_users()
-            # Return just the list of users for tests compatibility
+            # Return just the list of users for tests compatibility; the cursor travels in headers
             if 'users' in users_data:
-                return users_data['users'], 200
+                return users_data['users'], 200, page_headers(users_data['pagination'])
             else:
                 return users_data, 200
+        except ValueError as e:
+            return {'error': str(e)}, 400
         except Exception as e:
             logging.error(f"Error getting users: {str(e)}")
             return {'error': 'Failed to load users'}, 500
@@ -511,15 +480,18 @@ class AdminUserDemoteResource(Resource):
 class AdminOfflinePaymentsResource(Resource):
     @jwt_required(locations=["cookies"])
     @admin_required
+    @replica_reads
     def get(self):
         """Get offline payments"""
         try:
             payments_data = AdminController.get_offline_payments()
-            # Return just the list of payments for tests compatibility
+            # Return just the list of payments for tests compatibility; the cursor travels in headers
             if 'payments' in payments_data:
-                return payments_data['payments'], 200
+                return payments_data['payments'], 200, page_headers(payments_data['pagination'])
             else:
                 return payments_data, 200
+        except ValueError as e:
+            return {'error': str(e)}, 400
         except Exception as e:
             logging.error(f"Error getting offline payments: {str(e)}")
             return {'error': 'Failed to load payments'}, 500
@@ -562,20 +534,41 @@ class AdminOfflinePaymentRejectResource(Resource):
 class AdminFailedPaymentsResource(Resource):
     @jwt_required(locations=["cookies"])
     @admin_required
+    @replica_reads
     def get(self):
-        """Get failed payments for admin dashboard"""
+        """Get failed payments for admin dashboard (?cursor=&limit=&status=&from=&to=&min_amount=&max_amount=)"""
         try:
             payments_data = AdminController.get_failed_payments()
-            # Combine failed_payments and failed_subscriptions into one list for tests compatibility
-            if isinstance(payments_data, dict) and 'failed_payments' in payments_data:
-                combined_list = payments_data.get('failed_payments', []) + payments_data.get('failed_subscriptions', [])
-                return combined_list, 200
-            else:
-                return payments_data, 200
+            # One merged list for tests compatibility; cursor and per-source counts travel in headers
+            summary = payments_data['summary']
+            headers = page_headers(payments_data['pagination'])
+            headers['X-Failed-Payments-Count'] = str(summary['failed_payments']['total'])
+            headers['X-Failed-Subscriptions-Count'] = str(summary['failed_subscriptions']['total'])
+            return payments_data['items'], 200, headers
+        except ValueError as e:
+            return {'error': str(e)}, 400
         except Exception as e:
             logging.error(f"Error getting failed payments: {str(e)}")
             return {'error': 'Failed to load failed payments'}, 500
 
+class AdminAnalyticsResource(Resource):
+    @jwt_required(locations=["cookies"])
+    @admin_required
+    @replica_reads
+    def get(self):
+        """Time series from the daily rollups (?from=YYYY-MM-DD&to=YYYY-MM-DD&granularity=day|week|month)"""
+        try:
+            return AdminController.get_analytics(
+                request.args.get('from'),
+                request.args.get('to'),
+                request.args.get('granularity', 'day')
+            ), 200
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        except Exception as e:
+            logging.error(f"Error getting analytics: {str(e)}")
+            return {'error': 'Failed to load analytics'}, 500
+
 class AdminUserEditResource(Resource):
     @jwt_required(locations=["cookies"])
     @admin_required
@@ -0,0 +1,246 @@
+"""
+Full-text search over quizzes
+
+The SQLite backend keeps an FTS5 index (quiz_search, rowid = quiz id) over title,
+description, category and question/answer text, ranked with BM25. Other engines,
+or SQLite builds without FTS5, fall back to a LIKE-based backend.
+"""
+import html
+import re
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text
+from .extensions import db
+from .models import Quiz
+
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# Private-use markers for snippet highlights, swapped for <mark> once the text is escaped
+MARK_START, MARK_END = '\ue000', '\ue001'
+
+
+def _match_expression(term):
+    """Turn free user input into an FTS5 query: every word must match, as a prefix"""
+    tokens = TOKEN.findall(term or '')
+    if not tokens:
+        return None
+    return ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+
+def _highlight(snippet):
+    """HTML-escape a snippet of user-written text, then turn the markers into <mark>"""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def _filter_catalogue(query, category=None, difficulty=None):
+    if category:
+        query = query.filter(Quiz.category == category)
+    if difficulty:
+        query = query.filter(Quiz.difficulty == difficulty)
+    return query
+
+
+def quiz_document(quiz):
+    """Searchable text of a quiz: (title, description, category, questions and options)"""
+    if quiz.questions:
+        parts = []
+        for question in quiz.questions:
+            parts.append(question.text)
+            parts.extend(option.text for option in question.options)
+    else:
+        parts = []
+        for item in quiz.legacy_questions():
+            if isinstance(item, dict):
+                parts.append(str(item.get('question') or ''))
+                parts.extend(str(option) for option in (item.get('options') or []))
+    return quiz.title or '', quiz.description or '', quiz.category or '', '\n'.join(parts)
+
+
+class LikeSearchBackend:
+    """Portable fallback: substring match on title and description, no ranking or snippets"""
+
+    name = 'like'
+
+    def setup(self):
+        return True
+
+    def index(self, quiz):
+        pass
+
+    def remove(self, quiz_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def filter(self, query, term):
+        pattern = f'%{term}%'
+        return query.filter(db.or_(Quiz.title.ilike(pattern), Quiz.description.ilike(pattern)))
+
+    def ranked(self, term, limit, category=None, difficulty=None):
+        """Return [(quiz_id, rank, snippet)] best first"""
+        pattern = f'%{term}%'
+        query = db.session.query(Quiz.id).filter(
+            db.or_(Quiz.title.ilike(pattern), Quiz.description.ilike(pattern))
+        )
+        rows = _filter_catalogue(query, category, difficulty).order_by(Quiz.id.desc()).limit(limit).all()
+        return [(row.id, None, None) for row in rows]
+
+
+CREATE_FTS5_INDEX = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS quiz_search USING fts5("
+    "title, description, category, content, tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+
+class Fts5SearchBackend:
+    """SQLite FTS5 index ranked by BM25 with highlighted snippets"""
+
+    name = 'fts5'
+    # BM25 column weights: a title hit outranks one buried in question text
+    WEIGHTS = (10.0, 4.0, 2.0, 1.0)
+    enabled = False  # set once FTS5 is known to work; lets create_all/drop_all manage the index
+
+    def setup(self):
+        """Create the index if missing; returns False if this SQLite lacks FTS5"""
+        try:
+            db.session.execute(text(CREATE_FTS5_INDEX))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            return False
+        Fts5SearchBackend.enabled = True
+
+        # Rebuild if the index is out of step with the quizzes table (new index, restored backup...)
+        indexed = db.session.execute(text("SELECT COUNT(*) FROM quiz_search")).scalar()
+        if indexed != Quiz.query.count():
+            self.rebuild()
+        return True
+
+    def index(self, quiz):
+        """(Re)index one quiz in the current transaction"""
+        title, description, category, content = quiz_document(quiz)
+        self.remove(quiz.id)
+        db.session.execute(text(
+            "INSERT INTO quiz_search (rowid, title, description, category, content) "
+            "VALUES (:id, :title, :description, :category, :content)"
+        ), {'id': quiz.id, 'title': title, 'description': description,
+            'category': category, 'content': content})
+
+    def remove(self, quiz_id):
+        db.session.execute(text("DELETE FROM quiz_search WHERE rowid = :id"), {'id': quiz_id})
+
+    def rebuild(self):
+        """Re-index every quiz; returns the number indexed"""
+        db.session.execute(text("DELETE FROM quiz_search"))
+        count = 0
+        for quiz_id in [quiz_id for (quiz_id,) in db.session.query(Quiz.id)]:
+            self.index(db.session.get(Quiz, quiz_id))
+            count += 1
+        db.session.commit()
+        return count
+
+    def filter(self, query, term):
+        expression = _match_expression(term)
+        if expression is None:
+            return query.filter(db.false())
+        matches = text("SELECT rowid FROM quiz_search WHERE quiz_search MATCH :expression")
+        return query.filter(Quiz.id.in_(matches.bindparams(expression=expression)))
+
+    def ranked(self, term, limit, category=None, difficulty=None):
+        """
+        Return [(quiz_id, bm25 rank, highlighted snippet)] best first
+
+        Category and difficulty are applied inside the ranked query, so the limit counts
+        matching quizzes only. Snippets are HTML-escaped apart from their <mark> tags.
+        """
+        expression = _match_expression(term)
+        if expression is None:
+            return []
+        conditions = ["quiz_search MATCH :expression"]
+        params = {'expression': expression, 'limit': limit, 'start': MARK_START, 'end': MARK_END}
+        if category:
+            conditions.append("quizzes.category = :category")
+            params['category'] = category
+        if difficulty:
+            conditions.append("quizzes.difficulty = :difficulty")
+            params['difficulty'] = difficulty
+        rows = db.session.execute(text(
+            "SELECT quiz_search.rowid AS rowid, bm25(quiz_search, {}, {}, {}, {}) AS rank, "
+            "snippet(quiz_search, -1, :start, :end, '…', 12) AS snippet "
+            "FROM quiz_search JOIN quizzes ON quizzes.id = quiz_search.rowid "
+            "WHERE {} ORDER BY rank LIMIT :limit".format(*self.WEIGHTS, ' AND '.join(conditions))
+        ), params).fetchall()
+        return [(row.rowid, row.rank, _highlight(row.snippet)) for row in rows]
+
+
+def _fts5_enabled(ddl, target, bind, **kw):
+    return Fts5SearchBackend.enabled and bind.dialect.name == 'sqlite'
+
+
+# Keep the index's lifecycle tied to the quizzes table so db.drop_all()/create_all()
+# never leave stale documents pointing at reused quiz ids
+db.event.listen(Quiz.__table__, 'after_create', db.DDL(CREATE_FTS5_INDEX).execute_if(callable_=_fts5_enabled))
+db.event.listen(Quiz.__table__, 'after_drop',
+                db.DDL('DROP TABLE IF EXISTS quiz_search').execute_if(callable_=_fts5_enabled))
+
+
+BACKENDS = {
+    'fts5': Fts5SearchBackend,
+    'like': LikeSearchBackend,
+}
+
+
+class QuizSearch:
+    """Facade over the configured search backend"""
+
+    def __init__(self):
+        self.backend = LikeSearchBackend()
+        self.max_results = 200
+
+    def init_app(self, app):
+        """Pick the backend from QUIZ_SEARCH_BACKEND ('auto' = FTS5 on SQLite, else LIKE)"""
+        self.max_results = app.config.get('QUIZ_SEARCH_MAX_RESULTS', self.max_results)
+        name = app.config.get('QUIZ_SEARCH_BACKEND', 'auto')
+        with app.app_context():
+            if name == 'auto':
+                name = 'fts5' if db.engine.dialect.name == 'sqlite' else 'like'
+            backend = BACKENDS[name]()
+            try:
+                ready = backend.setup()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.warning(f"Could not set up '{name}' quiz search: {str(e)}")
+                ready = False
+            if not ready:
+                app.logger.warning(f"Quiz search backend '{name}' unavailable, falling back to LIKE")
+                backend = LikeSearchBackend()
+        self.backend = backend
+
+    def index(self, quiz):
+        self.backend.index(quiz)
+
+    def remove(self, quiz_id):
+        self.backend.remove(quiz_id)
+
+    def rebuild(self):
+        return self.backend.rebuild()
+
+    def filter(self, query, term):
+        return self.backend.filter(query, term)
+
+    def ranked(self, term, limit=None, category=None, difficulty=None):
+        return self.backend.ranked(term, limit or self.max_results, category, difficulty)
+
+
+quiz_search = QuizSearch()
+
+
+@click.command('search-reindex')
+@with_appcontext
+def search_reindex_command():
+    """Rebuild the quiz full-text search index"""
+    count = quiz_search.rebuild()
+    click.echo(f"Indexed {count} quizzes with the '{quiz_search.backend.name}' backend")
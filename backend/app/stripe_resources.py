@@ -7,6 +7,7 @@ from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from .models import User, StripeSubscription, Payment, _process_subscription_by_email
 from .extensions import db
+from .current_user import resolve_current_user
 
 class StripeCheckoutSessionResource(Resource):
     @jwt_required()
@@ -21,30 +22,7 @@ class StripeCheckoutSessionResource(Resource):
             user_id = get_jwt_identity()
             current_app.logger.info(f"Creating checkout session for user_id: {user_id}")
             
-            # For OAuth users with Google ID, find user by google_id
-            user = None
-            try:
-                # Try to convert to int to see if it's a regular user ID
-                numeric_id = int(user_id)
-                if numeric_id < 1000000000:  # Small number, likely regular user ID
-                    user = User.query.get(numeric_id)
-                else:
-                    # Large number, likely Google ID - search by google_id as string
-                    user = User.query.filter_by(google_id=user_id).first()
-            except (ValueError, TypeError, OverflowError):
-                # If conversion fails, try as Google ID string
-                user = User.query.filter_by(google_id=user_id).first()
-            
-            # If still not found, try both fields
-            if not user:
-                user = User.query.filter_by(google_id=user_id).first()
-                if not user:
-                    try:
-                        numeric_id = int(user_id)
-                        user = User.query.get(numeric_id)
-                    except (ValueError, TypeError, OverflowError):
-                        pass
-
+            user = resolve_current_user()
             if not user:
                 current_app.logger.warning(f"User not found for ID: {user_id} during checkout session creation.")
                 return {'error': 'User not found'}, 404
@@ -7,6 +7,8 @@ from flask_jwt_extended import get_jwt
 from utils.helpers import sanitize_input, validate_email
 from .models import User, BlacklistedToken
 from .extensions import db
+from .revocation_cache import revocation_cache
+from .current_user import find_user_by_identity
 import logging
 from datetime import datetime, timedelta
 
@@ -52,26 +54,24 @@ class TokenBlacklistManager:
         Blacklist all active tokens for a specific user
         This is useful for "logout from all devices" functionality
         
+        Bumps the user's token epoch, so every token issued before now is rejected
+        until it expires, while tokens issued afterwards stay valid.
+        
         Args:
-            user_id (int or str): User ID whose tokens should be blacklisted
+            user_id (int or str): User ID (or google_id for OAuth users) whose tokens should be blacklisted
         """
         try:
             # Convert user_id to string to handle large OAuth IDs
             user_id_str = str(user_id)
             
-            # Create a special blacklist entry that invalidates all tokens for this user
-            # We use a special jti pattern to mark all tokens for this user as invalid
-            # Set short expiry to avoid blocking future logins
-            special_jti = f"user_logout_all_{user_id_str}_{datetime.utcnow().timestamp()}"
+            user = find_user_by_identity(user_id_str)
+            if not user:
+                current_app.logger.warning(f"Cannot blacklist tokens for unknown user {user_id_str}")
+                return False
             
-            blacklisted_token = BlacklistedToken(
-                jti=special_jti,
-                token_type='all_user_tokens',
-                user_id=user_id_str,
-                expires_at=datetime.utcnow() + timedelta(hours=1)  # Only 1 hour to avoid blocking future logins
-            )
-            db.session.add(blacklisted_token)
+            user.revoke_all_tokens()
             db.session.commit()
+            revocation_cache.set_epoch(user)
             
             current_app.logger.info(f"All tokens blacklisted for user {user_id_str}")
             return True
@@ -81,38 +81,22 @@ class TokenBlacklistManager:
             return False
     
     @staticmethod
-    def is_token_blacklisted(jti, user_id=None):
+    def is_token_blacklisted(jti, user_id=None, issued_at=None, token_type='access'):
         """
         Check if a token is blacklisted
+        Served from the in-process revocation cache, so no SQL is issued on the common path
         
         Args:
             jti (str): JWT ID to check
             user_id (int or str, optional): User ID for additional checks
+            issued_at (int, optional): Token 'iat' claim, compared against user-wide revocations
+            token_type (str, optional): Token 'type' claim; claim changes only revoke access tokens
             
         Returns:
             bool: True if token is blacklisted
         """
         try:
-            # Check direct blacklist
-            if BlacklistedToken.is_blacklisted(jti):
-                return True
-            
-            # Check if all user tokens are blacklisted
-            if user_id:
-                # Convert user_id to string to handle large OAuth IDs
-                user_id_str = str(user_id)
-                
-                user_blacklist = BlacklistedToken.query.filter(
-                    BlacklistedToken.user_id == user_id_str,
-                    BlacklistedToken.token_type == 'all_user_tokens',
-                    BlacklistedToken.expires_at > datetime.utcnow()
-                ).first()
-                
-                if user_blacklist:
-                    current_app.logger.info(f"Token {jti} blacklisted via user-wide blacklist for user {user_id_str}")
-                    return True
-            
-            return False
+            return revocation_cache.is_revoked(jti, user_id, issued_at, token_type)
         except Exception as e:
             current_app.logger.error(f"Error checking blacklist status for token {jti}: {str(e)}")
             # On error, be safe and consider token valid to avoid blocking legitimate users
@@ -125,15 +109,17 @@ class TokenBlacklistManager:
         This should be called periodically to keep the database clean
         
         Returns:
-            int: Number of tokens removed
+            tuple: (number of tokens removed, seconds taken)
         """
         try:
-            expired_count = BlacklistedToken.cleanup_expired_tokens()
-            current_app.logger.info(f"Cleaned up {expired_count} expired blacklisted tokens")
-            return expired_count
+            expired_count, elapsed = BlacklistedToken.purge_expired_tokens()
+            revocation_cache.prune()
+            current_app.logger.info(f"Cleaned up {expired_count} expired blacklisted tokens in {elapsed:.3f}s")
+            return expired_count, elapsed
         except Exception as e:
             current_app.logger.error(f"Error cleaning up expired tokens: {str(e)}")
-            return 0
+            db.session.rollback()
+            return 0, 0.0
 
 def setup_jwt_blacklist_callbacks(jwt_manager):
     """
@@ -168,7 +154,8 @@ def setup_jwt_blacklist_callbacks(jwt_manager):
             current_app.logger.warning(f"Invalid user_id in JWT payload: {user_id}")
             user_id = None
         
-        is_blacklisted = TokenBlacklistManager.is_token_blacklisted(jti, user_id)
+        is_blacklisted = TokenBlacklistManager.is_token_blacklisted(jti, user_id, jwt_payload.get('iat'),
+                                                                    jwt_payload.get('type', 'access'))
         
         if is_blacklisted:
             current_app.logger.info(f"Blocked blacklisted token {jti} for user {user_id}")
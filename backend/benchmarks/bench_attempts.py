@@ -0,0 +1,83 @@
+"""
+Benchmark of server-side quiz attempt scoring (QuizController.submit_attempt)
+
+Usage:
+    python benchmarks/bench_attempts.py --questions 20 --submissions 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from app.extensions import db
+from app.models import Quiz, User
+from app.compiled_quizzes import compiled_quizzes
+from app.quiz_controller import QuizController
+
+
+def create_app(db_path):
+    """Create a minimal Flask app bound to the benchmark database"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def populate(questions):
+    """Create one user and one quiz with `questions` four-option questions"""
+    user = User(username='bench', email='bench@example.com')
+    db.session.add(user)
+    quiz = Quiz(title='Benchmark quiz', author_id=None)
+    quiz.set_questions([
+        (f'Question {i}?', ['A', 'B', 'C', 'D'], random.randrange(4)) for i in range(questions)
+    ])
+    db.session.add(quiz)
+    db.session.commit()
+    return user.id, quiz.id
+
+
+def run(quiz_id, user_id, submissions, questions, cached):
+    start = time.perf_counter()
+    for _ in range(submissions):
+        if not cached:
+            compiled_quizzes.clear()
+        answers = [random.randrange(4) for _ in range(questions)]
+        _, error = QuizController.submit_attempt(quiz_id, user_id, {'answers': answers})
+        assert error is None, error
+    return submissions / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--submissions', type=int, default=5000)
+    args = parser.parse_args()
+
+    db_fd, db_path = tempfile.mkstemp(suffix='.db')
+    app = create_app(db_path)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            user_id, quiz_id = populate(args.questions)
+
+            uncached = run(quiz_id, user_id, args.submissions // 5, args.questions, cached=False)
+            cached = run(quiz_id, user_id, args.submissions, args.questions, cached=True)
+
+            print(f"Questions per quiz:                  {args.questions}")
+            print(f"Submissions/s, quiz compiled per call: {uncached:8.0f}")
+            print(f"Submissions/s, cached compiled quiz:   {cached:8.0f}")
+            print(f"Compiled quiz cache:                 {compiled_quizzes.stats()}")
+    finally:
+        os.close(db_fd)
+        os.unlink(db_path)
+
+
+if __name__ == '__main__':
+    main()
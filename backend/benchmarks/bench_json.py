@@ -0,0 +1,86 @@
+"""
+Benchmark of response encoding (app.fast_json) for the /quizzes and /admin/users payloads
+
+"before" is the previous path: to_dict() converting each datetime with .isoformat()
+and the stdlib json encoder. "stdlib" and "orjson" encode the current to_dict() output,
+which keeps datetimes native, with each encoder of app.fast_json.
+
+Usage:
+    python benchmarks/bench_json.py --rows 10000 --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import fast_json
+from app.models import Quiz, User
+
+
+def _isoformat(entry):
+    """What to_dict() returned before: each datetime converted in place with .isoformat()"""
+    for key in ('created_at', 'updated_at', 'premium_since'):
+        if entry.get(key) is not None:
+            entry[key] = entry[key].isoformat()
+    return entry
+
+
+def make_rows(rows):
+    start = datetime(2024, 1, 1)
+    quizzes = [Quiz(id=number, title=f'Quiz {number}', description='Geography basics for everyone',
+                    category='Geography', difficulty='easy', author_id=number % 100, question_count=10,
+                    created_at=start + timedelta(minutes=number), updated_at=start + timedelta(minutes=number, seconds=5))
+               for number in range(1, rows + 1)]
+    users = [User(id=number, username=f'user{number}', email=f'user{number}@example.com', role='user',
+                  is_admin=False, has_premium_access=number % 3 == 0,
+                  created_at=start + timedelta(minutes=number),
+                  premium_since=start + timedelta(days=1, minutes=number) if number % 3 == 0 else None)
+             for number in range(1, rows + 1)]
+    return quizzes, users
+
+
+def best_of(repeat, func):
+    """Best of `repeat` runs of func(), in milliseconds, and its last result"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(name, objects, to_dict, wrap, repeat):
+    paths = [
+        ('before', lambda item: _isoformat(to_dict(item)), lambda payload: json.dumps(payload).encode('utf-8')),
+        ('stdlib', to_dict, fast_json._dumps_stdlib),
+    ]
+    if fast_json.orjson is not None:
+        paths.append(('orjson', to_dict, fast_json._dumps_orjson))
+
+    baseline = None
+    for label, convert, encode in paths:
+        build_ms, payload = best_of(repeat, lambda: wrap([convert(item) for item in objects]))
+        encode_ms, body = best_of(repeat, lambda: encode(payload))
+        baseline = baseline or build_ms + encode_ms
+        print(f"{name:<18} {label:<7} to_dict {build_ms:>7.2f} ms  encode {encode_ms:>7.2f} ms  "
+              f"{len(body) / 1e6:>5.2f} MB  total x{baseline / (build_ms + encode_ms):.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    quizzes, users = make_rows(args.rows)
+    print(f"{args.rows} rows, best of {args.repeat}")
+    run('/quizzes?summary', quizzes, Quiz.to_summary_dict, lambda items: {'quizzes': items}, args.repeat)
+    run('/admin/users', users, lambda user: user.to_dict(), lambda items: {'users': items}, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
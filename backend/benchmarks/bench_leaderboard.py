@@ -0,0 +1,111 @@
+"""
+Benchmark of the in-process leaderboard (app.ranking.Leaderboard) against SQL ranking
+
+Usage:
+    python benchmarks/bench_leaderboard.py --entries 1000000 --operations 20000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.ranking import Leaderboard
+from app.models.leaderboard_snapshot import LeaderboardSnapshot
+
+
+def timed(label, operations, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {elapsed * 1e6 / operations:>10.2f} us/op  ({operations} ops, {elapsed:.2f}s)")
+
+
+def bench_board(entries, operations):
+    rng = random.Random(1)
+    rows = [(user_id, rng.randrange(1_000_000), rng.randrange(1_700_000_000, 1_800_000_000))
+            for user_id in range(1, entries + 1)]
+    users = [rng.randrange(1, entries + 1) for _ in range(operations)]
+
+    board = None
+
+    def build():
+        nonlocal board
+        board = Leaderboard(rows)
+    timed('build', entries, build)
+
+    def update():
+        for user_id in users:
+            board.add_score(user_id, rng.randrange(1000), 1_800_000_000)
+    timed('add_score (remove + insert)', operations, update)
+
+    def rank():
+        for user_id in users:
+            board.rank_of(user_id)
+    timed('rank_of', operations, rank)
+
+    def top():
+        for _ in range(operations):
+            board.top(10)
+    timed('top(10)', operations, top)
+
+    def deep_page():
+        for user_id in users:
+            board.top(10, offset=user_id - 1)
+    timed('top(10, offset=random)', operations, deep_page)
+
+    packed = None
+
+    def pack():
+        nonlocal packed
+        packed = LeaderboardSnapshot.pack(board.entries())
+    timed('snapshot pack', 1, pack)
+    print(f"{'snapshot size':<34} {len(packed) / 1e6:>10.2f} MB")
+
+    def load():
+        Leaderboard(LeaderboardSnapshot(entries=packed).unpack())
+    timed('snapshot load', 1, load)
+    return rows, users
+
+
+def bench_sql(rows, users, operations):
+    """The same board as an indexed SQLite table ranked with COUNT(*)"""
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE board (user_id INTEGER PRIMARY KEY, score INTEGER, achieved_at INTEGER)")
+    conn.executemany("INSERT INTO board VALUES (?, ?, ?)", rows)
+    conn.execute("CREATE INDEX ix_board_rank ON board (score DESC, achieved_at)")
+    # COUNT(*) over the index is O(rank), so sample fewer lookups
+    sample = users[:max(1, operations // 100)]
+
+    def rank():
+        for user_id in sample:
+            score, achieved_at = conn.execute(
+                "SELECT score, achieved_at FROM board WHERE user_id = ?", (user_id,)).fetchone()
+            conn.execute("SELECT COUNT(*) FROM board WHERE score > ? OR (score = ? AND achieved_at < ?)",
+                         (score, score, achieved_at)).fetchone()
+    timed('SQL rank (COUNT(*))', len(sample), rank)
+
+    def top():
+        for _ in range(operations):
+            conn.execute("SELECT user_id, score FROM board ORDER BY score DESC, achieved_at LIMIT 10").fetchall()
+    timed('SQL top(10)', operations, top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    parser.add_argument('--operations', type=int, default=20_000)
+    parser.add_argument('--skip-sql', action='store_true')
+    args = parser.parse_args()
+
+    print(f"Leaderboard with {args.entries} entries")
+    rows, users = bench_board(args.entries, args.operations)
+    if not args.skip_sql:
+        bench_sql(rows, users, args.operations)
+
+
+if __name__ == '__main__':
+    main()
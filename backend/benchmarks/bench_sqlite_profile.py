@@ -0,0 +1,135 @@
+"""
+Load test of the SQLite engine profiles (app.sqlite_profile): 'stock' against 'wal'
+
+Several worker processes, each with a few threads, share one database file the way
+gunicorn workers do. Reader threads run the app's typical point lookups and short
+listings; writer threads insert revoked tokens and bump counters like the webhook
+and blacklist writers. Throughput and "database is locked" errors are reported.
+
+Usage:
+    python benchmarks/bench_sqlite_profile.py --workers 4 --threads 4 --writers 1 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app import sqlite_profile
+
+ROWS = 20_000
+
+
+def make_engine(path, profile, threads):
+    config = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'SQLITE_ENGINE_PROFILE': profile,
+        'SQLITE_WORKER_THREADS': threads,
+    }
+    engine = create_engine(config['SQLALCHEMY_DATABASE_URI'], **sqlite_profile.engine_options(config))
+    sqlite_profile.install(engine, config)
+    return engine
+
+
+def setup(path):
+    engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username TEXT, quizzes_taken INTEGER DEFAULT 0)")
+        connection.exec_driver_sql(
+            "CREATE TABLE blacklisted_tokens (id INTEGER PRIMARY KEY, jti TEXT UNIQUE, revoked_at REAL)")
+        connection.execute(text("INSERT INTO users (id, username) VALUES (:id, :name)"),
+                           [{'id': row, 'name': f'user{row}'} for row in range(1, ROWS + 1)])
+    engine.dispose()
+
+
+def reader(engine, deadline, counts):
+    rng = random.Random()
+    while time.monotonic() < deadline:
+        try:
+            with engine.connect() as connection:
+                user_id = rng.randrange(1, ROWS + 1)
+                connection.execute(text("SELECT * FROM users WHERE id = :id"), {'id': user_id}).fetchone()
+                connection.execute(text("SELECT id, username FROM users WHERE id > :id ORDER BY id LIMIT 20"),
+                                   {'id': user_id}).fetchall()
+            counts['reads'] += 1
+        except OperationalError:
+            counts['errors'] += 1
+
+
+def writer(engine, deadline, counts):
+    rng = random.Random()
+    while time.monotonic() < deadline:
+        try:
+            with engine.begin() as connection:
+                connection.execute(text("INSERT INTO blacklisted_tokens (jti, revoked_at) VALUES (:jti, :at)"),
+                                   {'jti': uuid.uuid4().hex, 'at': time.time()})
+                connection.execute(text("UPDATE users SET quizzes_taken = quizzes_taken + 1 WHERE id = :id"),
+                                   {'id': rng.randrange(1, ROWS + 1)})
+            counts['writes'] += 1
+        except OperationalError:
+            counts['errors'] += 1
+
+
+def worker(path, profile, threads, writers, seconds, start_at, results):
+    engine = make_engine(path, profile, threads)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    deadline = time.monotonic() + seconds
+    counts = [{'reads': 0, 'writes': 0, 'errors': 0} for _ in range(threads)]
+    pool = [threading.Thread(target=writer if index < writers else reader, args=(engine, deadline, counts[index]))
+            for index in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    engine.dispose()
+    results.put({key: sum(count[key] for count in counts) for key in ('reads', 'writes', 'errors')})
+
+
+def run(profile, workers, threads, writers, seconds):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, f'{profile}.db')
+    setup(path)
+
+    results = multiprocessing.Queue()
+    start_at = time.time() + 1.0  # let every worker open its engine first
+    processes = [multiprocessing.Process(target=worker, args=(path, profile, threads, writers, seconds, start_at, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    totals = {'reads': 0, 'writes': 0, 'errors': 0}
+    for _ in processes:
+        for key, value in results.get().items():
+            totals[key] += value
+    for process in processes:
+        process.join()
+
+    print(f"{profile:<6} reads {totals['reads'] / seconds:>10.0f}/s   writes {totals['writes'] / seconds:>8.0f}/s"
+          f"   locked errors {totals['errors']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4, help='Processes sharing the database')
+    parser.add_argument('--threads', type=int, default=4, help='Threads per worker')
+    parser.add_argument('--writers', type=int, default=1, help='Writer threads per worker')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers x {args.threads} threads ({args.writers} writing), {args.seconds:.0f}s per profile")
+    for profile in ('stock', 'wal'):
+        run(profile, args.workers, args.threads, args.writers, args.seconds)
+
+
+if __name__ == '__main__':
+    main()
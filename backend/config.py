@@ -2,8 +2,17 @@ import os
 from datetime import timedelta
 import stripe
 class Config:
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///baza.db'
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///baza.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')  # Read replica for @replica_reads handlers, see app.read_replica
+    READ_REPLICA_STICKY_SECONDS = 5  # Reads stay on the primary this long after a client's own write
+    REPLICA_SYNC_SECONDS = 10  # Backup-API refresh of a local SQLite replica
+    SQLITE_ENGINE_PROFILE = os.getenv('SQLITE_ENGINE_PROFILE', 'wal')  # 'wal' or 'stock', see app.sqlite_profile
+    SQLITE_WORKER_THREADS = int(os.getenv('SQLITE_WORKER_THREADS', 4))  # Request threads per worker process; sizes the pool
+    SQLITE_BUSY_TIMEOUT_MS = 5000  # How long a writer waits for the lock before "database is locked"
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB = 64 * 1024
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=5000)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(seconds=30000)
     JWT_TOKEN_LOCATION = ["headers", "cookies"]
@@ -11,5 +20,29 @@ class Config:
     JWT_COOKIE_CSRF_PROTECT = False  # Enable in production
     JWT_ACCESS_COOKIE_PATH = "/"
     JWT_REFRESH_COOKIE_PATH = "/"
+    REVOCATION_CACHE_REFRESH_SECONDS = 5  # How often each process polls for tokens revoked elsewhere
+    BLACKLIST_FILTER_MIN_CAPACITY = 100000
+    BLACKLIST_FILTER_ERROR_RATE = 0.01
+    BLACKLIST_PURGE_BATCH_SIZE = 5000  # Rows deleted per batch by the expired-token purge
+    BLACKLIST_PURGE_PAUSE_SECONDS = 0.05  # Pause between batches so other writers get the lock
+    PAGINATION_DEFAULT_LIMIT = 20
+    PAGINATION_MAX_LIMIT = 100  # Upper bound on ?limit= for every cursor-paginated list
+    QUIZ_SEARCH_BACKEND = 'auto'  # 'fts5', 'like' or 'auto' (FTS5 on SQLite)
+    QUIZ_SEARCH_MAX_RESULTS = 200
+    COMPILED_QUIZ_CACHE_SIZE = 1024  # Quizzes kept compiled (redacted payload + answer key) per process
+    CURRENT_USER_CACHE_SIZE = 4096
+    CURRENT_USER_CACHE_TTL_SECONDS = 30  # Upper bound on how long another worker's user changes go unseen
+    DASHBOARD_STATS_TTL_SECONDS = 300  # Full recount of the admin dashboard; local writes adjust it meanwhile
+    ANALYTICS_MAX_DAYS = 1100  # Longest /admin/analytics range
+    LEADERBOARD_REFRESH_SECONDS = 5  # How often readers pull attempts saved by other workers
+    LEADERBOARD_DEFAULT_LIMIT = 10
+    LEADERBOARD_MAX_LIMIT = 100
+    JSON_ENCODER = 'auto'  # 'orjson', 'stdlib' or 'auto' (orjson when installed), see app.fast_json
+    CACHE_SHARED_URL = os.getenv('CACHE_SHARED_URL')  # 'redis://host:6379/0', 'memory://' (in-process stand-in) or unset
+    CACHE_LOCAL_MAX_ENTRIES = 10000
+    CACHE_DEFAULT_TTL_SECONDS = 300
+    CACHE_LOCAL_TTL_SECONDS = 5  # With a shared tier: how long other workers' invalidations can go unseen locally
+    CACHE_COALESCE_TIMEOUT_SECONDS = 10  # Longest wait for another thread/worker computing the same key
+    QUIZ_CATALOGUE_CACHE_TTL_SECONDS = 60  # Pre-encoded /quizzes responses; capped at CACHE_LOCAL_TTL_SECONDS without a shared tier
     STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY")
     STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
\ No newline at end of file
@@ -2,6 +2,7 @@
 """
 Database Migration Script for Admin Panel Features
 Adds role field to User model and creates OfflinePayment table
+Adds per-user token epochs replacing "logout all devices" blacklist rows
 """
 
 import sys
@@ -23,18 +24,18 @@ def run_migration():
         
         try:
             # Check if role column exists in User table
-            result = db.engine.execute(text("PRAGMA table_info(user)"))
+            result = db.session.execute(text("PRAGMA table_info(users)"))
             columns = [row[1] for row in result]
             
             if 'role' not in columns:
                 print("Adding 'role' column to User table...")
-                db.engine.execute(text("ALTER TABLE user ADD COLUMN role VARCHAR(20) DEFAULT 'user'"))
+                db.session.execute(text("ALTER TABLE users ADD COLUMN role VARCHAR(20) DEFAULT 'user'"))
                 print("✓ Role column added successfully")
             else:
                 print("✓ Role column already exists")
             
             # Check if OfflinePayment table exists
-            result = db.engine.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name='offline_payment'"))
+            result = db.session.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name='offline_payments'"))
             table_exists = result.fetchone() is not None
             
             if not table_exists:
@@ -47,7 +48,7 @@ def run_migration():
             
             # Update existing users to have 'user' role if they don't have one
             print("Updating existing users with default role...")
-            db.engine.execute(text("UPDATE user SET role = 'user' WHERE role IS NULL OR role = ''"))
+            db.session.execute(text("UPDATE users SET role = 'user' WHERE role IS NULL OR role = ''"))
             print("✓ Existing users updated with default role")
             
             db.session.commit()
@@ -67,5 +68,111 @@ def run_migration():
             db.session.rollback()
             sys.exit(1)
 
+def migrate_token_epochs():
+    """Add users.tokens_valid_after / claims_valid_after and convert legacy 'all_user_tokens' blacklist rows"""
+    app = create_app()
+    
+    with app.app_context():
+        print("Migrating 'logout all devices' entries to token epochs...")
+        
+        try:
+            columns = [row[1] for row in db.session.execute(text("PRAGMA table_info(users)"))]
+            if 'tokens_valid_after' not in columns:
+                print("Adding 'tokens_valid_after' column to users table...")
+                db.session.execute(text("ALTER TABLE users ADD COLUMN tokens_valid_after DATETIME"))
+                print("✓ tokens_valid_after column added successfully")
+            else:
+                print("✓ tokens_valid_after column already exists")
+            
+            if 'claims_valid_after' not in columns:
+                print("Adding 'claims_valid_after' column to users table...")
+                db.session.execute(text("ALTER TABLE users ADD COLUMN claims_valid_after DATETIME"))
+                print("✓ claims_valid_after column added successfully")
+            else:
+                print("✓ claims_valid_after column already exists")
+            
+            # Each legacy sentinel row becomes the user's epoch; the row itself is no longer needed
+            legacy_rows = db.session.execute(text(
+                "SELECT user_id, MAX(revoked_at) FROM blacklisted_tokens "
+                "WHERE token_type = 'all_user_tokens' GROUP BY user_id"
+            )).fetchall()
+            for user_id, revoked_at in legacy_rows:
+                db.session.execute(text(
+                    "UPDATE users SET tokens_valid_after = :revoked_at "
+                    "WHERE (CAST(id AS TEXT) = :user_id OR google_id = :user_id) "
+                    "AND (tokens_valid_after IS NULL OR tokens_valid_after < :revoked_at)"
+                ), {'user_id': user_id, 'revoked_at': revoked_at})
+            db.session.execute(text("DELETE FROM blacklisted_tokens WHERE token_type = 'all_user_tokens'"))
+            
+            db.session.commit()
+            print(f"✓ Converted {len(legacy_rows)} legacy 'logout all devices' entries")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            db.session.rollback()
+            sys.exit(1)
+
+def migrate_quiz_questions():
+    """Convert Quiz.questions_json blobs into Question/AnswerOption rows and backfill quizzes.question_count"""
+    app = create_app()
+    
+    with app.app_context():
+        print("Converting quiz question blobs to question tables...")
+        
+        try:
+            from app.models import Quiz
+            db.create_all()
+            
+            columns = [row[1] for row in db.session.execute(text("PRAGMA table_info(quizzes)"))]
+            if 'question_count' not in columns:
+                print("Adding 'question_count' column to quizzes table...")
+                db.session.execute(text("ALTER TABLE quizzes ADD COLUMN question_count INTEGER NOT NULL DEFAULT 0"))
+                db.session.execute(text(
+                    "UPDATE quizzes SET question_count = "
+                    "(SELECT COUNT(*) FROM questions WHERE questions.quiz_id = quizzes.id)"
+                ))
+                db.session.commit()
+                print("✓ question_count column added successfully")
+            
+            quiz_ids = [quiz_id for (quiz_id,) in db.session.query(Quiz.id).filter(Quiz.questions_json.isnot(None))]
+            converted = 0
+            for quiz_id in quiz_ids:
+                if Quiz.query.get(quiz_id).normalize_questions():
+                    converted += 1
+                if converted % 100 == 0:
+                    db.session.commit()
+            db.session.commit()
+            print(f"✓ Converted questions of {converted} quizzes")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            db.session.rollback()
+            sys.exit(1)
+
+def migrate_indexes():
+    """Create any index declared on the models that the database does not have yet"""
+    app = create_app()
+    
+    with app.app_context():
+        print("Creating missing indexes...")
+        
+        try:
+            created = 0
+            existing = set()
+            for table in db.metadata.sorted_tables:
+                existing.update(index['name'] for index in db.inspect(db.engine).get_indexes(table.name))
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    if index.name not in existing:
+                        index.create(bind=db.engine)
+                        created += 1
+                        print(f"✓ Created index {index.name}")
+            print(f"✓ {created} indexes created")
+            print("   Run 'flask --app run index-advisor' to check query plans")
+        except Exception as e:
+            print(f"❌ Migration failed: {str(e)}")
+            sys.exit(1)
+
 if __name__ == "__main__":
     run_migration()
+    migrate_token_epochs()
+    migrate_quiz_questions()
+    migrate_indexes()
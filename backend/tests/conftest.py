@@ -7,9 +7,14 @@ the Flask application with SQLAlchemy models and JWT authentication.
 
 import pytest
 import os
+from sqlalchemy import event
 import tempfile
 from app import create_app
 from app.extensions import db
+from app.current_user import current_user_cache
+from app.revocation_cache import revocation_cache
+from app.dashboard_stats import dashboard_stats
+from app.cache import cache
 from app.models import User, Quiz, StripeSubscription, OfflinePayment, BlacklistedToken
 from werkzeug.security import generate_password_hash
 from datetime import datetime, timedelta
@@ -78,6 +83,11 @@ def db_session(app):
         for table in reversed(db.metadata.sorted_tables):
             db.session.execute(table.delete())
         db.session.commit()
+        # Rows were deleted behind the ORM's back; ids are reused by the next test
+        current_user_cache.clear()
+        revocation_cache.load()
+        dashboard_stats.clear()
+        cache.clear()
 
 
 @pytest.fixture
@@ -341,6 +351,37 @@ def premium_auth_headers(client, premium_user):
     }
 
 
+
+class QueryCounter:
+    """Collects the SQL statements executed while active"""
+    
+    def __init__(self):
+        self.statements = []
+    
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+    
+    def __enter__(self):
+        # Keep the periodic revocation poll out of the count
+        self._refresh_interval = revocation_cache.refresh_interval
+        revocation_cache.refresh_interval = 3600
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+        return self
+    
+    def __exit__(self, *exc_info):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+        revocation_cache.refresh_interval = self._refresh_interval
+    
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def query_counter(app):
+    """Context manager factory for asserting per-request query budgets."""
+    return QueryCounter
+
 # Helper functions for testing
 def create_test_quiz_data():
     """Create test quiz data."""
@@ -7,7 +7,8 @@ and administrative access control.
 
 import pytest
 import json
-from app.models import User, OfflinePayment, StripeSubscription
+import time
+from app.models import User, OfflinePayment, StripeSubscription, Payment
 from datetime import datetime, timedelta
 
 
@@ -48,6 +49,43 @@ class TestAdminDashboard:
         response = client.get('/admin/dashboard')
         
         assert response.status_code == 401
+    
+    def test_admin_dashboard_cached(self, client, db_session, admin_auth_headers):
+        """Test that a repeated dashboard load is served without queries."""
+        from sqlalchemy import event
+        from app.extensions import db
+        from app.revocation_cache import revocation_cache
+        
+        first = client.get('/admin/dashboard', headers=admin_auth_headers).get_json()
+        
+        statements = []
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+        revocation_cache.refresh_interval = 3600
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            second = client.get('/admin/dashboard', headers=admin_auth_headers).get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+            revocation_cache.refresh_interval = 5
+        
+        assert statements == []
+        assert second['users'] == first['users']
+        assert second['freshness']['computed_at'] == first['freshness']['computed_at']
+    
+    def test_admin_dashboard_follows_writes(self, client, db_session, admin_auth_headers, sample_user):
+        """Test that committed writes adjust the cached counters without a recount."""
+        first = client.get('/admin/dashboard', headers=admin_auth_headers).get_json()
+        
+        client.post(f'/admin/users/{sample_user.id}/promote', headers=admin_auth_headers)
+        db_session.add(User(username='dashboarduser', email='dashboard@example.com'))
+        db_session.commit()
+        
+        second = client.get('/admin/dashboard', headers=admin_auth_headers).get_json()
+        assert second['users']['admins'] == first['users']['admins'] + 1
+        assert second['users']['total'] == first['users']['total'] + 1
+        assert second['users']['new_this_month'] == first['users']['new_this_month'] + 1
+        assert second['freshness']['computed_at'] == first['freshness']['computed_at']
 
 
 class TestAdminUserManagement:
@@ -75,6 +113,51 @@ class TestAdminUserManagement:
             assert 'username' in user
             assert 'role' in user
     
+    def test_get_users_cursor_pagination(self, client, db_session, admin_auth_headers, sample_user, premium_user):
+        """Test walking the users list page by page with cursors."""
+        seen = []
+        cursor = None
+        while True:
+            url = '/admin/users?limit=1&include_total=1' + (f'&cursor={cursor}' if cursor else '')
+            response = client.get(url, headers=admin_auth_headers)
+            assert response.status_code == 200
+            page = response.get_json()
+            assert len(page) <= 1
+            seen.extend(user['id'] for user in page)
+            total = int(response.headers['X-Total-Count'])
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        
+        assert len(seen) == total
+        assert len(set(seen)) == total  # no row repeated across pages
+    
+    def test_get_users_invalid_cursor(self, client, db_session, admin_auth_headers):
+        """Test that a malformed cursor is rejected."""
+        response = client.get('/admin/users?cursor=not-a-cursor', headers=admin_auth_headers)
+        assert response.status_code == 400
+        
+        response = client.get('/admin/users?limit=0', headers=admin_auth_headers)
+        assert response.status_code == 400
+    
+    def test_get_users_limit_is_capped(self, app, client, db_session, admin_auth_headers):
+        """Test that ?limit= cannot exceed PAGINATION_MAX_LIMIT."""
+        now = datetime.utcnow()
+        db_session.add_all([
+            User(username=f'bulk{i}', email=f'bulk{i}@example.com', created_at=now - timedelta(seconds=i))
+            for i in range(5)
+        ])
+        db_session.commit()
+        app.config['PAGINATION_MAX_LIMIT'] = 3
+        try:
+            response = client.get('/admin/users?limit=50', headers=admin_auth_headers)
+        finally:
+            app.config['PAGINATION_MAX_LIMIT'] = 100
+        
+        assert response.status_code == 200
+        assert len(response.get_json()) == 3
+        assert 'X-Next-Cursor' in response.headers
+    
     def test_get_all_users_non_admin(self, client, db_session, auth_headers):
         """Test non-admin access to users list (should fail)."""
         response = client.get('/admin/users', headers=auth_headers)
@@ -380,7 +463,279 @@ class TestAdminAccessControl:
         # Test admin access with new token
         response = client.get('/admin/dashboard', headers=new_admin_headers)
         assert response.status_code == 200
+    
+    def test_admin_check_trusts_token_claims(self, app, client, db_session, admin_user):
+        """Test that admin_required authorizes from the signed claims without loading the user."""
+        from sqlalchemy import event
+        from flask_jwt_extended import create_access_token, decode_token
+        from app.admin_middleware import admin_required
+        from app.extensions import db
+        from app.revocation_cache import revocation_cache
+        
+        login_response = client.post('/login', json={'email': admin_user.email, 'password': 'adminpassword'})
+        token = login_response.get_json()['access_token']
+        assert decode_token(token)['role'] == 'admin'
+        assert decode_token(token)['premium'] is admin_user.has_premium_access
+        
+        @admin_required
+        def view():
+            return 'ok'
+        
+        statements = []
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+        revocation_cache.refresh_interval = 3600
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            with app.test_request_context(headers={'Cookie': f'access_token_cookie={token}'}):
+                assert view() == 'ok'
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+            revocation_cache.refresh_interval = 5
+        
+        assert not [statement for statement in statements if 'FROM users' in statement]
+    
+    def test_role_change_revokes_access_tokens_with_old_claims(self, client, db_session, admin_auth_headers,
+                                                               sample_user):
+        """Test that promoting a user bumps their claims epoch but keeps their sessions."""
+        from app.revocation_cache import revocation_cache
+        
+        issued_before = int(time.time()) - 10
+        response = client.post(f'/admin/users/{sample_user.id}/promote', headers=admin_auth_headers)
+        assert response.status_code == 200
+        
+        db_session.refresh(sample_user)
+        assert sample_user.claims_valid_after is not None
+        assert sample_user.tokens_valid_after is None
+        assert revocation_cache.is_revoked('old-claims', sample_user.id, issued_before) is True
+        assert revocation_cache.is_revoked('old-refresh', sample_user.id, issued_before, 'refresh') is False
+
+
+
+class TestAdminAnalytics:
+    """Test cases for the daily rollups behind /admin/analytics."""
+    
+    def test_rollups_follow_writes(self, client, db_session, admin_auth_headers, sample_user, sample_quiz):
+        """Test that signups and quizzes are counted as they are written."""
+        response = client.get('/admin/analytics', headers=admin_auth_headers)
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['granularity'] == 'day'
+        assert len(data['buckets']) == 30
+        assert data['buckets'][-1] == datetime.utcnow().date().isoformat()
+        assert data['totals']['signups'] == 2  # admin_user and sample_user
+        assert data['totals']['quizzes_created'] == 1
+        assert data['series']['signups'][-1] == 2
+    
+    def test_backfill_matches_incremental_rollups(self, app, db_session, sample_user, premium_user, sample_quiz):
+        """Test that rebuilding from the source tables gives the incrementally kept counters."""
+        from app.analytics import backfill_daily_metrics
+        from app.models import DailyMetric
+        
+        def snapshot():
+            return sorted((row.day, row.metric, row.value) for row in DailyMetric.query.all())
+        incremental = snapshot()
+        
+        backfill_daily_metrics()
+        
+        assert snapshot() == incremental
+        assert 'premium_conversions' in {metric for _, metric, _ in incremental}
+    
+    def test_backfill_agrees_on_event_days(self, app, db_session, sample_user, admin_user):
+        """Test that events recorded after a row was created are dated as the backfill dates them."""
+        from app.analytics import backfill_daily_metrics
+        from app.models import DailyMetric
+        
+        def snapshot():
+            return sorted((row.day, row.metric, row.value) for row in DailyMetric.query.all())
+        
+        long_ago = datetime.utcnow() - timedelta(days=12)
+        payment = Payment(stripe_payment_intent_id='pi_late_failure', amount=9.0, status='pending',
+                          created_at=long_ago)
+        upgraded = User(username='late_upgrade', email='late_upgrade@example.com', created_at=long_ago)
+        offline = OfflinePayment(user_id=sample_user.id, admin_id=admin_user.id, amount=10.0,
+                                 payment_method='cash', status='pending')
+        db_session.add_all([payment, upgraded, offline])
+        db_session.commit()
+        
+        payment.status = 'failed'
+        upgraded.has_premium_access = True  # premium_since left unset
+        offline.approve_payment()
+        db_session.commit()
+        incremental = snapshot()
+        
+        backfill_daily_metrics()
+        
+        assert snapshot() == incremental
+        assert (long_ago.date(), 'failed_payments', 1) in incremental
+        assert (long_ago.date(), 'premium_conversions', 1) in incremental
+    
+    def test_increment_is_one_upsert(self, app, db_session, query_counter):
+        """Test that a counter is created and bumped by one INSERT ... ON CONFLICT each time."""
+        from app.extensions import db
+        from app.models import DailyMetric
+        
+        day = datetime(2024, 1, 15).date()
+        with db.engine.begin() as connection:
+            with query_counter() as queries:
+                DailyMetric.increment(connection, 'attempts', day)
+                DailyMetric.increment(connection, 'attempts', day, amount=2)
+        
+        assert queries.count == 2
+        assert all('ON CONFLICT' in statement for statement in queries.statements)
+        assert db_session.get(DailyMetric, (day, 'attempts')).value == 3
+    
+    def test_monthly_buckets(self, client, db_session, admin_auth_headers):
+        """Test grouping by month."""
+        response = client.get('/admin/analytics?from=2024-01-15&to=2024-03-02&granularity=month',
+                              headers=admin_auth_headers)
+        
+        assert response.status_code == 200
+        assert response.get_json()['buckets'] == ['2024-01-01', '2024-02-01', '2024-03-01']
+    
+    def test_invalid_analytics_parameters(self, client, db_session, admin_auth_headers):
+        """Test that bad dates, ranges and granularities are rejected."""
+        for query in ('from=yesterday', 'from=2024-02-01&to=2024-01-01', 'granularity=hour',
+                      'from=2000-01-01&to=2024-01-01'):
+            response = client.get(f'/admin/analytics?{query}', headers=admin_auth_headers)
+            assert response.status_code == 400, query
+
+
+
+class TestAdminFailedPayments:
+    """Test cases for the paginated, filterable failed payments listing."""
+    
+    @pytest.fixture
+    def failed_rows(self, db_session, sample_user):
+        """Failed payment intents and subscriptions, some sharing a created_at."""
+        now = datetime.utcnow().replace(microsecond=0)
+        tie = now - timedelta(hours=5)
+        rows = []
+        for number, (created_at, amount) in enumerate([
+            (now - timedelta(hours=1), 5.0), (tie, 15.0), (tie, 25.0),
+            (now - timedelta(days=10), 35.0), (now - timedelta(days=40), 45.0)
+        ]):
+            rows.append(Payment(stripe_payment_intent_id=f'pi_failed_{number}', amount=amount,
+                                status='failed', created_at=created_at))
+        rows.append(Payment(stripe_payment_intent_id='pi_succeeded', amount=50.0,
+                            status='succeeded', created_at=now))
+        for number, (created_at, status) in enumerate([
+            (tie, 'past_due'), (now - timedelta(hours=2), 'unpaid'), (now - timedelta(days=3), 'canceled'),
+            (now - timedelta(hours=3), 'active')
+        ]):
+            user = User(username=f'subscriber{number}', email=f'subscriber{number}@example.com')
+            db_session.add(user)
+            db_session.flush()
+            rows.append(StripeSubscription(
+                user_id=user.id,
+                stripe_subscription_id=f'sub_failed_{number}',
+                stripe_customer_id=f'cus_failed_{number}',
+                status=status,
+                current_period_start=created_at,
+                current_period_end=created_at + timedelta(days=30),
+                created_at=created_at
+            ))
+        db_session.add_all(rows)
+        db_session.commit()
+        return rows
+    
+    @staticmethod
+    def _key(item):
+        return (item['type'], item.get('stripe_payment_intent_id') or item.get('stripe_subscription_id'))
+    
+    def test_pages_walk_merged_list_newest_first(self, client, db_session, admin_auth_headers, failed_rows):
+        """Test that cursor pages cover both sources once each, newest first, across ties."""
+        seen = []
+        url = '/admin/payments/failed?limit=2'
+        while url:
+            response = client.get(url, headers=admin_auth_headers)
+            assert response.status_code == 200
+            page = response.get_json()
+            assert len(page) <= 2
+            seen.extend(page)
+            cursor = response.headers.get('X-Next-Cursor')
+            url = f'/admin/payments/failed?limit=2&cursor={cursor}' if cursor else None
+        
+        # 4 failed payments and 3 failing subscriptions fall in the default 30 day window
+        assert len(seen) == 7
+        assert len({self._key(item) for item in seen}) == 7
+        created = [item['created_at'] for item in seen]
+        assert created == sorted(created, reverse=True)
+        assert response.headers['X-Failed-Payments-Count'] == '4'
+        assert response.headers['X-Failed-Subscriptions-Count'] == '3'
+        assert response.headers['X-Total-Count'] == '7'
+    
+    def test_filters(self, client, db_session, admin_auth_headers, failed_rows):
+        """Test status, amount and date range filters and their counts."""
+        response = client.get('/admin/payments/failed?status=past_due,unpaid', headers=admin_auth_headers)
+        assert {item['status'] for item in response.get_json()} == {'past_due', 'unpaid'}
+        assert response.headers['X-Failed-Payments-Count'] == '0'
+        assert response.headers['X-Failed-Subscriptions-Count'] == '2'
+        
+        # Subscriptions carry no amount, so an amount filter leaves only payment intents
+        response = client.get('/admin/payments/failed?min_amount=10&max_amount=30', headers=admin_auth_headers)
+        data = response.get_json()
+        assert sorted(item['amount'] for item in data) == [15.0, 25.0]
+        assert response.headers['X-Failed-Subscriptions-Count'] == '0'
+        
+        start = (datetime.utcnow() - timedelta(days=60)).date().isoformat()
+        end = (datetime.utcnow() - timedelta(days=5)).date().isoformat()
+        response = client.get(f'/admin/payments/failed?from={start}&to={end}', headers=admin_auth_headers)
+        assert sorted(item['amount'] for item in response.get_json()) == [35.0, 45.0]
+    
+    @pytest.mark.parametrize('query', [
+        'status=succeeded', 'from=yesterday', 'min_amount=cheap', 'cursor=garbage',
+        'from=2024-02-01&to=2024-01-01'
+    ])
+    def test_invalid_arguments(self, client, db_session, admin_auth_headers, query):
+        """Test that malformed filters are rejected with 400."""
+        response = client.get(f'/admin/payments/failed?{query}', headers=admin_auth_headers)
+        
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
 
+class TestAdminQueryBudgets:
+    """Fixed query budgets per admin endpoint, so N+1 regressions fail."""
+    
+    # Statements per request regardless of page size; a lazy load per row blows them
+    BUDGETS = {
+        '/admin/users': 1,
+        '/admin/payments/offline': 1,
+        '/admin/payments/offline?include_total=1': 2,
+        '/admin/payments/failed': 3,
+        '/admin/dashboard': 2,
+        '/admin/analytics': 1,
+    }
+    
+    @pytest.fixture
+    def many_payments(self, db_session, admin_user):
+        """20 users, each with an offline payment and a failed subscription."""
+        for number in range(20):
+            user = User(username=f'payer{number}', email=f'payer{number}@example.com')
+            db_session.add(user)
+            db_session.flush()
+            db_session.add(OfflinePayment(user_id=user.id, admin_id=admin_user.id, amount=10.0,
+                                          payment_method='cash', status='pending'))
+            db_session.add(StripeSubscription(
+                user_id=user.id,
+                stripe_subscription_id=f'sub_budget_{number}',
+                stripe_customer_id=f'cus_budget_{number}',
+                status='past_due',
+                current_period_start=datetime.utcnow(),
+                current_period_end=datetime.utcnow() + timedelta(days=30)
+            ))
+        db_session.commit()
+    
+    @pytest.mark.parametrize('endpoint', list(BUDGETS))
+    def test_admin_endpoint_query_budget(self, client, db_session, admin_auth_headers, many_payments,
+                                         query_counter, endpoint):
+        """Test that an admin listing issues a fixed number of queries."""
+        with query_counter() as queries:
+            response = client.get(endpoint, headers=admin_auth_headers)
+        
+        assert response.status_code == 200
+        assert queries.count <= self.BUDGETS[endpoint], '\n'.join(queries.statements)
 
 class TestAdminQuizManagement:
     """Test admin quiz management capabilities."""
@@ -7,7 +7,10 @@ and OAuth authentication flows.
 
 import pytest
 import json
+import time
+from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
+from app.extensions import db
 from app.models import User, BlacklistedToken
 from werkzeug.security import generate_password_hash
 
@@ -275,6 +278,124 @@ class TestUserLogout:
         assert response.status_code == 422 or response.status_code == 401
 
 
+class TestTokenRevocationCache:
+    """Test cases for the in-process revocation cache."""
+    
+    def test_logged_out_token_is_rejected(self, client, db_session, sample_user):
+        """Test that a token revoked on logout can no longer be used."""
+        login_response = client.post('/login', json={
+            'email': sample_user.email,
+            'password': 'testpassword'
+        })
+        assert login_response.status_code == 200
+        
+        response = client.post('/logout', json={})
+        assert response.status_code == 200
+        
+        # The cookie still holds the revoked access token
+        response = client.get('/users/me')
+        assert response.status_code == 401
+    
+    def test_revocation_check_issues_no_sql(self, app, db_session):
+        """Test that checking a token that was never revoked is served from memory."""
+        from sqlalchemy import event
+        from app.revocation_cache import revocation_cache
+        from app.user_controller import TokenBlacklistManager
+        
+        TokenBlacklistManager.blacklist_token(
+            jti='cached-jti',
+            token_type='access',
+            user_id=1,
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        )
+        revocation_cache.refresh_interval = 3600
+        
+        statements = []
+        def count(*args, **kwargs):
+            statements.append(args)
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            assert TokenBlacklistManager.is_token_blacklisted('other-jti', 1) is False
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+            revocation_cache.refresh_interval = 5
+        
+        assert statements == []
+        assert TokenBlacklistManager.is_token_blacklisted('cached-jti', 1) is True
+    
+    def test_premium_purchase_keeps_session_and_refreshes_claims(self, client, db_session, sample_user):
+        """Test that a claim change only retires access tokens; /refresh issues one with the new claims."""
+        from flask_jwt_extended import decode_token
+        from app.revocation_cache import revocation_cache
+        
+        response = client.post('/login', json={'email': sample_user.email, 'password': 'testpassword'})
+        assert response.status_code == 200
+        old_access = response.get_json()['access_token']
+        time.sleep(1)  # iat has one-second resolution
+        
+        # What the Stripe webhook and offline-payment approval do
+        sample_user.has_premium_access = True
+        sample_user.premium_since = datetime.utcnow()
+        db_session.commit()
+        
+        old_claims = decode_token(old_access, allow_expired=True)
+        assert revocation_cache.is_revoked(old_claims['jti'], sample_user.id, old_claims['iat']) is True
+        
+        response = client.post('/refresh')
+        assert response.status_code == 200
+        assert decode_token(response.get_json()['access_token'])['premium'] is True
+        assert client.get('/users/me').get_json()['has_premium_access'] is True
+    
+    def test_logout_all_revokes_tokens_issued_before(self, app, db_session, sample_user):
+        """Test that the per-user token epoch only revokes tokens issued before it."""
+        from app.revocation_cache import revocation_cache
+        from app.user_controller import TokenBlacklistManager
+        
+        issued_before = int(time.time()) - 10
+        assert TokenBlacklistManager.blacklist_all_user_tokens(str(sample_user.id)) is True
+        assert sample_user.tokens_valid_after is not None
+        
+        assert revocation_cache.is_revoked('jti-a', sample_user.id, issued_before) is True
+        assert revocation_cache.is_revoked('jti-b', sample_user.id, int(time.time()) + 10) is False
+        assert revocation_cache.is_revoked('jti-c', sample_user.id + 1, issued_before) is False
+        
+        assert revocation_cache.is_revoked('jti-d', sample_user.id, issued_before, 'refresh') is True
+        
+        # The epoch does not lapse with the old one-hour sentinel expiry
+        assert BlacklistedToken.query.filter_by(token_type='all_user_tokens').count() == 0
+    
+    def test_logout_all_devices_rejects_existing_token(self, client, db_session, sample_user):
+        """Test that logging out of all devices rejects a token issued earlier."""
+        client.post('/login', json={
+            'email': sample_user.email,
+            'password': 'testpassword'
+        })
+        # Move the epoch past the token's issue second
+        time.sleep(1.1)
+        
+        response = client.post('/logout', json={'logout_all': True})
+        assert response.status_code == 200
+        
+        response = client.get('/users/me')
+        assert response.status_code == 401
+    
+    def test_cache_picks_up_rows_written_elsewhere(self, app, db_session):
+        """Test that rows inserted by another process are seen after a refresh."""
+        from app.revocation_cache import revocation_cache
+        
+        token = BlacklistedToken(
+            jti='external-jti',
+            token_type='access',
+            user_id='99',
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        )
+        db_session.add(token)
+        db_session.commit()
+        
+        revocation_cache.refresh()
+        assert revocation_cache.is_revoked('external-jti') is True
+
+
 class TestGoogleOAuth:
     """Test cases for Google OAuth endpoints."""
     
@@ -415,6 +536,35 @@ class TestUserMeEndpoint:
         })
         
         assert response.status_code == 422 or response.status_code == 401
+    
+    def test_current_user_served_from_cache(self, client, db_session, auth_headers, sample_user):
+        """Test that a repeated request resolves the user without selecting from users."""
+        from sqlalchemy import event
+        
+        client.get('/users/me', headers=auth_headers)
+        
+        statements = []
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = client.get('/users/me', headers=auth_headers)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        
+        assert response.status_code == 200
+        assert response.get_json()['username'] == sample_user.username
+        assert not [statement for statement in statements if 'FROM users' in statement]
+    
+    def test_cached_user_invalidated_on_update(self, client, db_session, auth_headers, sample_user):
+        """Test that committed changes to the user replace the cached row."""
+        client.get('/users/me', headers=auth_headers)
+        
+        sample_user.username = 'renameduser'
+        db_session.commit()
+        
+        data = client.get('/users/me', headers=auth_headers).get_json()
+        assert data['username'] == 'renameduser'
 
 
 class TestAuthenticationEdgeCases:
@@ -7,8 +7,9 @@ StripeSubscription, OfflinePayment, and BlacklistedToken.
 
 import pytest
 import json
+import time
 from datetime import datetime, timedelta
-from app.models import User, Quiz, StripeSubscription, OfflinePayment, BlacklistedToken
+from app.models import User, Quiz, StripeSubscription, OfflinePayment, BlacklistedToken, UserStats
 from werkzeug.security import check_password_hash
 
 
@@ -470,6 +471,286 @@ class TestOfflinePaymentModel:
         assert payment in sample_user.offline_payments
 
 
+class TestUserStatsModel:
+    """Test cases for the materialized UserStats model."""
+    
+    def _submit(self, user, quiz, answers, duration=None):
+        from app.quiz_controller import QuizController
+        attempt, error = QuizController.submit_attempt(quiz.id, user.id, {'answers': answers, 'duration_seconds': duration})
+        assert error is None
+        return attempt
+    
+    def test_stats_updated_incrementally(self, db_session, sample_user, sample_quiz):
+        """Test that each attempt is folded into the user's stats row."""
+        self._submit(sample_user, sample_quiz, [2, 1], duration=90)
+        self._submit(sample_user, sample_quiz, [2, 0], duration=40)
+        
+        stats = db_session.get(UserStats, sample_user.id)
+        db_session.refresh(stats)
+        assert stats.attempts == 2
+        assert stats.quizzes_completed == 1  # same quiz twice
+        assert stats.correct_answers == 3
+        assert stats.questions_answered == 4
+        assert stats.best_score == 200
+        assert stats.best_time_seconds == 40
+        assert stats.to_dict()['bestTime'] == '40s'
+    
+    def test_rebuild_matches_incremental(self, db_session, sample_user, sample_quiz, premium_quiz):
+        """Test that rebuilding from raw attempts reproduces the incremental totals."""
+        self._submit(sample_user, sample_quiz, [2, 1], duration=125)
+        self._submit(sample_user, premium_quiz, [None])
+        
+        stats = db_session.get(UserStats, sample_user.id)
+        db_session.refresh(stats)
+        incremental = stats.to_dict()
+        
+        UserStats.rebuild()
+        db_session.commit()
+        
+        rebuilt = db_session.get(UserStats, sample_user.id)
+        db_session.refresh(rebuilt)
+        assert rebuilt.to_dict() == incremental
+        assert incremental['quizzes'] == 2
+        assert incremental['bestTime'] == '2min 5s'
+    
+    def test_record_attempt_is_one_upsert(self, db_session, sample_user, sample_quiz, query_counter):
+        """Test that each attempt is folded in by one INSERT ... ON CONFLICT statement."""
+        from app.models import QuizAttempt
+        
+        def record(score, duration):
+            attempt = QuizAttempt(quiz_id=sample_quiz.id, user_id=sample_user.id, answers='[2,1]', results='11',
+                                  correct_count=score // 100, question_count=2, score=score,
+                                  duration_seconds=duration)
+            db_session.add(attempt)
+            db_session.flush()
+            with query_counter() as queries:
+                UserStats.record_attempt(attempt)
+            assert queries.count == 1
+            assert 'ON CONFLICT' in queries.statements[0]
+        
+        record(200, 30)  # inserts the row
+        record(100, None)  # same quiz again, updates it
+        db_session.commit()
+        
+        stats = db_session.get(UserStats, sample_user.id)
+        db_session.refresh(stats)
+        assert stats.attempts == 2
+        assert stats.quizzes_completed == 1
+        assert stats.total_score == 300
+        assert stats.best_score == 200
+        assert stats.best_time_seconds == 30
+    
+    def test_user_without_stats(self, db_session, sample_user):
+        """Test that a user without attempts reports zero stats."""
+        assert sample_user.to_dict()['stats'] == UserStats.empty_dict()
+    
+    def test_rebuild_user_stats_command(self, runner, db_session, sample_user, sample_quiz):
+        """Test the rebuild-user-stats CLI command."""
+        self._submit(sample_user, sample_quiz, [2, 1])
+        
+        result = runner.invoke(args=['rebuild-user-stats'])
+        
+        assert result.exit_code == 0
+        assert 'Rebuilt statistics' in result.output
+
+
+class TestIndexes:
+    """Test cases for the index advisor over the app's hot lookups."""
+    
+    def test_filtered_lookups_use_indexes(self, app, db_session):
+        """Test that every filtered lookup is planned without a full table scan."""
+        from utils.index_advisor import run_advisor
+        
+        report = run_advisor()
+        assert report
+        
+        # Unfiltered listings and counts legitimately read every row
+        filtered = [entry for entry in report if ' WHERE ' in entry[1]]
+        scans = [(name, tables) for name, statement, plan, tables in filtered if tables]
+        assert scans == []
+    
+    def test_index_advisor_command(self, runner, db_session):
+        """Test the index-advisor CLI command runs and prints a summary."""
+        result = runner.invoke(args=['index-advisor'])
+        
+        assert result.exit_code == 0
+        assert 'distinct queries analysed' in result.output
+
+
+
+class TestSqliteProfile:
+    """Test cases for the SQLite engine profile."""
+    
+    def test_wal_profile_applied_to_connections(self, app, db_session):
+        """Test that connections run in WAL mode with the configured pragmas."""
+        from app.extensions import db
+        
+        with db.engine.connect() as connection:
+            pragma = lambda name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+            assert pragma('journal_mode') == 'wal'
+            assert pragma('synchronous') == 1  # NORMAL
+            assert pragma('busy_timeout') == app.config['SQLITE_BUSY_TIMEOUT_MS']
+            assert pragma('cache_size') == -app.config['SQLITE_CACHE_SIZE_KB']
+        assert db.engine.pool.size() == app.config['SQLITE_WORKER_THREADS'] + 1
+    
+    def test_profiles(self):
+        """Test the options and pragmas each profile produces."""
+        from app.sqlite_profile import engine_options, connection_pragmas
+        
+        config = {'SQLALCHEMY_DATABASE_URI': 'sqlite:///app.db', 'SQLITE_WORKER_THREADS': 8}
+        assert engine_options(config)['pool_size'] == 9
+        assert 'PRAGMA journal_mode=WAL' in connection_pragmas(config)
+        
+        stock = dict(config, SQLITE_ENGINE_PROFILE='stock')
+        assert engine_options(stock) == {}
+        assert connection_pragmas(stock) == []
+        
+        # In-memory databases keep their single static connection and cannot use WAL
+        memory = {'SQLALCHEMY_DATABASE_URI': 'sqlite://'}
+        assert engine_options(memory) == {}
+        assert 'PRAGMA journal_mode=WAL' not in connection_pragmas(memory)
+        
+        # Explicit engine options win, other databases are left alone
+        assert engine_options(dict(config, SQLALCHEMY_ENGINE_OPTIONS={'pool_size': 2}))['pool_size'] == 2
+        assert engine_options({'SQLALCHEMY_DATABASE_URI': 'postgresql://db/app'}) == {}
+        
+        with pytest.raises(ValueError):
+            engine_options(dict(config, SQLITE_ENGINE_PROFILE='fast'))
+
+
+class TestCache:
+    """Test cases for the two-tier application cache."""
+    
+    @staticmethod
+    def _worker(backend, local_ttl=5):
+        """A Cache as one worker process would have it, sharing `backend`."""
+        from app.cache import Cache
+        
+        worker = Cache()
+        worker.shared = backend
+        worker.local_ttl = local_ttl
+        return worker
+    
+    def test_local_tier_evicts_by_size_and_ttl(self):
+        """Test LRU eviction past max_entries and expiry after the TTL."""
+        from app.cache import LocalCache, MISSING
+        
+        local = LocalCache(max_entries=2)
+        local.set('a', 1, ttl=60)
+        local.set('b', 2, ttl=60)
+        local.get('a')  # b is now least recently used
+        local.set('c', 3, ttl=60)
+        assert local.get('b') is MISSING
+        assert (local.get('a'), local.get('c')) == (1, 3)
+        
+        local.set('short', 4, ttl=0.01)
+        time.sleep(0.02)
+        assert local.get('short') is MISSING
+    
+    def test_get_many_set_many_and_tags(self):
+        """Test batch reads across tiers and tag invalidation seen by another worker."""
+        from app.cache import MemoryBackend
+        
+        backend = MemoryBackend()
+        first, second = self._worker(backend), self._worker(backend, local_ttl=0.05)
+        first.set_many({'quiz:1:payload': 'one', 'quiz:2:payload': 'two'}, ttl=60, tags=['quizzes'])
+        first.set('quiz:1:options', 'opts', ttl=60, tags=['quiz:1'])
+        
+        assert second.get_many(['quiz:1:payload', 'quiz:2:payload', 'absent']) == {
+            'quiz:1:payload': 'one', 'quiz:2:payload': 'two'}
+        assert second.shared_hits == 2
+        assert second.get('quiz:1:options') == 'opts'
+        
+        first.invalidate_tags('quiz:1')
+        assert first.get('quiz:1:options') is None
+        assert first.get('quiz:1:payload') == 'one'
+        
+        # The other worker's local copy expires within its local TTL, then the shared entry is stale
+        time.sleep(0.06)
+        assert second.get('quiz:1:options') is None
+        assert second.get('quiz:2:payload') == 'two'
+    
+    def test_get_or_set_coalesces_concurrent_misses(self):
+        """Test that many concurrent misses across workers compute the value once."""
+        import threading
+        from app.cache import MemoryBackend
+        
+        backend = MemoryBackend()
+        workers = [self._worker(backend), self._worker(backend)]
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'expensive'
+        
+        results = []
+        threads = [threading.Thread(target=lambda worker=worker: results.append(
+                       worker.get_or_set('dashboard', compute, ttl=60)))
+                   for worker in workers for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert results == ['expensive'] * 40
+        assert len(calls) == 1
+    
+    def test_invalidation_during_compute_is_not_stored(self):
+        """Test that a value computed before an invalidation never lands in the cache."""
+        from app.cache import Cache
+        
+        cache = Cache()
+        value = cache.get_or_set('quiz:7', lambda: cache.invalidate_tags('quiz:7') or 'stale', tags=['quiz:7'])
+        
+        assert value == 'stale'
+        assert cache.get('quiz:7') is None
+
+
+class TestFastJson:
+    """Test cases for the JSON encoding layer."""
+    
+    def test_encoders_agree_and_write_isoformat(self):
+        """Test that orjson and the stdlib fallback produce the same documents."""
+        from decimal import Decimal
+        from app import fast_json
+        
+        moment = datetime(2024, 5, 17, 12, 30, 15, 250000)
+        value = {'at': moment, 'day': moment.date(), 'amount': Decimal('9.99'), 'counts': {1: 2},
+                 'name': 'Początkujący', 'none': None}
+        expected = {'at': moment.isoformat(), 'day': '2024-05-17', 'amount': 9.99, 'counts': {'1': 2},
+                    'name': 'Początkujący', 'none': None}
+        
+        assert json.loads(fast_json._dumps_stdlib(value)) == expected
+        if fast_json.orjson is not None:
+            assert json.loads(fast_json._dumps_orjson(value)) == expected
+            assert json.loads(fast_json._dumps_orjson({'big': 2 ** 70})) == {'big': 2 ** 70}
+    
+    def test_responses_encode_model_datetimes(self, client, db_session, sample_user, auth_headers):
+        """Test that resource and jsonify responses carry ISO 8601 strings."""
+        response = client.get('/users/me', headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.get_json()['created_at'] == sample_user.created_at.isoformat()
+        
+        response = client.post('/login', json={'email': sample_user.email, 'password': 'testpassword'})
+        assert response.get_json()['user']['created_at'] == sample_user.created_at.isoformat()
+    
+    def test_admin_listing_encodes_payment_datetimes(self, client, db_session, sample_user, admin_user,
+                                                     admin_auth_headers):
+        """Test that payment models hand native datetimes to the encoder like User and Quiz."""
+        payment = OfflinePayment(user_id=sample_user.id, admin_id=admin_user.id, amount=10.0,
+                                 payment_method='cash', status='pending')
+        db_session.add(payment)
+        db_session.commit()
+        assert isinstance(payment.to_dict()['created_at'], datetime)
+        
+        response = client.get('/admin/payments/offline', headers=admin_auth_headers)
+        data = response.get_json()
+        entries = data if isinstance(data, list) else data['payments']
+        assert entries[0]['created_at'] == payment.created_at.isoformat()
+        assert entries[0]['approved_at'] is None
+
 class TestBlacklistedTokenModel:
     """Test cases for the BlacklistedToken model."""
     
@@ -544,6 +825,63 @@ class TestBlacklistedTokenModel:
         assert BlacklistedToken.query.count() == 1
         assert BlacklistedToken.query.first().jti == 'valid-jti'
     
+    def test_purge_expired_tokens_in_batches(self, db_session):
+        """Test the batched purge deletes every expired row and reports timing."""
+        for i in range(7):
+            db_session.add(BlacklistedToken(
+                jti=f'purge-expired-{i}',
+                token_type='access',
+                user_id='123',
+                expires_at=datetime.utcnow() - timedelta(hours=1)
+            ))
+        db_session.add(BlacklistedToken(
+            jti='purge-valid',
+            token_type='access',
+            user_id='123',
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        ))
+        db_session.commit()
+        
+        deleted, elapsed = BlacklistedToken.purge_expired_tokens(batch_size=3, pause=0)
+        
+        assert deleted == 7
+        assert elapsed >= 0
+        assert BlacklistedToken.query.count() == 1
+        assert BlacklistedToken.query.first().jti == 'purge-valid'
+    
+    def test_jti_filter_tracks_inserts_and_cleanup(self, db_session):
+        """Test that the jti Bloom filter follows inserts and is rebuilt on cleanup."""
+        BlacklistedToken.rebuild_filter()
+        
+        expired_token = BlacklistedToken(
+            jti='filter-expired-jti',
+            token_type='access',
+            user_id='123',
+            expires_at=datetime.utcnow() - timedelta(hours=1)
+        )
+        valid_token = BlacklistedToken(
+            jti='filter-valid-jti',
+            token_type='access',
+            user_id='123',
+            expires_at=datetime.utcnow() + timedelta(hours=1)
+        )
+        db_session.add(expired_token)
+        db_session.add(valid_token)
+        db_session.commit()
+        
+        assert 'filter-expired-jti' in BlacklistedToken.jti_filter
+        assert 'filter-valid-jti' in BlacklistedToken.jti_filter
+        
+        BlacklistedToken.cleanup_expired_tokens()
+        
+        assert 'filter-expired-jti' not in BlacklistedToken.jti_filter
+        assert BlacklistedToken.is_blacklisted('filter-valid-jti') is True
+        
+        stats = BlacklistedToken.jti_filter.stats()
+        assert stats['entries'] == 1
+        assert stats['memory_bytes'] > 0
+        assert stats['estimated_false_positive_rate'] < stats['target_false_positive_rate']
+    
     def test_blacklisted_token_to_dict(self, db_session):
         """Test blacklisted token serialization to dictionary."""
         expires_at = datetime.utcnow() + timedelta(hours=1)
@@ -8,6 +8,8 @@ and quiz-solving functionality with proper access control.
 import pytest
 import json
 from app.models import Quiz, User
+from app.extensions import db
+from datetime import datetime
 
 
 class TestQuizCreation:
@@ -152,6 +154,53 @@ class TestQuizRetrieval:
         assert 'Sample Quiz' in quiz_titles
         assert 'Premium Physics Quiz' in quiz_titles
     
+    def test_get_quizzes_summary(self, client, db_session, sample_quiz, auth_headers):
+        """Test the catalogue summary mode returns counts instead of questions."""
+        response = client.get('/quiz?summary=1', headers=auth_headers)
+        
+        assert response.status_code == 200
+        quizzes = response.get_json()['quizzes']
+        entry = next(quiz for quiz in quizzes if quiz['id'] == sample_quiz.id)
+        assert entry['question_count'] == 2  # Sample quiz has 2 questions
+        assert 'questions' not in entry
+    
+    def test_summary_does_not_load_questions(self, app, db_session, sample_quiz):
+        """Test that summary listing never selects question payloads."""
+        from app.quiz_controller import QuizController
+        from utils.index_advisor import record_queries
+        
+        with record_queries(db.engine) as queries:
+            quizzes, error = QuizController.get_all_quizzes(summary=True)
+        
+        assert error is None
+        assert quizzes
+        statements = ' '.join(statement for statement, _ in queries)
+        assert 'questions_json' not in statements
+        assert 'FROM questions' not in statements
+    
+    def test_get_quizzes_cursor_pagination(self, client, db_session, sample_user, auth_headers):
+        """Test keyset pagination of the catalogue, including rows sharing created_at."""
+        created_at = datetime.utcnow()
+        quizzes = [Quiz(title=f'Paged {i}', author_id=sample_user.id, created_at=created_at) for i in range(5)]
+        db_session.add_all(quizzes)
+        db_session.commit()
+        
+        titles = []
+        cursor = None
+        while True:
+            url = '/quiz?summary=1&limit=2' + (f'&cursor={cursor}' if cursor else '')
+            response = client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            data = response.get_json()
+            assert len(data['quizzes']) <= 2
+            titles.extend(quiz['title'] for quiz in data['quizzes'])
+            cursor = data['pagination']['next_cursor']
+            if not cursor:
+                break
+        
+        # Same created_at, so the id tie-breaker orders them newest id first
+        assert titles == [f'Paged {i}' for i in reversed(range(5))]
+    
     def test_get_quiz_by_id(self, client, db_session, sample_quiz):
         """Test retrieving specific quiz by ID."""
         response = client.get(f'/quiz/{sample_quiz.id}')
@@ -292,6 +341,410 @@ class TestQuizUpdate:
         assert data['questions'][1]['correct_answer'] == 0
 
 
+class TestQuizQuestions:
+    """Test cases for normalized question storage and single-question endpoints."""
+    
+    def test_created_quiz_uses_question_tables(self, client, db_session, auth_headers):
+        """Test that new quizzes store questions as rows instead of a JSON blob."""
+        from app.models import Question
+        
+        response = client.post('/quiz', json={
+            'title': 'Normalized Quiz',
+            'questions': [
+                {'question': 'First?', 'options': ['A', 'B'], 'correct_answer': 1},
+                {'question': 'Second?', 'options': ['C', 'D', 'E'], 'correctAnswer': 2}
+            ]
+        }, headers=auth_headers)
+        
+        assert response.status_code == 201
+        data = response.get_json()
+        assert [q['correct_answer'] for q in data['questions']] == [1, 2]
+        
+        quiz = Quiz.query.get(data['id'])
+        assert quiz.questions_json is None
+        assert Question.query.filter_by(quiz_id=quiz.id).count() == 2
+        assert [o.text for o in quiz.questions[1].options] == ['C', 'D', 'E']
+    
+    def test_patch_single_question(self, client, db_session, sample_quiz, auth_headers):
+        """Test updating one question of a legacy quiz leaves the others intact."""
+        response = client.patch(f'/quiz/{sample_quiz.id}/questions/1',
+                                json={'question': 'Which planet is farthest from the Sun?', 'correct_answer': 3},
+                                headers=auth_headers)
+        
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['question'] == 'Which planet is farthest from the Sun?'
+        assert data['options'] == ['Venus', 'Mercury', 'Earth', 'Mars']
+        assert data['correct_answer'] == 3
+        
+        response = client.get(f'/quiz/{sample_quiz.id}', headers=auth_headers)
+        questions = response.get_json()['questions']
+        assert questions[0]['question'] == 'What is the capital of France?'
+        assert questions[1]['correct_answer'] == 3
+    
+    def test_get_legacy_question_is_read_only(self, client, db_session, sample_quiz, auth_headers):
+        """Test that reading a question of an unmigrated quiz serves the blob without converting it."""
+        from app.models import Question
+        
+        response = client.get(f'/quiz/{sample_quiz.id}/questions/0', headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert response.get_json()['question'] == 'What is the capital of France?'
+        assert client.get(f'/quiz/{sample_quiz.id}/questions/9', headers=auth_headers).status_code == 404
+        db_session.refresh(sample_quiz)
+        assert sample_quiz.questions_json is not None
+        assert Question.query.filter_by(quiz_id=sample_quiz.id).count() == 0
+    
+    def test_patch_question_invalid_answer(self, client, db_session, sample_quiz, auth_headers):
+        """Test that an out-of-range answer index is rejected."""
+        response = client.patch(f'/quiz/{sample_quiz.id}/questions/0',
+                                json={'correct_answer': 9},
+                                headers=auth_headers)
+        
+        assert response.status_code == 400
+    
+    def test_patch_missing_question(self, client, db_session, sample_quiz, auth_headers):
+        """Test patching a question position that does not exist."""
+        response = client.patch(f'/quiz/{sample_quiz.id}/questions/5',
+                                json={'question': 'Nope?'},
+                                headers=auth_headers)
+        
+        assert response.status_code == 404
+    
+    def test_patch_others_quiz_question(self, client, db_session, premium_quiz, auth_headers):
+        """Test patching a question of another user's quiz (should fail)."""
+        response = client.patch(f'/quiz/{premium_quiz.id}/questions/0',
+                                json={'question': 'Hijacked?'},
+                                headers=auth_headers)
+        
+        assert response.status_code == 403
+    
+    def test_update_questions_keeps_unchanged_rows(self, client, db_session, auth_headers):
+        """Test that replacing the question list only rewrites changed rows."""
+        from app.models import Question
+        
+        questions = [
+            {'question': 'Keep?', 'options': ['A', 'B'], 'correct_answer': 0},
+            {'question': 'Change?', 'options': ['A', 'B'], 'correct_answer': 0}
+        ]
+        quiz_id = client.post('/quiz', json={'title': 'Incremental', 'questions': questions},
+                              headers=auth_headers).get_json()['id']
+        kept_id = Question.query.filter_by(quiz_id=quiz_id, position=0).first().id
+        
+        questions[1] = {'question': 'Changed!', 'options': ['A', 'B', 'C'], 'correct_answer': 2}
+        response = client.put(f'/quiz/{quiz_id}', json={'questions': questions[:2]}, headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert Question.query.filter_by(quiz_id=quiz_id, position=0).first().id == kept_id
+        assert response.get_json()['questions'][1]['options'] == ['A', 'B', 'C']
+    
+    def test_delete_quiz_removes_questions(self, client, db_session, auth_headers):
+        """Test that deleting a quiz deletes its question and option rows."""
+        from app.models import Question, AnswerOption
+        
+        quiz_id = client.post('/quiz', json={
+            'title': 'Short lived',
+            'questions': [{'question': 'Gone?', 'options': ['A', 'B'], 'correct_answer': 0}]
+        }, headers=auth_headers).get_json()['id']
+        
+        response = client.delete(f'/quiz/{quiz_id}', headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert Question.query.filter_by(quiz_id=quiz_id).count() == 0
+        assert AnswerOption.query.count() == 0
+
+
+class TestQuizSearch:
+    """Test cases for the full-text quiz search index."""
+    
+    def _create(self, client, auth_headers, title, description, question, options):
+        response = client.post('/quiz', json={
+            'title': title,
+            'description': description,
+            'category': 'Search',
+            'questions': [{'question': question, 'options': options, 'correct_answer': 0}]
+        }, headers=auth_headers)
+        assert response.status_code == 201
+        return response.get_json()['id']
+    
+    def test_search_matches_question_text_ranked(self, client, db_session, auth_headers):
+        """Test that question text is searchable and title hits rank first."""
+        in_question = self._create(client, auth_headers, 'Rivers', 'Water',
+                                   'Which volcano erupted in 79 AD?', ['Vesuvius', 'Etna'])
+        in_title = self._create(client, auth_headers, 'Volcano basics', 'Geology',
+                                'Hot?', ['Yes', 'No'])
+        
+        response = client.get('/quiz?search=volcano', headers=auth_headers)
+        
+        assert response.status_code == 200
+        quizzes = response.get_json()['quizzes']
+        assert [quiz['id'] for quiz in quizzes] == [in_title, in_question]
+        assert '<mark>' in quizzes[0]['search_snippet']
+    
+    def test_search_snippet_is_escaped(self, client, db_session, auth_headers):
+        """Test that user-written markup in a snippet is escaped while highlights stay."""
+        self._create(client, auth_headers, 'Markup', 'Text',
+                     '<img src=x onerror=alert(1)> Which comet returns every 76 years?', ['Halley', 'Encke'])
+        
+        snippet = client.get('/quiz?search=comet', headers=auth_headers).get_json()['quizzes'][0]['search_snippet']
+        
+        assert '<img' not in snippet
+        assert '&lt;img' in snippet
+        assert '<mark>comet</mark>' in snippet
+    
+    def test_search_filters_apply_before_limit(self, client, db_session, auth_headers, monkeypatch):
+        """Test that category filtering happens inside the ranked query, not after its limit."""
+        from app.search import quiz_search
+        
+        self._create(client, auth_headers, 'Glacier glacier glacier', 'Ice', 'Cold?', ['Yes', 'No'])
+        response = client.post('/quiz', json={
+            'title': 'Glacier lakes',
+            'category': 'Geography',
+            'questions': [{'question': 'Deep?', 'options': ['Yes', 'No'], 'correct_answer': 0}]
+        }, headers=auth_headers)
+        wanted = response.get_json()['id']
+        monkeypatch.setattr(quiz_search, 'max_results', 1)
+        
+        response = client.get('/quiz?search=glacier&category=Geography', headers=auth_headers)
+        
+        assert [quiz['id'] for quiz in response.get_json()['quizzes']] == [wanted]
+    
+    def test_search_prefix_and_answer_text(self, client, db_session, auth_headers):
+        """Test prefix matching against answer options."""
+        quiz_id = self._create(client, auth_headers, 'Italy', 'Places',
+                               'Where is Pompeii?', ['Campania', 'Lazio'])
+        
+        response = client.get('/quiz?search=campan', headers=auth_headers)
+        
+        assert [quiz['id'] for quiz in response.get_json()['quizzes']] == [quiz_id]
+    
+    def test_search_index_follows_updates_and_deletes(self, client, db_session, auth_headers):
+        """Test that the index is kept in sync by update and delete."""
+        quiz_id = self._create(client, auth_headers, 'Before', 'Text', 'Old question?', ['A', 'B'])
+        
+        client.put(f'/quiz/{quiz_id}', json={'title': 'Afterwards'}, headers=auth_headers)
+        assert client.get('/quiz?search=before', headers=auth_headers).get_json()['quizzes'] == []
+        assert len(client.get('/quiz?search=afterwards', headers=auth_headers).get_json()['quizzes']) == 1
+        
+        client.delete(f'/quiz/{quiz_id}', headers=auth_headers)
+        assert client.get('/quiz?search=afterwards', headers=auth_headers).get_json()['quizzes'] == []
+    
+    def test_search_with_pagination(self, client, db_session, auth_headers):
+        """Test that search combines with cursor pagination."""
+        self._create(client, auth_headers, 'Paged search one', 'x', 'Q?', ['A', 'B'])
+        self._create(client, auth_headers, 'Paged search two', 'x', 'Q?', ['A', 'B'])
+        
+        response = client.get('/quiz?search=paged&limit=1', headers=auth_headers)
+        
+        data = response.get_json()
+        assert len(data['quizzes']) == 1
+        assert data['pagination']['has_next'] is True
+    
+    def test_search_ignores_fts_syntax(self, client, db_session, auth_headers):
+        """Test that FTS operators in user input are treated as plain words."""
+        response = client.get('/quiz?search=" OR NEAR(', headers=auth_headers)
+        assert response.status_code == 200
+
+
+class TestQuizConditionalGet:
+    """Test cases for ETag / Last-Modified handling on quiz endpoints."""
+    
+    def test_single_quiz_not_modified(self, client, db_session, sample_quiz, auth_headers):
+        """Test that a matching If-None-Match returns 304 without loading the quiz."""
+        from utils.index_advisor import record_queries
+        
+        response = client.get(f'/quiz/{sample_quiz.id}', headers=auth_headers)
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert 'Last-Modified' in response.headers
+        
+        with record_queries(db.engine) as queries:
+            response = client.get(f'/quiz/{sample_quiz.id}', headers={**auth_headers, 'If-None-Match': etag})
+        
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert not any('questions_json' in statement for statement, _ in queries)
+    
+    def test_single_quiz_etag_changes_on_update(self, client, db_session, sample_quiz, auth_headers):
+        """Test that editing a question invalidates the quiz and options ETags."""
+        quiz_etag = client.get(f'/quiz/{sample_quiz.id}', headers=auth_headers).headers['ETag']
+        options_etag = client.get(f'/quiz/{sample_quiz.id}/options').headers['ETag']
+        assert quiz_etag != options_etag  # different representations of the same quiz
+        
+        client.patch(f'/quiz/{sample_quiz.id}/questions/0', json={'question': 'Changed?'}, headers=auth_headers)
+        
+        response = client.get(f'/quiz/{sample_quiz.id}', headers={**auth_headers, 'If-None-Match': quiz_etag})
+        assert response.status_code == 200
+        response = client.get(f'/quiz/{sample_quiz.id}/options', headers={'If-None-Match': options_etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != options_etag
+    
+    def test_options_if_modified_since(self, client, db_session, sample_quiz):
+        """Test Last-Modified / If-Modified-Since on the options route."""
+        response = client.get(f'/quiz/{sample_quiz.id}/options')
+        last_modified = response.headers['Last-Modified']
+        
+        response = client.get(f'/quiz/{sample_quiz.id}/options', headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+    
+    def test_catalogue_has_no_last_modified(self, client, db_session, sample_quiz, premium_quiz, auth_headers):
+        """Test that a deletion is not hidden by If-Modified-Since, since MAX(updated_at) does not move."""
+        for path in ('/quizzes?summary=1', '/quiz?summary=1'):
+            response = client.get(path, headers=auth_headers)
+            assert 'Last-Modified' not in response.headers
+        since = 'Fri, 01 Jan 2100 00:00:00 GMT'
+        
+        client.delete(f'/quiz/{sample_quiz.id}', headers=auth_headers)
+        
+        for path in ('/quizzes?summary=1', '/quiz?summary=1'):
+            response = client.get(path, headers={**auth_headers, 'If-Modified-Since': since})
+            assert response.status_code == 200
+            assert [quiz['id'] for quiz in response.get_json()['quizzes']] == [premium_quiz.id]
+    
+    def test_catalogue_etag(self, client, db_session, sample_quiz, auth_headers):
+        """Test that the catalogue ETag is stable, per-variant and changes on writes."""
+        etag = client.get('/quiz?summary=1', headers=auth_headers).headers['ETag']
+        
+        assert client.get('/quiz?summary=1', headers={**auth_headers, 'If-None-Match': etag}).status_code == 304
+        assert client.get('/quiz', headers=auth_headers).headers['ETag'] != etag
+        
+        client.delete(f'/quiz/{sample_quiz.id}', headers=auth_headers)
+        
+        response = client.get('/quiz?summary=1', headers={**auth_headers, 'If-None-Match': etag})
+        assert response.status_code == 200
+    
+    def test_missing_quiz_options(self, client, db_session):
+        """Test that validators do not hide a 404."""
+        assert client.get('/quiz/999999/options').status_code == 404
+
+
+class TestQuizAttempts:
+    """Test cases for server-side attempt scoring."""
+    
+    def test_submit_attempt_scores_answers(self, client, db_session, sample_quiz, auth_headers):
+        """Test scoring a submission against the sample quiz (answers: 2, 1)."""
+        response = client.post(f'/quiz/{sample_quiz.id}/attempts',
+                               json={'answers': [2, 0], 'duration_seconds': 42},
+                               headers=auth_headers)
+        
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['results'] == [True, False]
+        assert data['correct_count'] == 1
+        assert data['question_count'] == 2
+        assert data['score'] == 100
+        assert data['percentage'] == 50
+        assert data['correct_answers'] == [2, 1]
+        
+        from app.models import QuizAttempt
+        attempt = QuizAttempt.query.get(data['id'])
+        assert attempt.results == '10'
+        assert attempt.duration_seconds == 42
+    
+    def test_submit_attempt_with_skipped_question(self, client, db_session, sample_quiz, auth_headers):
+        """Test that a skipped (null) answer counts as wrong."""
+        response = client.post(f'/quiz/{sample_quiz.id}/attempts',
+                               json={'answers': [None, 1]}, headers=auth_headers)
+        
+        assert response.status_code == 201
+        assert response.get_json()['correct_count'] == 1
+    
+    @pytest.mark.parametrize('answers', [[2], [2, 1, 0], [2, 9], [2, '1'], [True, 1], 'nope'])
+    def test_submit_attempt_invalid_answers(self, client, db_session, sample_quiz, auth_headers, answers):
+        """Test that malformed answer vectors are rejected."""
+        response = client.post(f'/quiz/{sample_quiz.id}/attempts',
+                               json={'answers': answers}, headers=auth_headers)
+        
+        assert response.status_code == 400
+    
+    def test_submit_attempt_missing_quiz(self, client, db_session, auth_headers):
+        """Test submitting to a quiz that does not exist."""
+        response = client.post('/quiz/999999/attempts', json={'answers': []}, headers=auth_headers)
+        
+        assert response.status_code == 404
+    
+    def test_submit_attempt_requires_auth(self, client, db_session, sample_quiz):
+        """Test that anonymous submissions are rejected."""
+        response = client.post(f'/quiz/{sample_quiz.id}/attempts', json={'answers': [2, 1]})
+        
+        assert response.status_code == 401
+    
+    def test_attempt_updates_profile_stats(self, client, db_session, sample_quiz, auth_headers):
+        """Test that /users/me reports stats from recorded attempts."""
+        client.post(f'/quiz/{sample_quiz.id}/attempts', json={'answers': [2, 1], 'duration_seconds': 75},
+                    headers=auth_headers)
+        
+        response = client.get('/users/me', headers=auth_headers)
+        
+        assert response.status_code == 200
+        stats = response.get_json()['stats']
+        assert stats['quizzes'] == 1
+        assert stats['correctAnswers'] == 2
+        assert stats['bestTime'] == '1min 15s'
+    
+    def test_answer_key_follows_quiz_updates(self, client, db_session, sample_quiz, auth_headers):
+        """Test that a cached answer key is recompiled after the quiz changes."""
+        from app.compiled_quizzes import compiled_quizzes
+        
+        client.post(f'/quiz/{sample_quiz.id}/attempts', json={'answers': [2, 1]}, headers=auth_headers)
+        hits = compiled_quizzes.hits
+        client.post(f'/quiz/{sample_quiz.id}/attempts', json={'answers': [2, 1]}, headers=auth_headers)
+        assert compiled_quizzes.hits == hits + 1
+        
+        client.patch(f'/quiz/{sample_quiz.id}/questions/1', json={'correct_answer': 3}, headers=auth_headers)
+        
+        response = client.post(f'/quiz/{sample_quiz.id}/attempts', json={'answers': [2, 1]}, headers=auth_headers)
+        assert response.get_json()['results'] == [True, False]
+
+
+class TestCompiledQuizzes:
+    """Test cases for the per-revision compiled quiz cache."""
+    
+    def test_options_served_from_compiled_payload(self, client, db_session, sample_quiz):
+        """Test that /options returns the cached bytes and compiles once per revision."""
+        from app.compiled_quizzes import compiled_quizzes
+        
+        compiled_quizzes.clear()
+        first = client.get(f'/quiz/{sample_quiz.id}/options')
+        second = client.get(f'/quiz/{sample_quiz.id}/options')
+        
+        assert first.status_code == 200
+        assert first.data == second.data == compiled_quizzes.get(sample_quiz.id).options_payload
+        assert compiled_quizzes.misses >= 1
+        for question in first.get_json()['questions']:
+            assert 'correct_answer' not in question
+            assert 'correctAnswer' not in question
+    
+    def test_compiled_quiz_invalidated_on_update(self, client, db_session, sample_quiz, auth_headers):
+        """Test that editing a quiz replaces its compiled payload."""
+        client.get(f'/quiz/{sample_quiz.id}/options')
+        
+        client.put(f'/quiz/{sample_quiz.id}', json={'title': 'Renamed Quiz'}, headers=auth_headers)
+        
+        response = client.get(f'/quiz/{sample_quiz.id}/options')
+        assert response.get_json()['title'] == 'Renamed Quiz'
+    
+    def test_grade(self, app, db_session, sample_quiz):
+        """Test grading against the compact answer array."""
+        from app.compiled_quizzes import compile_quiz, grade
+        
+        compiled = compile_quiz(sample_quiz)
+        
+        assert list(compiled.correct) == [2, 1]
+        assert grade(compiled, [2, 1]) == ('11', 2, 2)
+        assert grade(compiled, [None, 1]) == ('01', 1, 2)
+    
+    def test_grade_perfect_run_with_ungradable_question(self):
+        """Test that the perfect-run shortcut marks questions without a key as '-'."""
+        from array import array
+        from app.compiled_quizzes import CompiledQuiz, NO_ANSWER, grade
+        
+        compiled = CompiledQuiz(1, None, array('H', [0, NO_ANSWER, 2]), array('H', [2, 2, 3]), b'{}')
+        
+        assert grade(compiled, [0, None, 2]) == ('1-1', 2, 2)
+        assert grade(compiled, [0, 1, 2]) == ('1-1', 2, 2)
+
+
 class TestQuizDeletion:
     """Test cases for quiz deletion endpoints."""
     
@@ -582,3 +1035,344 @@ class TestQuizErrorHandling:
         
         # Should handle missing content type
         assert response.status_code in [400, 415]  # 415 = Unsupported Media Type
+
+
+class TestLeaderboards:
+    """Test cases for the in-process leaderboards."""
+    
+    def test_order_statistic_list_matches_sorted_list(self):
+        """Test rank/select against a plain sorted list across bucket splits and merges."""
+        import random
+        from bisect import bisect_left
+        from app.ranking import OrderStatisticList
+        
+        rng = random.Random(14)
+        ranked = OrderStatisticList(load=4)
+        expected = []
+        for _ in range(2000):
+            if expected and rng.random() < 0.4:
+                value = rng.choice(expected)
+                ranked.remove(value)
+                expected.remove(value)
+            else:
+                value = rng.randrange(500)
+                ranked.add(value)
+                expected.insert(bisect_left(expected, value), value)
+        
+        assert len(ranked) == len(expected)
+        assert list(ranked) == expected
+        for position in range(0, len(expected), 7):
+            assert ranked[position] == expected[position]
+        for value in range(0, 500, 13):
+            assert ranked.rank(value) == bisect_left(expected, value)
+        assert list(ranked.islice(5, 25)) == expected[5:25]
+    
+    def test_ties_go_to_the_earliest_achiever(self):
+        """Test board ordering: score descending, then earliest time."""
+        from app.ranking import Leaderboard
+        
+        board = Leaderboard()
+        board.offer_best(1, 200, 1000)
+        board.offer_best(2, 200, 900)
+        board.offer_best(3, 100, 800)
+        board.offer_best(1, 100, 1100)  # lower than user 1's best; ignored
+        
+        assert board.top(3) == [(1, 2, 200), (2, 1, 200), (3, 3, 100)]
+        assert board.rank_of(1) == (2, 200)
+        assert board.rank_of(4) is None
+    
+    def test_leaderboards_follow_attempts(self, client, db_session, sample_quiz, sample_user, auth_headers):
+        """Test that global, category and quiz boards include a new attempt and the caller's rank."""
+        from app.leaderboards import leaderboards
+        
+        leaderboards.clear()
+        client.post(f'/quiz/{sample_quiz.id}/attempts', json={'answers': [2, 0]}, headers=auth_headers)
+        client.post(f'/quiz/{sample_quiz.id}/attempts', json={'answers': [2, 1]}, headers=auth_headers)
+        
+        response = client.get('/leaderboards/global')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['entries'] == [{'rank': 1, 'user_id': sample_user.id, 'username': sample_user.username,
+                                    'avatar_url': sample_user.avatar_url, 'score': 300}]
+        assert data['me'] == {'rank': 1, 'score': 300}  # the login cookie identifies the caller
+        
+        # Best attempt only on the quiz board
+        data = client.get(f'/leaderboards/quiz/{sample_quiz.id}').get_json()
+        assert data['entries'][0]['score'] == 200
+        
+        client.post(f'/quiz/{sample_quiz.id}/attempts', json={'answers': [2, 1]}, headers=auth_headers)
+        data = client.get('/leaderboards/category/Geography').get_json()
+        assert data['total'] == 1
+        assert data['entries'][0]['score'] == 500
+    
+    def test_leaderboard_unknown_quiz(self, client, db_session):
+        """Test that a leaderboard for a missing quiz is 404."""
+        response = client.get('/leaderboards/quiz/99999')
+        
+        assert response.status_code == 404
+    
+    def test_snapshot_round_trip(self, client, db_session, sample_quiz, auth_headers):
+        """Test that boards reloaded from a snapshot match the live ones."""
+        from app.leaderboards import leaderboards
+        from app.models import LeaderboardSnapshot
+        
+        leaderboards.clear()
+        client.post(f'/quiz/{sample_quiz.id}/attempts', json={'answers': [2, 1]}, headers=auth_headers)
+        before = leaderboards.top('global')
+        
+        assert leaderboards.snapshot() == 3
+        assert LeaderboardSnapshot.query.count() == 3
+        
+        leaderboards.clear()
+        assert leaderboards.load() == 0  # nothing saved after the snapshot to replay
+        assert leaderboards.top('global') == before
+
+    
+    def test_deletion_rebuilds_other_workers(self, client, db_session, sample_quiz, auth_headers):
+        """Test that deleting a quiz drops its attempts from every worker's boards, not just this one."""
+        from app.leaderboards import LeaderboardService, GLOBAL_BOARD
+        
+        doomed_id = client.post('/quiz', json={
+            'title': 'Doomed Quiz',
+            'category': 'Geography',
+            'questions': [{'question': 'Gone soon?', 'options': ['Yes', 'No'], 'correct_answer': 0}]
+        }, headers=auth_headers).get_json()['id']
+        client.post(f'/quiz/{sample_quiz.id}/attempts', json={'answers': [2, 1]}, headers=auth_headers)
+        client.post(f'/quiz/{doomed_id}/attempts', json={'answers': [0]}, headers=auth_headers)
+        this_worker, other_worker = LeaderboardService(), LeaderboardService()
+        this_worker.load()
+        other_worker.load()
+        before = other_worker.top(GLOBAL_BOARD)[0][0][2]
+        
+        assert client.delete(f'/quiz/{doomed_id}', headers=auth_headers).status_code == 200
+        
+        other_worker.refresh()
+        this_worker.refresh()
+        after = other_worker.top(GLOBAL_BOARD)[0][0][2]
+        assert after == 200 and after < before
+        assert this_worker.top(GLOBAL_BOARD) == other_worker.top(GLOBAL_BOARD)
+        assert other_worker.top(f'quiz:{doomed_id}') == ([], 0)
+
+
+class TestReadReplica:
+    """Test cases for routing GET handlers to a read replica."""
+    
+    @pytest.fixture
+    def replica(self, app, db_session, tmp_path):
+        """A local SQLite replica registered as the 'replica' bind and synced once."""
+        from sqlalchemy import create_engine
+        from app.read_replica import sync_sqlite_replica
+        
+        engine = create_engine(f'sqlite:///{tmp_path / "replica.db"}')
+        db.engines['replica'] = engine
+        sync_sqlite_replica()
+        yield engine
+        del db.engines['replica']
+        engine.dispose()
+    
+    @staticmethod
+    def _quiz_data(title):
+        return {
+            'title': title,
+            'description': 'Written to the primary',
+            'category': 'Science',
+            'difficulty': 'easy',
+            'questions': [{'question': 'Is this a replica?', 'options': ['Yes', 'No'], 'correct_answer': 1}]
+        }
+    
+    def test_gets_read_from_replica(self, client, db_session, auth_headers, sample_user, replica):
+        """Test that reads miss rows the replica has not received until it is synced."""
+        from app.read_replica import STICKY_COOKIE, sync_sqlite_replica
+        
+        quiz = Quiz(title='Replica Lag Quiz', description='Primary only', category='Science',
+                    difficulty='easy', author_id=sample_user.id)
+        db_session.add(quiz)
+        db_session.commit()
+        client.delete_cookie(STICKY_COOKIE)
+        
+        assert client.get(f'/quiz/{quiz.id}', headers=auth_headers).status_code == 404
+        titles = [entry['title'] for entry in client.get('/quiz', headers=auth_headers).get_json()['quizzes']]
+        assert 'Replica Lag Quiz' not in titles
+        
+        sync_sqlite_replica()
+        assert client.get(f'/quiz/{quiz.id}', headers=auth_headers).status_code == 200
+    
+    def test_read_your_writes(self, client, db_session, auth_headers, replica):
+        """Test that a client's own write is read back from the primary within the sticky window."""
+        from app.read_replica import STICKY_COOKIE
+        
+        response = client.post('/quiz', json=self._quiz_data('Sticky Quiz'), headers=auth_headers)
+        assert response.status_code == 201
+        quiz_id = response.get_json()['id']
+        assert client.get_cookie(STICKY_COOKIE) is not None
+        
+        response = client.get(f'/quiz/{quiz_id}', headers=auth_headers)
+        assert response.status_code == 200
+        assert response.get_json()['title'] == 'Sticky Quiz'
+        
+        # Without the cookie the same client is back on the (stale) replica
+        client.delete_cookie(STICKY_COOKIE)
+        assert client.get(f'/quiz/{quiz_id}', headers=auth_headers).status_code == 404
+    
+    def test_sticky_client_skips_cached_catalogue(self, app, client, db_session, auth_headers, replica):
+        """Test that a catalogue cached from the lagging replica is never served to a sticky client."""
+        from app.read_replica import STICKY_COOKIE
+        
+        response = client.post('/quiz', json=self._quiz_data('Fresh Sticky Quiz'), headers=auth_headers)
+        assert response.status_code == 201
+        assert client.get_cookie(STICKY_COOKIE) is not None
+        
+        # An anonymous client fills the cache from the replica, which has not caught up
+        anonymous = app.test_client()
+        assert anonymous.get('/quizzes?summary=1').get_json()['quizzes'] == []
+        
+        titles = [quiz['title'] for quiz in client.get('/quizzes?summary=1').get_json()['quizzes']]
+        assert titles == ['Fresh Sticky Quiz']
+    
+    def test_profile_and_dashboard_read_primary(self, client, db_session, admin_user, admin_auth_headers, replica):
+        """Test that the cached profile and dashboard are never rebuilt from the lagging replica."""
+        from app.read_replica import STICKY_COOKIE
+        
+        total = client.get('/admin/dashboard', headers=admin_auth_headers).get_json()['users']['total']
+        admin_user.username = 'renamed_on_primary'
+        db_session.add(User(username='primary_only', email='primary_only@example.com'))
+        db_session.commit()
+        client.delete_cookie(STICKY_COOKIE)
+        
+        assert client.get('/users/me', headers=admin_auth_headers).get_json()['username'] == 'renamed_on_primary'
+        response = client.get('/admin/dashboard', headers=admin_auth_headers)
+        assert response.get_json()['users']['total'] == total + 1
+    
+    def test_no_sticky_cookie_without_replica(self, client, db_session, auth_headers):
+        """Test that writes hand out no cookie when no replica is configured."""
+        from app.read_replica import STICKY_COOKIE
+        
+        client.delete_cookie(STICKY_COOKIE)
+        response = client.post('/quiz', json=self._quiz_data('Primary Only Quiz'), headers=auth_headers)
+        
+        assert response.status_code == 201
+        assert client.get_cookie(STICKY_COOKIE) is None
+
+
+class TestQuizCatalogueCache:
+    """Test cases for the pre-encoded /quizzes response cache."""
+    
+    def test_hit_costs_no_queries(self, client, db_session, sample_quiz, query_counter):
+        """Test that a repeated listing is served without touching the database."""
+        first = client.get('/quizzes?category=Geography&summary=1')
+        assert first.status_code == 200
+        
+        with query_counter() as queries:
+            # Same normalized listing, parameters in another order
+            second = client.get('/quizzes?summary=1&category=Geography')
+        
+        assert queries.count == 0
+        assert second.status_code == 200
+        assert second.data == first.data
+        assert second.headers['ETag'] == first.headers['ETag']
+        assert second.get_json()['quizzes'][0]['title'] == 'Sample Quiz'
+    
+    def test_gzip_variant(self, client, db_session, sample_quiz, premium_quiz):
+        """Test that gzip clients get the precompressed body with its own ETag."""
+        import gzip
+        
+        plain = client.get('/quizzes')
+        response = client.get('/quizzes', headers={'Accept-Encoding': 'gzip'})
+        
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert gzip.decompress(response.data) == plain.data
+        assert response.headers['ETag'] != plain.headers['ETag']
+        
+        response = client.get('/quizzes', headers={'Accept-Encoding': 'gzip',
+                                                   'If-None-Match': response.headers['ETag']})
+        assert response.status_code == 304
+    
+    def test_revalidation_skips_body(self, client, db_session, sample_quiz, query_counter):
+        """Test that a matching If-None-Match is answered before the listing is loaded or cached."""
+        from app.cache import cache
+        
+        etag = client.get('/quizzes?summary=1').headers['ETag']
+        cache.clear()
+        
+        with query_counter() as queries:
+            response = client.get('/quizzes?summary=1', headers={'If-None-Match': etag})
+        
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+        assert queries.count == 1
+        assert cache.stats()['computations'] == 0
+    
+    def test_ttl_bounded_without_shared_tier(self, app, client, db_session, sample_quiz, monkeypatch):
+        """Test that, with no shared tier to spread invalidations, entries expire within the local bound."""
+        from app.cache import cache
+        
+        monkeypatch.setattr(cache, 'shared', None)
+        ttls = []
+        original = cache.get_or_set
+        monkeypatch.setattr(cache, 'get_or_set', lambda key, compute, ttl=None, tags=(): (
+            ttls.append(ttl), original(key, compute, ttl, tags))[1])
+        
+        assert client.get('/quizzes?summary=1').status_code == 200
+        assert ttls == [min(app.config['QUIZ_CATALOGUE_CACHE_TTL_SECONDS'], cache.local_ttl)]
+        assert ttls[0] <= app.config['CACHE_LOCAL_TTL_SECONDS']
+    
+    def test_writes_invalidate(self, client, db_session, sample_quiz, auth_headers):
+        """Test that creating, updating and deleting quizzes show up on the next listing."""
+        titles = lambda: [quiz['title'] for quiz in client.get('/quizzes?summary=1').get_json()['quizzes']]
+        assert titles() == ['Sample Quiz']
+        
+        response = client.post('/quiz', json={
+            'title': 'Fresh Quiz',
+            'category': 'Science',
+            'questions': [{'question': 'New?', 'options': ['Yes', 'No'], 'correct_answer': 0}]
+        }, headers=auth_headers)
+        quiz_id = response.get_json()['id']
+        assert sorted(titles()) == ['Fresh Quiz', 'Sample Quiz']
+        
+        client.put(f'/quiz/{quiz_id}', json={'title': 'Renamed Quiz'}, headers=auth_headers)
+        assert sorted(titles()) == ['Renamed Quiz', 'Sample Quiz']
+        
+        client.delete(f'/quiz/{quiz_id}', headers=auth_headers)
+        assert titles() == ['Sample Quiz']
+        
+        # Writes that bypass the controller invalidate too
+        sample_quiz.title = 'Edited Directly'
+        db_session.commit()
+        assert titles() == ['Edited Directly']
+
+
+class TestQuizQueryBudgets:
+    """Fixed query budgets per catalogue listing, so N+1 regressions fail."""
+    
+    # Statements per request regardless of quiz and question count; a lazy load per row blows them
+    BUDGETS = {
+        '/quizzes': 4,
+        '/quizzes?summary=1': 2,
+        '/quizzes?limit=10': 4,
+        '/quiz': 4,
+    }
+    
+    @pytest.fixture
+    def many_quizzes(self, db_session, sample_user):
+        """20 quizzes with three questions each."""
+        for number in range(20):
+            quiz = Quiz(title=f'Budget Quiz {number}', category='Budget', difficulty='easy',
+                        author_id=sample_user.id)
+            quiz.set_questions([(f'Question {position}?', ['A', 'B', 'C'], 0) for position in range(3)])
+            db_session.add(quiz)
+        db_session.commit()
+    
+    @pytest.mark.parametrize('endpoint', list(BUDGETS))
+    def test_catalogue_query_budget(self, client, db_session, auth_headers, many_quizzes,
+                                    query_counter, endpoint):
+        """Test that a catalogue listing issues a fixed number of queries."""
+        with query_counter() as queries:
+            response = client.get(endpoint, headers=auth_headers)
+        
+        assert response.status_code == 200
+        assert queries.count <= self.BUDGETS[endpoint], '\n'.join(queries.statements)
+        quizzes = response.get_json()['quizzes']
+        assert quizzes
+        if 'summary' not in endpoint:
+            assert all(len(quiz['questions']) == 3 for quiz in quizzes)
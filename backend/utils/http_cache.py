@@ -0,0 +1,43 @@
+"""
+Conditional GET helpers: strong ETags and Last-Modified computed from cheap version
+queries, so a 304 is answered before any row is loaded or serialized
+"""
+import hashlib
+from flask import request
+from werkzeug.http import http_date
+
+
+def make_etag(*parts):
+    """Strong ETag value (unquoted) from the parts that identify a representation"""
+    digest = hashlib.sha256('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return digest[:32]
+
+
+def request_variant():
+    """Canonical form of the query string, so ?a=1&b=2 and ?b=2&a=1 share an ETag"""
+    return '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+
+
+def is_not_modified(etag, last_modified=None):
+    """
+    Evaluate If-None-Match / If-Modified-Since against the current validators
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted without it.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have one-second resolution
+        return last_modified.replace(microsecond=0, tzinfo=None) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def cache_headers(etag, last_modified=None):
+    """Validator headers; clients must revalidate, which is now a cheap 304"""
+    headers = {
+        'ETag': f'"{etag}"',
+        'Cache-Control': 'private, no-cache'
+    }
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
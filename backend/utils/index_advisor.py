@@ -0,0 +1,138 @@
+"""
+Index advisor: runs EXPLAIN QUERY PLAN over the queries the app issues and flags full table scans
+
+Usage:
+    flask --app run index-advisor
+"""
+import re
+import click
+from datetime import datetime
+from contextlib import contextmanager
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from app.extensions import db
+
+# "SCAN users" is a full table scan; "SCAN users USING INDEX ..." walks an index instead
+FULL_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)$')
+
+
+@contextmanager
+def record_queries(engine):
+    """Collect (statement, parameters) for every SELECT/UPDATE/DELETE executed on engine"""
+    queries = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            queries.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def explain(statement, parameters):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement"""
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan):
+    """Return the tables a plan reads with a full table scan"""
+    return [match.group(1) for match in (FULL_SCAN.match(detail) for detail in plan) if match]
+
+
+def _workload():
+    """Read paths exercised by the advisor: (name, request query string, callable)"""
+    from app.admin_controller import AdminController
+    from app.quiz_controller import QuizController
+    from app.revocation_cache import revocation_cache
+    from app.models import BlacklistedToken, OfflinePayment, Quiz, User
+    from utils.pagination import encode_cursor
+
+    deep_page = 'cursor=' + encode_cursor(datetime.utcnow(), 10 ** 9)
+    return [
+        ('admin dashboard', '', AdminController.get_dashboard_stats),
+        ('admin users', '', AdminController.get_users),
+        ('admin offline payments', '', AdminController.get_offline_payments),
+        ('admin users deep page', deep_page, AdminController.get_users),
+        ('admin offline payments by status', 'status=pending', AdminController.get_offline_payments),
+        ('admin offline payments deep page', deep_page, AdminController.get_offline_payments),
+        ('admin failed payments', '', AdminController.get_failed_payments),
+        ('admin failed payments by status and amount', 'status=failed&min_amount=5',
+         AdminController.get_failed_payments),
+        ('admin failed payments deep page', 'cursor=' + encode_cursor(datetime.utcnow(), 10 ** 9, 'payment'),
+         AdminController.get_failed_payments),
+        ('quiz catalogue', '', QuizController.get_all_quizzes),
+        ('quiz catalogue by category', '', lambda: QuizController.get_all_quizzes(category='Geography')),
+        ('quiz catalogue by difficulty', '', lambda: QuizController.get_all_quizzes(difficulty='easy')),
+        ('quiz catalogue by category and difficulty', '',
+         lambda: QuizController.get_all_quizzes(category='Geography', difficulty='easy')),
+        ('quiz search', '', lambda: QuizController.get_all_quizzes(search='capital', summary=True)),
+        ('quiz search page', '', lambda: QuizController.get_quiz_page(search='capital', summary=True)),
+        ('quiz catalogue deep page', '',
+         lambda: QuizController.get_quiz_page(summary=True, cursor=encode_cursor(datetime.utcnow(), 10 ** 9))),
+        ('quiz by id', '', lambda: QuizController.get_quiz_by_id(1)),
+        ('quizzes by author', '', lambda: Quiz.query.filter_by(author_id=1).all()),
+        ('revocation cache load', '', revocation_cache.load),
+        ('revocation cache poll', '', revocation_cache.refresh),
+        ('blacklist lookup', '', lambda: BlacklistedToken.query.filter_by(jti='advisor').first()),
+        ('tokens by user', '', lambda: BlacklistedToken.query.filter_by(user_id='1', token_type='access').all()),
+        ('blacklist purge', '', lambda: _explain_only_purge()),
+        ('pending offline request', '',
+         lambda: OfflinePayment.query.filter_by(user_id=1, status='pending').first()),
+        ('user by google_id', '', lambda: User.query.filter_by(google_id='advisor').first()),
+        ('user by email', '', lambda: User.query.filter_by(email='advisor@example.com').first()),
+    ]
+
+
+def _explain_only_purge():
+    """Issue the purge batch as a SELECT so the advisor can plan it without deleting anything"""
+    from app.models import BlacklistedToken
+    table = BlacklistedToken.__table__
+    return db.session.execute(
+        db.select(table.c.id).where(table.c.expires_at < datetime.utcnow()).limit(1)
+    ).all()
+
+
+def run_advisor():
+    """Run the workload and return a list of (name, statement, plan, scanned tables)"""
+    if db.engine.dialect.name != 'sqlite':
+        raise click.ClickException('EXPLAIN QUERY PLAN analysis is only implemented for SQLite')
+
+    report = []
+    seen = set()
+    for name, query_string, call in _workload():
+        with current_app.test_request_context(query_string=query_string):
+            with record_queries(db.engine) as queries:
+                call()
+        db.session.rollback()
+
+        for statement, parameters in queries:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            plan = explain(statement, parameters)
+            report.append((name, statement, plan, full_scans(plan)))
+    return report
+
+
+@click.command('index-advisor')
+@click.option('--verbose', is_flag=True, help='Print the plan of every query, not only flagged ones')
+@with_appcontext
+def index_advisor_command(verbose):
+    """Flag queries that need a full table scan"""
+    report = run_advisor()
+    flagged = [entry for entry in report if entry[3]]
+
+    for name, statement, plan, scans in report:
+        if scans or verbose:
+            marker = 'FULL SCAN' if scans else 'ok'
+            click.echo(f"[{marker}] {name}: {' '.join(statement.split())}")
+            for detail in plan:
+                click.echo(f"    {detail}")
+
+    click.echo(f"{len(report)} distinct queries analysed, {len(flagged)} with full table scans")
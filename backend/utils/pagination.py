@@ -0,0 +1,125 @@
+"""
+Keyset (cursor) pagination over (created_at, id), newest first
+
+A cursor is an opaque token encoding the (created_at, id) of the last row of a page;
+the next page starts strictly after it, so every page costs one index range scan
+regardless of how deep it is.
+"""
+import base64
+import json
+from datetime import datetime
+from flask import current_app, request
+from app.extensions import db
+
+
+def encode_cursor(created_at, row_id, source=None):
+    """Build the opaque cursor pointing just after the given row (source tags rows of merged lists)"""
+    payload = [created_at.isoformat() if created_at else None, row_id]
+    if source is not None:
+        payload.append(source)
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, with_source=False):
+    """
+    Decode a cursor produced by encode_cursor
+    
+    Returns:
+        tuple: (created_at or None, id), or (created_at or None, id, source) with with_source
+        
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        created_at, row_id = payload[:2]
+        source = payload[2] if len(payload) == 3 else None
+        if len(payload) not in (2, 3) or (with_source and not isinstance(source, str)):
+            raise ValueError('Invalid cursor')
+        created_at = datetime.fromisoformat(created_at) if created_at is not None else None
+        if with_source:
+            return created_at, int(row_id), source
+        return created_at, int(row_id)
+    except (TypeError, ValueError, UnicodeError, KeyError):
+        raise ValueError('Invalid cursor')
+
+
+def get_page_args():
+    """
+    Read cursor, limit and include_total from the query string
+    
+    Returns:
+        tuple: (cursor or None, limit, include_total)
+        
+    Raises:
+        ValueError: If cursor or limit is invalid
+    """
+    default_limit = current_app.config.get('PAGINATION_DEFAULT_LIMIT', 20)
+    max_limit = current_app.config.get('PAGINATION_MAX_LIMIT', 100)
+    
+    limit = request.args.get('limit', default_limit)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid limit')
+    if limit < 1:
+        raise ValueError('Invalid limit')
+    
+    cursor = request.args.get('cursor') or None
+    if cursor is not None:
+        decode_cursor(cursor)  # validate early so callers can answer 400
+    
+    include_total = request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+    return cursor, min(limit, max_limit), include_total
+
+
+def keyset_page(query, model, cursor=None, limit=20, include_total=False):
+    """
+    Fetch one page of query ordered by (created_at, id) descending
+    
+    Args:
+        query: Filtered query over model (any existing ORDER BY is replaced)
+        model: Mapped class with created_at and id columns
+        cursor (str, optional): Cursor returned with the previous page
+        limit (int): Page size
+        include_total (bool): Also run COUNT(*) over the filtered query
+        
+    Returns:
+        tuple: (items, pagination dict with limit, next_cursor, has_next and total)
+    """
+    total = query.order_by(None).count() if include_total else None
+    
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if created_at is None:
+            # Rows without created_at sort last; only the id is left to page on
+            query = query.filter(model.created_at.is_(None), model.id < row_id)
+        else:
+            query = query.filter(db.or_(
+                model.created_at < created_at,
+                db.and_(model.created_at == created_at, model.id < row_id),
+                model.created_at.is_(None)
+            ))
+    
+    # One extra row tells whether a next page exists without a COUNT
+    rows = query.order_by(None).order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    has_next = len(rows) > limit
+    items = rows[:limit]
+    
+    return items, {
+        'limit': limit,
+        'next_cursor': encode_cursor(items[-1].created_at, items[-1].id) if has_next else None,
+        'has_next': has_next,
+        'total': total
+    }
+
+
+def page_headers(pagination):
+    """Response headers carrying pagination for endpoints whose body is a bare list"""
+    headers = {}
+    if pagination.get('next_cursor'):
+        headers['X-Next-Cursor'] = pagination['next_cursor']
+    if pagination.get('total') is not None:
+        headers['X-Total-Count'] = str(pagination['total'])
+    return headers
@@ -5,6 +5,8 @@ import threading
 import time
 from flask import current_app
 from app.user_controller import TokenBlacklistManager
+from app.leaderboards import leaderboards
+from app.read_replica import sync_sqlite_replica
 
 
 def cleanup_expired_tokens():
@@ -13,14 +15,38 @@ def cleanup_expired_tokens():
     This function is designed to be run periodically
     """
     try:
-        expired_count = TokenBlacklistManager.cleanup_expired_tokens()
-        current_app.logger.info(f"Scheduled cleanup: Removed {expired_count} expired blacklisted tokens")
+        expired_count, elapsed = TokenBlacklistManager.cleanup_expired_tokens()
+        current_app.logger.info(f"Scheduled cleanup: Removed {expired_count} expired blacklisted tokens in {elapsed:.3f}s")
         return expired_count
     except Exception as e:
         current_app.logger.error(f"Error in scheduled token cleanup: {str(e)}")
         return 0
 
 
+def snapshot_leaderboards():
+    """
+    Persist the in-process leaderboards so new workers replay only recent attempts
+    """
+    try:
+        count = leaderboards.snapshot()
+        current_app.logger.info(f"Scheduled snapshot: Saved {count} leaderboards")
+        return count
+    except Exception as e:
+        current_app.logger.error(f"Error in scheduled leaderboard snapshot: {str(e)}")
+        return 0
+
+
+def sync_replica():
+    """
+    Copy the primary onto the local SQLite read replica
+    """
+    try:
+        return sync_sqlite_replica()
+    except Exception as e:
+        current_app.logger.error(f"Error in scheduled replica sync: {str(e)}")
+        return False
+
+
 def setup_scheduled_tasks(app):
     """
     Setup scheduled tasks for the application
@@ -36,6 +62,7 @@ def setup_scheduled_tasks(app):
                 time.sleep(3600)  # Wait 1 hour (3600 seconds)
                 with app.app_context():
                     cleanup_expired_tokens()
+                    snapshot_leaderboards()
             except Exception as e:
                 app.logger.error(f"Error in cleanup loop: {str(e)}")
                 time.sleep(3600)  # Wait before retrying
@@ -45,6 +72,18 @@ def setup_scheduled_tasks(app):
     cleanup_thread.start()
     
     app.logger.info("Token cleanup scheduler initialized (runs every hour)")
+    
+    interval = app.config.get('REPLICA_SYNC_SECONDS')
+    if app.config.get('DATABASE_REPLICA_URL') and interval:
+        def run_replica_sync_loop():
+            """Keep the local read replica at most `interval` seconds behind"""
+            while True:
+                time.sleep(interval)
+                with app.app_context():
+                    sync_replica()
+        
+        threading.Thread(target=run_replica_sync_loop, daemon=True).start()
+        app.logger.info(f"Replica sync scheduler initialized (runs every {interval}s)")
 
 
 def manual_cleanup_expired_tokens(app):
@@ -0,0 +1,19 @@
+"""
+Maintenance command for the materialized per-user statistics
+
+Usage:
+    flask --app run rebuild-user-stats
+"""
+import click
+from flask.cli import with_appcontext
+from app.extensions import db
+from app.models import UserStats
+
+
+@click.command('rebuild-user-stats')
+@with_appcontext
+def rebuild_user_stats_command():
+    """Recompute user_stats from the raw quiz_attempts rows"""
+    UserStats.rebuild()
+    db.session.commit()
+    click.echo(f"Rebuilt statistics for {UserStats.query.count()} users")
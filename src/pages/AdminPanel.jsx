@@ -24,6 +24,7 @@ const AdminPanel = () => {
   const [users, setUsers] = useState([]);
   const [offlinePayments, setOfflinePayments] = useState([]);
   const [failedPayments, setFailedPayments] = useState({ payments: [], subscriptions: [] });
+  const [failedPaymentsCursor, setFailedPaymentsCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
   const [success, setSuccess] = useState('');
@@ -117,25 +118,41 @@ const AdminPanel = () => {
     }
   };
 
-  const loadFailedPayments = async () => {
+  // Without a cursor the list starts over; with one the next page is appended
+  const loadFailedPayments = async (cursor = null) => {
     setLoading(true);
     try {
-      const response = await fetch(`${API_BASE_URL}/admin/payments/failed`, {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response = await fetch(`${API_BASE_URL}/admin/payments/failed${query}`, {
         credentials: 'include'
       });
       
       if (response.ok) {
+        // One list merged newest first; subscriptions are tagged with type 'subscription'
         const data = await response.json();
-        setFailedPayments({
-          payments: data.failed_payments || [],
-          subscriptions: data.failed_subscriptions || []
-        });      } else {
+        const items = Array.isArray(data) ? data : [];
+        const page = {
+          payments: items.filter(item => item.type !== 'subscription'),
+          subscriptions: items.filter(item => item.type === 'subscription')
+        };
+        setFailedPayments(previous => cursor ? {
+          payments: [...previous.payments, ...page.payments],
+          subscriptions: [...previous.subscriptions, ...page.subscriptions]
+        } : page);
+        setFailedPaymentsCursor(response.headers.get('X-Next-Cursor'));
+      } else {
         setError('Failed to load failed payments');
-        setFailedPayments({ payments: [], subscriptions: [] });
+        if (!cursor) {
+          setFailedPayments({ payments: [], subscriptions: [] });
+          setFailedPaymentsCursor(null);
+        }
       }
     } catch (err) {
       setError('Error loading failed payments');
-      setFailedPayments({ payments: [], subscriptions: [] });
+      if (!cursor) {
+        setFailedPayments({ payments: [], subscriptions: [] });
+        setFailedPaymentsCursor(null);
+      }
     } finally {
       setLoading(false);
     }
@@ -404,6 +421,18 @@ const AdminPanel = () => {
           <p>No failed payments found.</p>
         </div>
       )}
+      
+      {failedPaymentsCursor && (
+        <div className="load-more">
+          <button 
+            onClick={() => loadFailedPayments(failedPaymentsCursor)}
+            className="btn btn-secondary"
+            disabled={loading}
+          >
+            Load more
+          </button>
+        </div>
+      )}
     </div>
   );
 
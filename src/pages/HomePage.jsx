@@ -213,7 +213,7 @@ const QuizCard = memo(({
       <span className="duration">{quiz.duration}</span>
       <h3>{quiz.title}</h3>
       <div className="quiz-details">
-        <span>{(quiz.questions?.length || 0)} pytań</span>
+        <span>{(quiz.question_count ?? quiz.questions?.length ?? 0)} pytań</span>
         <span>{quiz.difficulty}</span>
         <span>{quiz.createdAt && `Utworzono: ${new Date(quiz.createdAt).toLocaleDateString()}`}</span>
         {quiz.lastModified && quiz.lastModified !== quiz.createdAt && (
@@ -1,8 +1,9 @@
-import React, { useState, useEffect, useContext, useCallback, useMemo, memo } from 'react';
+import React, { useState, useEffect, useContext, useCallback, useMemo, useRef, memo } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { QuizContext } from '../context/QuizContext';
 import '../styles/SolveQuiz.css';
 import { useAuth } from '../context/AuthContext';
+import { API_ENDPOINTS } from '../utils/constants';
 
 // Zoptymalizowany komponent tabeli wyników
 const ScoreTable = memo(({ currentScore, playerName }) => {
@@ -78,6 +79,8 @@ const SolveQuiz = () => {
   const [showScores, setShowScores] = useState(false);
   const [error, setError] = useState(null);
   const [timerActive, setTimerActive] = useState(true); // Nowy stan do kontrolowania timera
+  const answersRef = useRef([]); // Wybrane indeksy odpowiedzi, wysyłane do oceny na serwerze
+  const startedAtRef = useRef(Date.now());
 
   // Powrót do strony głównej
   const handleBackToHome = useCallback(() => {
@@ -111,6 +114,7 @@ const SolveQuiz = () => {
       const currentQuestion = quiz.questions[currentQuestionIndex];
       setSelectedAnswer({ answer, index });
       setTimerActive(false); // Zatrzymaj timer po wyborze odpowiedzi
+      answersRef.current[currentQuestionIndex] = index;
       
       // Zapewniamy, że correctAnswer jest liczbą
       const correctAnswerIndex = typeof currentQuestion.correctAnswer === 'string'
@@ -192,6 +196,8 @@ const SolveQuiz = () => {
     const init = async () => {
       setScore(0);
       setCorrectAnswers(0);
+      answersRef.current = [];
+      startedAtRef.current = Date.now();
       cleanup = await loadQuiz();
     };
     
@@ -204,6 +210,22 @@ const SolveQuiz = () => {
     };
   }, [loadQuiz]);
   
+  // Wyślij odpowiedzi do oceny po zakończeniu quizu
+  useEffect(() => {
+    if (!showResult || !quiz?.questions) return;
+
+    const answers = quiz.questions.map((_, index) => answersRef.current[index] ?? null);
+    fetch(API_ENDPOINTS.QUIZ_ATTEMPT(quiz.id), {
+      method: 'POST',
+      credentials: 'include',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        answers,
+        duration_seconds: Math.round((Date.now() - startedAtRef.current) / 1000)
+      })
+    }).catch(err => console.error('Error submitting quiz attempt:', err));
+  }, [showResult, quiz]);
+
   // Efekt dla timera
   useEffect(() => {
     if (!quiz || showResult || selectedAnswer || !timerActive) return;
@@ -19,7 +19,7 @@ export const API_ENDPOINTS = {
   QUIZ: `${API_BASE_URL}/quiz`,
   QUIZ_BY_ID: (id) => `${API_BASE_URL}/quiz/${id}`,
   QUIZ_MY: `${API_BASE_URL}/quiz/my`,
-  QUIZ_ATTEMPT: (id) => `${API_BASE_URL}/quiz/${id}/attempt`,
+  QUIZ_ATTEMPT: (id) => `${API_BASE_URL}/quiz/${id}/attempts`,
   
   // User endpoints
   USER_PROFILE: `${API_BASE_URL}/api/user/profile`,